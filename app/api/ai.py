@@ -8,6 +8,7 @@ from app.services.ai_processor import (
     generate_prompt_json,
     upload_and_send_to_openai
 )
+from app.services.compositor import enqueue_composites
 from app.services.post_scheduler import create_post_from_grouping
 from app.schemas.post import PostOut
 import json
@@ -136,6 +137,7 @@ def process_jobsite_media(
 
     db.commit()
     db.refresh(grouping)
+    enqueue_composites(grouping.id)
 
     return {
         "message": "Media processed successfully",
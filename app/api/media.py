@@ -1,15 +1,45 @@
-from fastapi import APIRouter, File, UploadFile, Form, Depends, HTTPException, Response
+from fastapi import APIRouter, File, UploadFile, Form, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 from typing import List
+import json
 from app.api.deps.auth import get_current_user
 from app.models import User, Media, MediaFile
 from app.db.session import get_db
-from app.schemas.media import MediaCreate, MediaOut
-from app.services.media import handle_upload_and_create_media, get_media_by_id, delete_media
+from app.schemas.media import (
+    MediaCreate,
+    MediaOut,
+    MediaProcessingOut,
+    BatchMediaItem,
+    PresignedUploadRequest,
+    PresignedUploadConfirm,
+    UploadSessionCreate,
+    UploadSessionOut
+)
+from app.services.media import (
+    handle_upload_and_create_media,
+    handle_batch_upload_and_create_media,
+    confirm_presigned_upload,
+    get_media_by_id,
+    delete_media
+)
+from app.services.file_serving import build_file_response
+from app.services.storage import storage
+from app.services.media_cache import media_cache
+from app.services.rendition_cache import rendition_cache
+from app.services.resumable_upload import (
+    create_upload_session,
+    get_upload_session,
+    upload_session_status,
+    write_chunk,
+    finalize_upload_session,
+    discard_upload_session
+)
 
 router = APIRouter()
 
-@router.post("/upload")
+MAX_BATCH_FILES = 50
+
+@router.post("/upload", status_code=202)
 async def upload_media(
     file: UploadFile = File(...),
     jobsite_address: str = Form(...),
@@ -39,6 +69,124 @@ async def upload_media(
     
     return await handle_upload_and_create_media(file, media_data, current_user, db)
 
+@router.post("/upload/batch", status_code=202)
+async def upload_media_batch(
+    files: List[UploadFile] = File(...),
+    jobsite_address: str = Form(...),
+    items: str = Form(..., description="JSON array of per-file fields, in the same order as files"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    if len(files) > MAX_BATCH_FILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A batch can contain at most {MAX_BATCH_FILES} files"
+        )
+
+    try:
+        batch_items = [BatchMediaItem(**item) for item in json.loads(items)]
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid items: {str(e)}")
+
+    if len(batch_items) != len(files):
+        raise HTTPException(
+            status_code=400,
+            detail="Provide exactly one items entry per file"
+        )
+
+    # Validate star ratings
+    if any(not 1 <= item.star_rating <= 5 for item in batch_items):
+        raise HTTPException(
+            status_code=400,
+            detail="Star rating must be between 1 and 5"
+        )
+
+    return await handle_batch_upload_and_create_media(
+        files, batch_items, jobsite_address, current_user, db
+    )
+
+@router.post("/presign")
+def presign_media_upload(
+    data: PresignedUploadRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Short-lived form for uploading straight to the bucket (S3 backend)"""
+    return storage.presign_upload(data.sha256, data.content_type, data.file_size, current_user.id, db)
+
+@router.post("/presign/confirm", status_code=202)
+def confirm_media_upload(
+    data: PresignedUploadConfirm,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Validate a direct upload and create its media record"""
+    if not 1 <= data.star_rating <= 5:
+        raise HTTPException(
+            status_code=400,
+            detail="Star rating must be between 1 and 5"
+        )
+
+    return confirm_presigned_upload(data, current_user, db)
+
+@router.post("/uploads", response_model=UploadSessionOut)
+def create_resumable_upload(
+    data: UploadSessionCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Start a resumable upload; send chunks with PUT, then complete it"""
+    if not 1 <= data.star_rating <= 5:
+        raise HTTPException(
+            status_code=400,
+            detail="Star rating must be between 1 and 5"
+        )
+
+    upload = create_upload_session(data, current_user, db)
+    return upload_session_status(upload)
+
+@router.get("/uploads/{upload_id}", response_model=UploadSessionOut)
+def get_resumable_upload(
+    upload_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Received chunks and offset, so a client knows what to re-send"""
+    upload = get_upload_session(upload_id, current_user, db)
+    return upload_session_status(upload)
+
+@router.put("/uploads/{upload_id}/chunks/{index}", response_model=UploadSessionOut)
+async def put_upload_chunk(
+    upload_id: str,
+    index: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Store chunk number `index` (0-based) from the raw request body"""
+    upload = get_upload_session(upload_id, current_user, db)
+    await write_chunk(upload, index, request.stream(), db)
+    return upload_session_status(upload)
+
+@router.post("/uploads/{upload_id}/complete", status_code=202)
+async def complete_resumable_upload(
+    upload_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    upload = get_upload_session(upload_id, current_user, db)
+    return await finalize_upload_session(upload, current_user, db)
+
+@router.delete("/uploads/{upload_id}")
+def cancel_resumable_upload(
+    upload_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    upload = get_upload_session(upload_id, current_user, db)
+    discard_upload_session(upload, db)
+    return {"message": "Upload cancelled"}
+
 @router.get("/", response_model=List[MediaOut])
 def list_media(
     db: Session = Depends(get_db),
@@ -54,7 +202,9 @@ def list_media(
             star_rating=media.star_rating,
             earliest_upload=media.earliest_upload,
             status=media.status,
-            jobsite_address=media.jobsite.address if media.jobsite else ""
+            jobsite_address=media.jobsite.address if media.jobsite else "",
+            processing_status=media.processing_status,
+            duplicate_of=media.duplicate_of_id
         )
         for media in media_items
     ]
@@ -77,7 +227,28 @@ def get_media(
         star_rating=media.star_rating,
         earliest_upload=media.earliest_upload,
         status=media.status,
-        jobsite_address=media.jobsite.address if media.jobsite else ""
+        jobsite_address=media.jobsite.address if media.jobsite else "",
+        processing_status=media.processing_status,
+        duplicate_of=media.duplicate_of_id
+    )
+
+@router.get("/{media_id}/status", response_model=MediaProcessingOut)
+def get_media_processing_status(
+    media_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Where an upload is in the ingest pipeline, for clients polling after a 202"""
+    media = get_media_by_id(media_id, db)
+    if not media or media.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Media not found")
+
+    return MediaProcessingOut(
+        media_id=media.id,
+        processing_status=media.processing_status,
+        processing_error=media.processing_error,
+        processed_urls=media.processed_urls or {},
+        duplicate_of=media.duplicate_of_id
     )
 
 @router.delete("/{media_id}")
@@ -93,18 +264,24 @@ def delete_media_endpoint(
     delete_media(media, db)
     return {"message": "Media deleted successfully"}
 
+@router.get("/cache/stats")
+def media_cache_stats(current_user: User = Depends(get_current_user)):
+    """Hit, miss and eviction counters for sizing the file cache"""
+    return media_cache.stats()
+
+@router.get("/cache/renditions")
+def rendition_cache_stats(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Rendition disk usage against its budget, including pinned bytes"""
+    return rendition_cache.stats(db)
+
 @router.get("/files/{file_id}")
-def serve_file(file_id: str, db: Session = Depends(get_db)):
-    """Serve media files from database"""
+def serve_file(file_id: str, request: Request, db: Session = Depends(get_db)):
+    """Stream media file chunks from database with Range and ETag support"""
     file_record = db.query(MediaFile).filter_by(id=file_id).first()
     if not file_record:
         raise HTTPException(status_code=404, detail="File not found")
-    
-    return Response(
-        content=file_record.file_data,
-        media_type=file_record.content_type,
-        headers={
-            "Content-Disposition": f"inline; filename={file_record.original_filename}",
-            "Cache-Control": "public, max-age=3600"
-        }
-    )
\ No newline at end of file
+
+    return build_file_response(request, file_record, db)
\ No newline at end of file
@@ -0,0 +1,158 @@
+"""Maintenance commands, e.g. `python -m app.cli gc --dry-run`"""
+import argparse
+import json
+import sys
+from app.config import settings
+from app.db.session import SessionLocal
+
+def gc(args: argparse.Namespace) -> int:
+    from app.services.media_gc import collect_garbage
+
+    db = SessionLocal()
+    try:
+        report = collect_garbage(
+            db,
+            batch_size=args.batch_size,
+            max_batches=args.max_batches,
+            dry_run=args.dry_run
+        )
+    finally:
+        db.close()
+
+    print(json.dumps(report, indent=2))
+    return 0
+
+def ingest(args: argparse.Namespace) -> int:
+    from app import models
+    from app.services.ingest import enqueue_ingest, PROCESSING_PENDING, PROCESSING_FAILED
+
+    db = SessionLocal()
+    try:
+        if args.media_id:
+            media_ids = args.media_id
+        else:
+            statuses = [PROCESSING_PENDING] + ([PROCESSING_FAILED] if args.failed else [])
+            media_ids = [
+                media_id for (media_id,) in db.query(models.Media.id)
+                .filter(models.Media.processing_status.in_(statuses))
+                .order_by(models.Media.id)
+            ]
+    finally:
+        db.close()
+
+    queued = sum(1 for media_id in media_ids if enqueue_ingest(media_id))
+    print(f"Queued ingest for {queued} of {len(media_ids)} media")
+    return 0 if queued == len(media_ids) else 1
+
+def probe(args: argparse.Namespace) -> int:
+    from app.services.ingest import backfill_probes
+
+    db = SessionLocal()
+    try:
+        report = backfill_probes(
+            db,
+            batch_size=args.batch_size,
+            max_batches=args.max_batches,
+            force=args.force
+        )
+    finally:
+        db.close()
+
+    print(json.dumps(report, indent=2))
+    return 0 if not report["failed"] else 1
+
+def renditions(args: argparse.Namespace) -> int:
+    from app.services.rendition_cache import rendition_cache
+
+    db = SessionLocal()
+    try:
+        if args.evict:
+            print(json.dumps(rendition_cache.evict(db, dry_run=args.dry_run), indent=2))
+        print(json.dumps(rendition_cache.stats(db), indent=2))
+    finally:
+        db.close()
+    return 0
+
+def reprocess(args: argparse.Namespace) -> int:
+    if args.queue:
+        from app.worker import reprocess_renditions
+        result = reprocess_renditions.delay(args.batch_size, args.max_batches, args.after)
+        print(f"Queued reprocessing as task {result.id}")
+        return 0
+
+    from app.services.reprocess import reprocess_stale
+
+    def progress(report):
+        print(
+            f"batch {report['batches']}: {report['sources']} sources, {report['renditions']} renditions, "
+            f"{report['failed']} failed, cursor {report['cursor']}",
+            file=sys.stderr
+        )
+
+    report = reprocess_stale(
+        SessionLocal,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        max_batches=args.max_batches,
+        after=args.after,
+        dry_run=args.dry_run,
+        progress=progress
+    )
+    print(json.dumps(report, indent=2))
+    return 0 if not report["failed"] else 1
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    gc_parser = commands.add_parser(
+        "gc",
+        help="Delete orphaned media files, renditions and stale upload sessions"
+    )
+    gc_parser.add_argument("--dry-run", action="store_true", help="Report what would be deleted")
+    gc_parser.add_argument("--batch-size", type=int, default=settings.MEDIA_GC_BATCH_SIZE)
+    gc_parser.add_argument("--max-batches", type=int, default=None)
+    gc_parser.set_defaults(handler=gc)
+
+    ingest_parser = commands.add_parser(
+        "ingest",
+        help="Queue the ingest pipeline for media stuck pending (or given ids)"
+    )
+    ingest_parser.add_argument("--media-id", type=int, action="append", help="Repeat for several media")
+    ingest_parser.add_argument("--failed", action="store_true", help="Also retry media that failed")
+    ingest_parser.set_defaults(handler=ingest)
+
+    probe_parser = commands.add_parser(
+        "probe",
+        help="Store ffprobe results in the metadata of videos that lack them"
+    )
+    probe_parser.add_argument("--batch-size", type=int, default=100)
+    probe_parser.add_argument("--max-batches", type=int, default=None)
+    probe_parser.add_argument("--force", action="store_true", help="Probe again even if a current result is stored")
+    probe_parser.set_defaults(handler=probe)
+
+    renditions_parser = commands.add_parser(
+        "renditions",
+        help="Show rendition cache usage, optionally evicting down to the budget"
+    )
+    renditions_parser.add_argument("--evict", action="store_true")
+    renditions_parser.add_argument("--dry-run", action="store_true", help="Report what --evict would delete")
+    renditions_parser.set_defaults(handler=renditions)
+
+    reprocess_parser = commands.add_parser(
+        "reprocess",
+        help="Render again the renditions made with an outdated platform spec"
+    )
+    reprocess_parser.add_argument("--batch-size", type=int, default=50)
+    reprocess_parser.add_argument("--max-batches", type=int, default=None)
+    reprocess_parser.add_argument("--workers", type=int, default=settings.RENDITION_REPROCESS_WORKERS)
+    reprocess_parser.add_argument("--after", default=None, help="Resume past this content hash (a reported cursor)")
+    reprocess_parser.add_argument("--dry-run", action="store_true", help="Count stale renditions without rendering")
+    reprocess_parser.add_argument("--queue", action="store_true", help="Run as a Celery task instead")
+    reprocess_parser.set_defaults(handler=reprocess)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
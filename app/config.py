@@ -29,6 +29,33 @@ class Settings(BaseSettings):
     AWS_SECRET_ACCESS_KEY: str
     AWS_REGION: str
     AWS_BUCKET_NAME: str
+
+    # Media storage: "database", "filesystem" or "s3"
+    STORAGE_BACKEND: str = "database"
+    STORAGE_LOCAL_ROOT: str = "uploads/blobs"
+    STORAGE_S3_ENDPOINT_URL: str = ""  # Set for MinIO or another S3-compatible store
+    STORAGE_ACCEL_REDIRECT_PREFIX: str = ""  # e.g. "/protected-blobs" to let nginx sendfile
+    UPLOAD_SESSION_DIR: str = "uploads/sessions"  # Chunk parts of resumable uploads
+
+    # Read-through cache for small, hot media files
+    MEDIA_CACHE_MEMORY_BYTES: int = 128 * 1024 * 1024
+    MEDIA_CACHE_DISK_DIR: str = "cache/media"  # Empty disables the disk tier
+    MEDIA_CACHE_DISK_BYTES: int = 2 * 1024 * 1024 * 1024
+    MEDIA_CACHE_MAX_ITEM_BYTES: int = 8 * 1024 * 1024
+
+    # Platform renditions written by MediaProcessor
+    RENDITION_CACHE_DIR: str = "cache"
+    RENDITION_CACHE_BYTES: int = 20 * 1024 * 1024 * 1024
+    RENDITION_PIN_DAYS: int = 7  # Never evict renditions of posts scheduled this soon
+    RENDITION_REPROCESS_WORKERS: int = 4  # Sources re-rendered at once after a spec change
+    INGEST_SCRATCH_DIR: str = "uploads/ingest"  # Worker-local copies of blobs being processed
+    FFMPEG_MAX_PROCESSES: int = 0  # Concurrent ffmpeg runs per host; 0 means one per core
+    FFMPEG_SLOT_DIR: str = "uploads/ffmpeg"  # Lock files shared by every worker on the host
+
+    # Garbage collection of orphaned blobs, renditions and upload sessions
+    MEDIA_GC_BATCH_SIZE: int = 500
+    MEDIA_GC_GRACE_HOURS: int = 24  # Never collect anything younger than this
+    UPLOAD_SESSION_TTL_HOURS: int = 48
     
     # Monitoring
     SENTRY_DSN: str
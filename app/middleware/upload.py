@@ -2,7 +2,6 @@ from fastapi import Request, HTTPException
 from starlette.middleware.base import BaseHTTPMiddleware
 import magic
 from typing import List
-import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
@@ -39,7 +38,8 @@ class UploadMiddleware(BaseHTTPMiddleware):
 
         # Log upload result
         if request.url.path == "/api/media/upload" and request.method == "POST":
-            if response.status_code == 200:
+            # Uploads answer 202 once stored and queued for processing
+            if 200 <= response.status_code < 300:
                 logger.info("File upload successful")
             else:
                 logger.warning(f"File upload failed with status {response.status_code}")
@@ -55,15 +55,6 @@ class UploadMiddleware(BaseHTTPMiddleware):
             logger.error(f"File validation error: {str(e)}")
             return False
 
-    async def cleanup_failed_upload(self, file_path: str):
-        """Cleanup failed uploads after timeout"""
-        try:
-            await asyncio.sleep(3600)  # Wait 1 hour
-            # Implementation would check if upload completed and cleanup if not
-            logger.info(f"Cleanup check for {file_path}")
-        except Exception as e:
-            logger.error(f"Cleanup error: {str(e)}")
-
 class FileValidationMiddleware(BaseHTTPMiddleware):
     """Additional file validation middleware"""
     
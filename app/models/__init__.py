@@ -2,16 +2,22 @@ from .user import User
 from .jobsite import Jobsite
 from .media import Media
 from .media_file import MediaFile
+from .media_file_chunk import MediaFileChunk
 from .media_grouping import MediaGrouping
 from .post import Post
+from .rendition import Rendition
 from .social_account import SocialAccount
+from .upload_session import UploadSession
 
 __all__ = [
     "User",
     "Jobsite", 
     "Media",
     "MediaFile",
+    "MediaFileChunk",
     "MediaGrouping",
     "Post",
-    "SocialAccount"
+    "Rendition",
+    "SocialAccount",
+    "UploadSession"
 ]
\ No newline at end of file
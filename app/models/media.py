@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Enum, JSON
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Enum, JSON, Index
 from sqlalchemy.orm import relationship
 from app.db.base import Base
 from datetime import datetime
@@ -11,19 +11,31 @@ class MediaStatus(enum.Enum):
 
 class Media(Base):
     __tablename__ = "media"
+    __table_args__ = (
+        # Created by the add_media_processing_status migration
+        Index("idx_media_processing_status", "processing_status"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    file_url = Column(String, nullable=False)
+    file_url = Column(String, nullable=False, index=True)
+    content_hash = Column(String(64), nullable=True, index=True)  # SHA-256 of the MediaFile, keys renditions
     description = Column(String)
     notes = Column(String)
     star_rating = Column(Integer)
     earliest_upload = Column(String)
-    status = Column(Enum(MediaStatus), nullable=False)
+    # Store the lowercase values the mediastatus type was created with
+    status = Column(Enum(MediaStatus, values_callable=lambda e: [m.value for m in e]), nullable=False)
     processed_urls = Column(JSON, default={})
-    metadata = Column(JSON, default={})
+    # "metadata" is reserved on declarative models, so map the column under another name
+    media_metadata = Column("metadata", JSON, default={})
+    processing_status = Column(String, nullable=False, default="pending")  # pending, processing, ready, failed
+    processing_error = Column(String, nullable=True)
+    perceptual_hash = Column(String(16), nullable=True)  # 64-bit dHash, hex
+    quality_score = Column(Float, nullable=True)  # 0-1 from sharpness, exposure and resolution; features in metadata
+    duplicate_of_id = Column(Integer, ForeignKey("media.id", ondelete="SET NULL"), nullable=True)  # Likely near-duplicate of this earlier shot
 
     user_id = Column(Integer, ForeignKey("users.id"))
-    jobsite_id = Column(Integer, ForeignKey("jobsites.id"))
+    jobsite_id = Column(Integer, ForeignKey("jobsites.id"), index=True)
     grouping_id = Column(Integer, ForeignKey("media_groupings.id"), nullable=True)
 
     created_at = Column(DateTime, default=datetime.utcnow)
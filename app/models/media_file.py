@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, LargeBinary, DateTime
+from sqlalchemy import Column, String, Integer, DateTime
 from app.db.base import Base
 from datetime import datetime
 
@@ -10,5 +10,10 @@ class MediaFile(Base):
     original_filename = Column(String, nullable=True)
     content_type = Column(String, nullable=False)
     file_size = Column(Integer, nullable=False)
-    file_data = Column(LargeBinary, nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
\ No newline at end of file
+    chunk_size = Column(Integer, nullable=True)  # Bytes per MediaFileChunk row (database backend)
+    content_hash = Column(String(64), nullable=False, unique=True)  # SHA-256 hex
+    ref_count = Column(Integer, nullable=False, default=1)  # Media rows pointing at this blob
+    storage_backend = Column(String, nullable=False, default="database")
+    storage_key = Column(String, nullable=False)  # Backend-specific blob key
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    last_referenced_at = Column(DateTime, nullable=True)  # Last time an upload reused the blob, for the GC grace period
\ No newline at end of file
@@ -0,0 +1,9 @@
+from sqlalchemy import Column, String, Integer, LargeBinary, ForeignKey
+from app.db.base import Base
+
+class MediaFileChunk(Base):
+    __tablename__ = "media_file_chunks"
+
+    file_id = Column(String, ForeignKey("media_files.id", ondelete="CASCADE"), primary_key=True)
+    seq = Column(Integer, primary_key=True)  # 0-based chunk index
+    data = Column(LargeBinary, nullable=False)
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, DateTime, Text
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Text, JSON
 from sqlalchemy.orm import relationship
 from app.db.base import Base
 from datetime import datetime
@@ -9,6 +9,7 @@ class MediaGrouping(Base):
     id = Column(Integer, primary_key=True, index=True)
     jobsite_id = Column(Integer, ForeignKey("jobsites.id"))
     generated_caption = Column(Text, nullable=True)
+    composite_urls = Column(JSON, default={})  # {platform: before/after composite path}, see services.compositor
     created_at = Column(DateTime, default=datetime.utcnow)
 
     # Relationships
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, String, Integer, DateTime
+from app.db.base import Base
+from datetime import datetime
+
+class Rendition(Base):
+    """A rendition file in the MediaProcessor cache dir, for the disk budget"""
+    __tablename__ = "renditions"
+
+    key = Column(String, primary_key=True)  # File name in the cache dir
+    content_hash = Column(String(64), nullable=False, index=True)  # Source MediaFile's SHA-256
+    platform = Column(String, nullable=True)  # None for the shared thumbnail
+    kind = Column(String, nullable=False)  # image, video, thumbnail, web, composite
+    size = Column(Integer, nullable=False)
+    spec_version = Column(String, nullable=False)
+    spec_hash = Column(String(16), nullable=True, index=True)  # rendition_spec_hash when rendered; None if unknown
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_accessed_at = Column(DateTime, default=datetime.utcnow, index=True)
\ No newline at end of file
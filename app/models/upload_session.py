@@ -0,0 +1,21 @@
+from sqlalchemy import Column, String, Integer, ForeignKey, DateTime, JSON
+from app.db.base import Base
+from datetime import datetime
+
+class UploadSession(Base):
+    __tablename__ = "upload_sessions"
+
+    id = Column(String, primary_key=True)  # UUID
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    filename = Column(String, nullable=False)
+    total_size = Column(Integer, nullable=False)
+    chunk_size = Column(Integer, nullable=False)
+    media_data = Column(JSON, nullable=False)  # MediaCreate fields applied on finalize
+    status = Column(String, nullable=False, default="open")  # open, finalizing, completed
+    media_id = Column(Integer, ForeignKey("media.id", ondelete="SET NULL"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @property
+    def total_chunks(self) -> int:
+        return max((self.total_size + self.chunk_size - 1) // self.chunk_size, 1)
\ No newline at end of file
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Dict, Optional, List
 from enum import Enum
 
 class MediaStatus(str, Enum):
@@ -15,6 +15,24 @@ class MediaCreate(BaseModel):
     earliest_upload: str = "ASAP"
     status: MediaStatus
 
+class BatchMediaItem(BaseModel):
+    """Per-file fields for a batch upload; the jobsite is shared"""
+    description: Optional[str] = ""
+    notes: Optional[str] = ""
+    star_rating: int
+    earliest_upload: str = "ASAP"
+    status: MediaStatus
+
+class PresignedUploadRequest(BaseModel):
+    filename: str
+    content_type: str
+    file_size: int
+    sha256: str  # Hex digest of the file, checked by the bucket on upload
+
+class PresignedUploadConfirm(MediaCreate):
+    filename: str
+    sha256: str
+
 class MediaOut(BaseModel):
     id: int
     file_url: str
@@ -24,6 +42,32 @@ class MediaOut(BaseModel):
     earliest_upload: str
     status: MediaStatus
     jobsite_address: str
+    processing_status: str = "ready"
+    duplicate_of: Optional[int] = None  # Earlier media this is likely a near-duplicate of
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+class MediaProcessingOut(BaseModel):
+    media_id: int
+    processing_status: str  # pending, processing, ready, failed
+    processing_error: Optional[str] = None
+    processed_urls: Dict[str, str] = {}
+    duplicate_of: Optional[int] = None
+
+class UploadSessionCreate(MediaCreate):
+    filename: str
+    total_size: int
+    chunk_size: Optional[int] = None
+
+class UploadSessionOut(BaseModel):
+    upload_id: str
+    filename: str
+    total_size: int
+    chunk_size: int
+    total_chunks: int
+    received_chunks: List[int]
+    missing_chunks: List[int]
+    received_offset: int
+    status: str
+    media_id: Optional[int] = None
\ No newline at end of file
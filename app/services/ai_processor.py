@@ -4,6 +4,9 @@ from typing import List, Dict
 from sqlalchemy.orm import Session
 from app import models
 from app.config import settings
+from app.services.image_quality import rank_score
+from app.services.near_duplicates import without_near_duplicates
+from app.services.storage import storage
 import openai
 
 def select_media_for_ai(grouping_id: int, db: Session) -> List[Dict]:
@@ -12,33 +15,36 @@ def select_media_for_ai(grouping_id: int, db: Session) -> List[Dict]:
     if not grouping:
         raise ValueError("MediaGrouping not found")
 
-    media_items = grouping.media
+    # Near-identical shots would only crowd out other photos
+    media_items = without_near_duplicates(grouping.media)
 
-    # Categorize media
-    before_photos = [m for m in media_items if m.status.value == "before" and m.file_url.lower().endswith((".jpg", ".jpeg", ".png"))]
-    after_photos = [m for m in media_items if m.status.value == "after" and m.file_url.lower().endswith((".jpg", ".jpeg", ".png"))]
-    progress_photos = [m for m in media_items if m.status.value == "in_progress" and m.file_url.lower().endswith((".jpg", ".jpeg", ".png"))]
-    videos = [m for m in media_items if m.file_url.lower().endswith((".mp4", ".mov", ".webm"))]
+    # Categorize media; file URLs carry no extension, so go by the stored content type
+    content_types = storage.content_types_by_url([m.file_url for m in media_items], db)
+    photos = [m for m in media_items if content_types.get(m.file_url, "").startswith("image/")]
+    before_photos = [m for m in photos if m.status.value == "before"]
+    after_photos = [m for m in photos if m.status.value == "after"]
+    progress_photos = [m for m in photos if m.status.value == "in_progress"]
+    videos = [m for m in media_items if content_types.get(m.file_url, "").startswith("video/")]
 
-    # Select best media (prioritize high ratings)
+    # Select best media by rating and measured quality
     selected_media = []
     
     # Add best before photos
-    before_sorted = sorted(before_photos, key=lambda x: x.star_rating, reverse=True)
+    before_sorted = sorted(before_photos, key=rank_score, reverse=True)
     selected_media.extend(before_sorted[:2])
     
     # Add best after photos
-    after_sorted = sorted(after_photos, key=lambda x: x.star_rating, reverse=True)
+    after_sorted = sorted(after_photos, key=rank_score, reverse=True)
     selected_media.extend(after_sorted[:2])
     
     # Add best progress photo
     if progress_photos:
-        progress_sorted = sorted(progress_photos, key=lambda x: x.star_rating, reverse=True)
+        progress_sorted = sorted(progress_photos, key=rank_score, reverse=True)
         selected_media.extend(progress_sorted[:1])
     
     # Add best video if available
     if videos:
-        video_sorted = sorted(videos, key=lambda x: x.star_rating, reverse=True)
+        video_sorted = sorted(videos, key=rank_score, reverse=True)
         selected_media.extend(video_sorted[:1])
 
     # Prepare media data
@@ -51,7 +57,7 @@ def select_media_for_ai(grouping_id: int, db: Session) -> List[Dict]:
             "description": media.description or "",
             "notes": media.notes or "",
             "star_rating": media.star_rating,
-            "media_type": "video" if media.file_url.lower().endswith((".mp4", ".mov", ".webm")) else "image",
+            "media_type": "video" if content_types[media.file_url].startswith("video/") else "image",
         })
 
     return prepared_media
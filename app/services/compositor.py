@@ -0,0 +1,166 @@
+import hashlib
+import json
+import logging
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from PIL import Image
+from sqlalchemy.orm import Session
+from app import models
+from app.config import settings
+from app.models.media import MediaStatus
+from app.services.image_quality import rank_score
+from app.services.ingest import PROCESSING_READY
+from app.services.media_processing import MediaProcessor, rendition_spec_hash
+from app.services.rendition_cache import COMPOSITE_PREFIX, ensure_renditions, rendition_cache
+from app.services.smart_crop import CROP_ASPECTS
+from app.services.storage import storage
+
+logger = logging.getLogger(__name__)
+
+# Panel grid of each layout, as (columns, rows); before comes first
+COMPOSITE_LAYOUTS = {
+    "side_by_side": (2, 1),
+    "stacked": (1, 2)
+}
+DEFAULT_LAYOUT = "side_by_side"
+# Canvas per platform, within its PLATFORM_SPECS image max_size
+COMPOSITE_SPECS = {
+    "instagram": {"size": (1080, 1080)},
+    "facebook": {"size": (2048, 1024)},
+    "nextdoor": {"size": (2000, 1000)}
+}
+GUTTER = 8  # Pixels of background between panels
+BACKGROUND = (255, 255, 255)
+
+def composite_key(before_hash: str, after_hash: str, layout: str, platform: str) -> str:
+    """Cache key of one composite.
+
+    Changes with either source, the layout and its constants, the canvas,
+    and the spec of the platform renditions it is cut from, so
+    reprocessing after a PLATFORM_SPECS change also renders new composites.
+    """
+    spec = [
+        before_hash,
+        after_hash,
+        layout,
+        COMPOSITE_LAYOUTS[layout],
+        GUTTER,
+        BACKGROUND,
+        COMPOSITE_SPECS[platform],
+        rendition_spec_hash("image", platform)
+    ]
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()[:32]
+
+def best_pair(grouping: models.MediaGrouping, db: Session) -> Optional[Tuple[models.Media, models.Media]]:
+    """Highest ranked ready before and after photos of a grouping"""
+    content_types = storage.content_types_by_url([media.file_url for media in grouping.media], db)
+    photos = [
+        media for media in grouping.media
+        if media.processing_status == PROCESSING_READY
+        and media.content_hash
+        and content_types.get(media.file_url, "").startswith("image/")
+    ]
+    before = [media for media in photos if media.status == MediaStatus.BEFORE]
+    after = [media for media in photos if media.status == MediaStatus.AFTER]
+    if not before or not after:
+        return None
+    return max(before, key=rank_score), max(after, key=rank_score)
+
+def _center(media: models.Media, aspect: float) -> Tuple[float, float]:
+    """Center of the stored smart crop closest in shape to a panel"""
+    crops = (media.media_metadata or {}).get("crops")
+    if not crops:
+        return 0.5, 0.5
+    name = min(
+        (name for name in CROP_ASPECTS if name in crops),
+        key=lambda name: abs(CROP_ASPECTS[name] - aspect),
+        default=None
+    )
+    if name is None:
+        return 0.5, 0.5
+    left, top, right, bottom = crops[name]
+    return (left + right) / 2, (top + bottom) / 2
+
+def _fit(img: Image.Image, size: Tuple[int, int], center: Tuple[float, float]) -> Image.Image:
+    """Fill size with the largest region of img around center, in one resample"""
+    width, height = img.size
+    aspect = size[0] / size[1]
+    if width / height > aspect:
+        crop = height * aspect
+        left = min(max(center[0] * width - crop / 2, 0), width - crop)
+        box = (left, 0, left + crop, height)
+    else:
+        crop = width / aspect
+        top = min(max(center[1] * height - crop / 2, 0), height - crop)
+        box = (0, top, width, top + crop)
+    return img.resize(size, Image.LANCZOS, box=box)
+
+def render_composite(
+    before: models.Media,
+    after: models.Media,
+    platform: str,
+    layout: str = DEFAULT_LAYOUT
+) -> Image.Image:
+    """Before and after panels on one canvas, from the platform renditions"""
+    columns, rows = COMPOSITE_LAYOUTS[layout]
+    width, height = COMPOSITE_SPECS[platform]["size"]
+    panel = (
+        (width - GUTTER * (columns - 1)) // columns,
+        (height - GUTTER * (rows - 1)) // rows
+    )
+
+    canvas = Image.new("RGB", (width, height), BACKGROUND)
+    for index, media in enumerate((before, after)):
+        with Image.open(media.processed_urls[platform]) as rendition:
+            rendition.draft("RGB", panel)
+            image = _fit(rendition.convert("RGB"), panel, _center(media, panel[0] / panel[1]))
+        column, row = index % columns, index // columns
+        canvas.paste(image, (column * (panel[0] + GUTTER), row * (panel[1] + GUTTER)))
+    return canvas
+
+def generate_composites(grouping_id: int, db: Session, layout: str = DEFAULT_LAYOUT) -> Dict[str, str]:
+    """Render a grouping's before/after composites and store them in composite_urls.
+
+    Composites live in the rendition cache dir under composite_key, so
+    calling this again for the same pair and layout (after a caption is
+    regenerated or a post rescheduled) only checks that the files exist.
+    """
+    grouping = db.query(models.MediaGrouping).filter_by(id=grouping_id).first()
+    if not grouping:
+        raise ValueError("MediaGrouping not found")
+
+    pair = best_pair(grouping, db)
+    if pair is None:
+        return {}
+    before, after = pair
+
+    cache_dir = Path(settings.RENDITION_CACHE_DIR)
+    manifest = {
+        platform: str(cache_dir / f"{COMPOSITE_PREFIX}_{platform}_{composite_key(before.content_hash, after.content_hash, layout, platform)}.jpg")
+        for platform in COMPOSITE_SPECS
+    }
+    missing = [platform for platform, path in manifest.items() if not Path(path).exists()]
+    if missing:
+        # Evicted renditions are rendered again first
+        ensure_renditions([before, after], db)
+        processor = MediaProcessor(cache_dir=str(cache_dir))
+        for platform in missing:
+            image = render_composite(before, after, platform, layout)
+            processor.save_image(image, Path(manifest[platform]), "JPEG", quality=85)
+        logger.info(f"Rendered {len(missing)} composites for grouping {grouping_id}")
+
+    if grouping.composite_urls != manifest:
+        grouping.composite_urls = manifest
+        db.commit()
+    # Pinned and evicted along with the after photo
+    rendition_cache.record_manifest(manifest, after.content_hash, db)
+    return manifest
+
+def enqueue_composites(grouping_id: int) -> Optional[str]:
+    """Queue composite rendering for a committed grouping; a broker outage only delays them"""
+    from app.worker import render_composites
+    try:
+        return render_composites.delay(grouping_id).id
+    except Exception as e:
+        logger.error(f"Failed to queue composites for grouping {grouping_id}: {str(e)}")
+        return None
\ No newline at end of file
@@ -0,0 +1,66 @@
+import os
+import time
+import fcntl
+import logging
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+import ffmpeg
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 0.25
+
+class FFmpegSlots:
+    """Host-wide cap on concurrent ffmpeg processes.
+
+    Celery runs each worker in its own process, so a threading primitive
+    would only limit one of them. Instead every slot is a file under
+    slot_dir, held with an exclusive flock for the duration of a run; the
+    kernel drops the lock if the holder dies, so a crashed worker never
+    leaks a slot.
+    """
+
+    def __init__(self, slot_dir: str, max_processes: int = 0):
+        self.slot_dir = Path(slot_dir)
+        self.max_processes = max_processes or os.cpu_count() or 1
+
+    @contextmanager
+    def acquire(self, timeout: Optional[float] = None) -> Iterator[int]:
+        """Block until a slot is free and yield its number"""
+        self.slot_dir.mkdir(parents=True, exist_ok=True)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        waited = False
+
+        while True:
+            for slot in range(self.max_processes):
+                fd = os.open(self.slot_dir / f"slot-{slot}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    os.close(fd)
+                    continue
+                try:
+                    yield slot
+                finally:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+                    os.close(fd)
+                return
+
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"No ffmpeg slot free after {timeout}s")
+            if not waited:
+                logger.info(f"All {self.max_processes} ffmpeg slots busy; waiting")
+                waited = True
+            time.sleep(POLL_INTERVAL)
+
+    def run(self, stream, **kwargs):
+        """ffmpeg.run once a slot is free"""
+        with self.acquire():
+            return ffmpeg.run(stream, **kwargs)
+
+ffmpeg_slots = FFmpegSlots(
+    slot_dir=settings.FFMPEG_SLOT_DIR,
+    max_processes=settings.FFMPEG_MAX_PROCESSES
+)
\ No newline at end of file
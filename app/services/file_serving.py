@@ -0,0 +1,210 @@
+import os
+from fastapi import Request, HTTPException, Response
+from fastapi.responses import StreamingResponse, FileResponse, RedirectResponse
+from sqlalchemy.orm import Session
+from app import models
+from app.config import settings
+from app.services.media_processing import WEB_VARIANT_PREFIX, WEB_VARIANTS, rendition_spec_hash, web_variant_paths
+from app.services.storage import storage
+from typing import Dict, Optional, Tuple
+
+def parse_range_header(range_header: str, file_size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single-range Range header into an inclusive (start, end) pair.
+
+    Returns None when the header should be ignored (malformed, other units
+    or multiple ranges) and raises ValueError when the range cannot be
+    satisfied for a file of this size.
+    """
+    units, _, spec = range_header.partition("=")
+    if units.strip().lower() != "bytes" or "," in spec:
+        return None
+
+    start_str, sep, end_str = (part.strip() for part in spec.strip().partition("-"))
+    if not sep or not (start_str or end_str):
+        return None
+    if (start_str and not start_str.isdigit()) or (end_str and not end_str.isdigit()):
+        return None
+
+    if not start_str:
+        # Suffix range: the last N bytes
+        suffix = int(end_str)
+        if suffix == 0 or file_size == 0:
+            raise ValueError("Empty suffix range")
+        return max(file_size - suffix, 0), file_size - 1
+
+    start = int(start_str)
+    end = int(end_str) if end_str else file_size - 1
+    if start >= file_size:
+        raise ValueError("Range start beyond end of file")
+    if start > end:
+        return None
+
+    return start, min(end, file_size - 1)
+
+def etag_matches(header: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match / If-Range value against an ETag"""
+    if header.strip() == "*":
+        return True
+
+    candidates = [tag.strip() for tag in header.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+def accepted_types(accept_header: str) -> Dict[str, float]:
+    """Media types and their q-values from an Accept header"""
+    accepted = {}
+    for item in accept_header.split(","):
+        media_type, *params = (part.strip() for part in item.split(";"))
+        if not media_type:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[media_type.lower()] = q
+    return accepted
+
+def negotiate_variant(
+    accept_header: Optional[str],
+    file_record: models.MediaFile,
+    db: Session
+) -> Optional[Tuple[str, str]]:
+    """Smallest WebP/AVIF variant of an image the client names in Accept.
+
+    Only formats listed explicitly count, so API clients sending */* keep
+    getting the original bytes. Only variants rendered with the current
+    spec are used, since their ETag carries it. Returns (path,
+    media_type), or None when the original is the best (or only) choice.
+    """
+    if not accept_header or not file_record.content_type.startswith("image/"):
+        return None
+
+    accepted = accepted_types(accept_header)
+    wanted = [ext for ext, variant in WEB_VARIANTS.items() if accepted.get(variant["media_type"], 0) > 0]
+    if not wanted:
+        return None
+
+    paths = web_variant_paths(settings.RENDITION_CACHE_DIR, file_record.content_hash)
+    current = {
+        key for (key,) in db.query(models.Rendition.key).filter(
+            models.Rendition.key.in_([paths[ext].name for ext in wanted]),
+            models.Rendition.spec_hash == rendition_spec_hash(WEB_VARIANT_PREFIX)
+        )
+    }
+    best = None
+    best_size = file_record.file_size
+    for ext in wanted:
+        if paths[ext].name not in current:
+            continue
+        try:
+            size = os.path.getsize(paths[ext])
+        except OSError:
+            # Not rendered yet, or evicted from the rendition cache
+            continue
+        if size < best_size:
+            best, best_size = (str(paths[ext]), WEB_VARIANTS[ext]["media_type"]), size
+    return best
+
+def build_file_response(request: Request, file_record: models.MediaFile, db: Session) -> Response:
+    """Serve a stored file with ETag revalidation and single byte-range support.
+
+    Browsers that accept WebP or AVIF get the smallest such variant of
+    an image instead (?original=1 opts out). S3 files redirect to a
+    presigned URL, whole local files go out through FileResponse (or
+    nginx X-Accel-Redirect), small database files come from the
+    read-through cache and everything else streams from the backend.
+    """
+    variant = None
+    if not request.query_params.get("original"):
+        variant = negotiate_variant(request.headers.get("accept"), file_record, db)
+
+    etag = f'"{file_record.content_hash}"'
+    headers = {
+        "Content-Disposition": f"inline; filename={file_record.original_filename}",
+        "Cache-Control": "public, max-age=3600",
+        "Accept-Ranges": "bytes",
+        "ETag": etag
+    }
+    if file_record.content_type.startswith("image/"):
+        # The body depends on Accept, so shared caches must key on it
+        headers["Vary"] = "Accept"
+
+    if variant:
+        variant_path, media_type = variant
+        ext = media_type.split("/")[1]
+        stem = os.path.splitext(file_record.original_filename or file_record.filename)[0]
+        headers["Content-Disposition"] = f"inline; filename={stem}.{ext}"
+        # A new variant spec is new bytes, even for the same source
+        headers["ETag"] = f'"{file_record.content_hash}-{ext}-{rendition_spec_hash(WEB_VARIANT_PREFIX)}"'
+        headers.pop("Accept-Ranges")
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and etag_matches(if_none_match, headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+        return FileResponse(variant_path, media_type=media_type, headers=headers)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    backend = storage.backend_for(file_record)
+    storage_key = file_record.storage_key
+
+    presigned_url = backend.presign(storage_key)
+    if presigned_url:
+        # The bucket handles Range and revalidation itself
+        return RedirectResponse(
+            presigned_url,
+            status_code=307,
+            headers={"Cache-Control": "private, max-age=300"}
+        )
+
+    file_size = file_record.file_size
+    byte_range = None
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (not if_range or etag_matches(if_range, etag)):
+        try:
+            byte_range = parse_range_header(range_header, file_size)
+        except ValueError:
+            raise HTTPException(
+                status_code=416,
+                detail="Requested range not satisfiable",
+                headers={"Content-Range": f"bytes */{file_size}"}
+            )
+
+    if byte_range:
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{file_size}"
+    else:
+        start, end = 0, file_size - 1
+        status_code = 200
+
+        local_path = backend.local_path(storage_key)
+        if local_path and settings.STORAGE_ACCEL_REDIRECT_PREFIX:
+            headers["X-Accel-Redirect"] = f"{settings.STORAGE_ACCEL_REDIRECT_PREFIX.rstrip('/')}/{storage_key}"
+            return Response(status_code=200, media_type=file_record.content_type, headers=headers)
+        if local_path:
+            return FileResponse(local_path, media_type=file_record.content_type, headers=headers)
+
+    headers["Content-Length"] = str(end - start + 1)
+
+    if storage.is_cacheable(file_record):
+        # Small hot files come from the read-through cache instead of a SELECT
+        data = storage.read_file(file_record, db)
+        return Response(
+            content=data[start:end + 1],
+            status_code=status_code,
+            media_type=file_record.content_type,
+            headers=headers
+        )
+
+    return StreamingResponse(
+        storage.stream_file(file_record, db, start, end),
+        status_code=status_code,
+        media_type=file_record.content_type,
+        headers=headers
+    )
\ No newline at end of file
@@ -0,0 +1,61 @@
+import math
+from typing import Dict, Tuple
+import numpy as np
+from PIL import Image
+from app import models
+
+ANALYSIS_SIZE = 512  # Long edge of the grayscale array features are measured on
+SHARPNESS_TARGET = 500.0  # Laplacian variance of a crisp photo at ANALYSIS_SIZE
+CLIPPING_LIMIT = 0.25  # Share of pure black or white pixels that zeroes exposure
+RESOLUTION_TARGET_MP = 4.0  # Enough for every platform rendition
+WEIGHTS = {"sharpness": 0.5, "exposure": 0.3, "resolution": 0.2}
+
+MAX_STAR_RATING = 5
+RATING_WEIGHT = 0.5  # Against the measured quality in rank_score
+
+def analysis_array(file_path: str) -> Tuple[np.ndarray, Tuple[int, int]]:
+    """Grayscale float array of an image no larger than ANALYSIS_SIZE, and the original size.
+
+    JPEGs are decoded straight to that scale, so a phone photo costs a
+    few ms. Shared by quality scoring and smart cropping.
+    """
+    with Image.open(file_path) as img:
+        size = img.size
+        img.draft('L', (ANALYSIS_SIZE, ANALYSIS_SIZE))
+        gray = img.convert('L')
+    gray.thumbnail((ANALYSIS_SIZE, ANALYSIS_SIZE))
+    return np.asarray(gray, dtype=np.float32), size
+
+def measure_quality(pixels: np.ndarray, size: Tuple[int, int]) -> Dict[str, float]:
+    """Sharpness, exposure clipping and resolution from an analysis_array"""
+    # 4-neighbour Laplacian; blur and camera shake flatten its response
+    laplacian = (
+        pixels[:-2, 1:-1] + pixels[2:, 1:-1] + pixels[1:-1, :-2] + pixels[1:-1, 2:]
+        - 4 * pixels[1:-1, 1:-1]
+    )
+    return {
+        "sharpness": float(laplacian.var()) if laplacian.size else 0.0,
+        "shadows_clipped": float(np.mean(pixels <= 4)),
+        "highlights_clipped": float(np.mean(pixels >= 251)),
+        "megapixels": round(size[0] * size[1] / 1_000_000, 2)
+    }
+
+def quality_features(file_path: str) -> Dict[str, float]:
+    return measure_quality(*analysis_array(file_path))
+
+def quality_score(features: Dict[str, float]) -> float:
+    """Combine quality_features into 0 (unusable) to 1"""
+    parts = {
+        # Log scale: doubling sharpness matters more for soft photos than crisp ones
+        "sharpness": min(math.log1p(features["sharpness"]) / math.log1p(SHARPNESS_TARGET), 1.0),
+        "exposure": 1.0 - min((features["shadows_clipped"] + features["highlights_clipped"]) / CLIPPING_LIMIT, 1.0),
+        "resolution": min(features["megapixels"] / RESOLUTION_TARGET_MP, 1.0)
+    }
+    return round(sum(WEIGHTS[name] * value for name, value in parts.items()), 4)
+
+def rank_score(media: models.Media) -> float:
+    """Star rating and measured quality for ordering candidates; unscored media rank by rating alone"""
+    rating = (media.star_rating or 0) / MAX_STAR_RATING
+    if media.quality_score is None:
+        return rating
+    return RATING_WEIGHT * rating + (1 - RATING_WEIGHT) * media.quality_score
\ No newline at end of file
@@ -0,0 +1,280 @@
+import json
+import os
+import tempfile
+import logging
+from pathlib import Path
+from typing import Dict, Optional
+import ffmpeg
+from PIL import Image
+from sqlalchemy import literal
+from sqlalchemy.orm import Session
+from app import models
+from app.config import settings
+from app.services.media_gc import FILE_URL_PREFIX
+from app.services.media_processing import MediaProcessor, PROBE_VERSION
+from app.services.near_duplicates import image_dhash, near_duplicate_index
+from app.services.image_quality import analysis_array, measure_quality, quality_score
+from app.services.rendition_cache import rendition_cache
+from app.services.smart_crop import compute_crops
+from app.services.storage import storage
+
+logger = logging.getLogger(__name__)
+
+PROCESSING_PENDING = "pending"
+PROCESSING_RUNNING = "processing"
+PROCESSING_READY = "ready"
+PROCESSING_FAILED = "failed"
+
+class IngestError(Exception):
+    """The stored file cannot be processed; retrying will not help"""
+
+def _get_media(media_id: int, db: Session) -> models.Media:
+    media = db.query(models.Media).filter_by(id=media_id).first()
+    if not media:
+        raise IngestError(f"Media {media_id} not found")
+    return media
+
+def _get_file_record(media: models.Media, db: Session) -> models.MediaFile:
+    file_record = storage.get_file_by_url(media.file_url, db)
+    if not file_record:
+        raise IngestError(f"Stored file for media {media.id} not found")
+    return file_record
+
+def _scratch_path(file_record: models.MediaFile) -> Path:
+    return Path(settings.INGEST_SCRATCH_DIR) / f"{file_record.content_hash}{storage._get_extension(file_record.filename)}"
+
+def materialize_source(file_record: models.MediaFile, db: Session) -> str:
+    """Local path of a stored file for Pillow and ffmpeg.
+
+    Filesystem blobs are used in place. Other backends are copied once
+    into the scratch dir, keyed by content hash, so every step of the
+    chain that runs on this worker reuses the same copy. Copies a chain
+    never released are swept by media_gc once unused for the grace period.
+    """
+    local_path = storage.backend_for(file_record).local_path(file_record.storage_key)
+    if local_path:
+        return local_path
+
+    path = _scratch_path(file_record)
+    try:
+        # Marks the copy as in use for the GC's scratch sweep
+        os.utime(path)
+        return str(path)
+    except FileNotFoundError:
+        pass
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in storage.stream_file(file_record, db):
+                f.write(chunk)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return str(path)
+
+def release_source(file_record: models.MediaFile):
+    """Drop the scratch copy made by materialize_source"""
+    try:
+        os.remove(_scratch_path(file_record))
+    except FileNotFoundError:
+        pass
+
+def _processor() -> MediaProcessor:
+    return MediaProcessor(cache_dir=settings.RENDITION_CACHE_DIR)
+
+def _stored_probe(media: models.Media, source: str, refresh: bool = False) -> Dict:
+    """The video's probe from Media.metadata, probing and storing it if missing or outdated"""
+    probe = (media.media_metadata or {}).get("probe")
+    if probe and probe.get("version") == PROBE_VERSION and not refresh:
+        return probe
+
+    try:
+        probe = _processor().probe_video(source)
+    except ffmpeg.Error as e:
+        raise IngestError(f"Invalid video: {e.stderr.decode(errors='replace') if e.stderr else str(e)}")
+    except ValueError as e:
+        raise IngestError(f"Invalid video: {str(e)}")
+    media.media_metadata = {**(media.media_metadata or {}), "probe": probe}
+    return probe
+
+def validate_media(media_id: int, db: Session):
+    """Check the stored bytes actually decode as the sniffed type"""
+    media = _get_media(media_id, db)
+    media.processing_status = PROCESSING_RUNNING
+    media.processing_error = None
+    db.commit()
+
+    file_record = _get_file_record(media, db)
+    if file_record.content_type not in storage.allowed_types:
+        raise IngestError(f"File type {file_record.content_type} not allowed")
+
+    source = materialize_source(file_record, db)
+    if file_record.content_type.startswith("image/"):
+        try:
+            with Image.open(source) as img:
+                img.verify()
+        except Exception as e:
+            raise IngestError(f"Invalid image: {str(e)}")
+    else:
+        _stored_probe(media, source)
+        db.commit()
+
+def extract_media_metadata(media_id: int, db: Session):
+    media = _get_media(media_id, db)
+    file_record = _get_file_record(media, db)
+    source = materialize_source(file_record, db)
+
+    probe = _stored_probe(media, source) if file_record.content_type.startswith("video/") else None
+    try:
+        extracted = _processor().extract_metadata(source, file_record.content_type, probe)
+    except ValueError as e:
+        raise IngestError(str(e))
+
+    # EXIF values and timestamps are not all JSON types
+    extracted = json.loads(json.dumps(extracted, default=str))
+    media.media_metadata = {**(media.media_metadata or {}), **extracted}
+    db.commit()
+
+def fingerprint_media(media_id: int, db: Session):
+    """Perceptual hash of an image, and the earlier shot it likely duplicates"""
+    media = _get_media(media_id, db)
+    file_record = _get_file_record(media, db)
+    if not file_record.content_type.startswith("image/"):
+        return
+
+    perceptual_hash = image_dhash(materialize_source(file_record, db))
+    media.duplicate_of_id = near_duplicate_index.find_original(media, perceptual_hash, db)
+    media.perceptual_hash = perceptual_hash
+    db.commit()
+
+def analyze_image(media_id: int, db: Session):
+    """Score an image's quality for ranking and find its smart crops, from one small decode"""
+    media = _get_media(media_id, db)
+    file_record = _get_file_record(media, db)
+    if not file_record.content_type.startswith("image/"):
+        return
+
+    pixels, size = analysis_array(materialize_source(file_record, db))
+    features = measure_quality(pixels, size)
+    media.quality_score = quality_score(features)
+    media.media_metadata = {
+        **(media.media_metadata or {}),
+        "quality": features,
+        "crops": compute_crops(pixels)
+    }
+    db.commit()
+
+def generate_renditions(media_id: int, db: Session):
+    """Render every platform's image or video and record the paths"""
+    media = _get_media(media_id, db)
+    file_record = _get_file_record(media, db)
+    source = materialize_source(file_record, db)
+
+    processor = _processor()
+    media_type = "video" if file_record.content_type.startswith("video/") else "image"
+    content_hash = media.content_hash or file_record.content_hash
+    if media_type == "video":
+        probe = _stored_probe(media, source)
+        manifest = processor.process_all_platforms(source, media_type, content_hash, probe)
+        # Which platforms passed through, were remuxed or were transcoded
+        media.media_metadata = {
+            **(media.media_metadata or {}),
+            "video_processing": processor.plan_video(probe)
+        }
+    else:
+        crops = (media.media_metadata or {}).get("crops")
+        manifest = processor.process_all_platforms(source, media_type, content_hash, crops=crops)
+
+    media.processed_urls = {**(media.processed_urls or {}), **manifest}
+    db.commit()
+    rendition_cache.record_manifest(manifest, content_hash, db)
+
+def generate_ingest_renditions(media_id: int, db: Session):
+    """Chain step: render all but likely duplicates, which ensure_renditions renders if they are ever published"""
+    media = _get_media(media_id, db)
+    if media.duplicate_of_id is None:
+        generate_renditions(media_id, db)
+
+def mark_ready(media_id: int, db: Session):
+    media = _get_media(media_id, db)
+    media.processing_status = PROCESSING_READY
+    media.processing_error = None
+    db.commit()
+    release_source(_get_file_record(media, db))
+
+def mark_failed(media_id: int, error: str, db: Session):
+    media = db.query(models.Media).filter_by(id=media_id).first()
+    if not media:
+        return
+
+    media.processing_status = PROCESSING_FAILED
+    media.processing_error = error[:1000]
+    db.commit()
+
+    file_record = storage.get_file_by_url(media.file_url, db)
+    if file_record:
+        release_source(file_record)
+
+def backfill_probes(
+    db: Session,
+    batch_size: int = 100,
+    max_batches: Optional[int] = None,
+    force: bool = False
+) -> Dict:
+    """Store probe_video results for videos ingested before they were kept.
+
+    Walks video media in keyset batches, skipping those whose stored
+    probe is current unless force is set. Non-local blobs are copied to
+    the scratch dir one at a time and removed again.
+    """
+    report = {"scanned": 0, "probed": 0, "failed": 0}
+    last_id = 0
+    batches = 0
+
+    while max_batches is None or batches < max_batches:
+        batch = (
+            db.query(models.Media, models.MediaFile)
+            .join(models.MediaFile, models.Media.file_url == literal(FILE_URL_PREFIX) + models.MediaFile.id)
+            .filter(models.Media.id > last_id, models.MediaFile.content_type.like("video/%"))
+            .order_by(models.Media.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not batch:
+            break
+        batches += 1
+        last_id = batch[-1][0].id
+
+        for media, file_record in batch:
+            report["scanned"] += 1
+            probe = (media.media_metadata or {}).get("probe") or {}
+            if probe.get("version") == PROBE_VERSION and not force:
+                continue
+
+            try:
+                _stored_probe(media, materialize_source(file_record, db), refresh=True)
+                report["probed"] += 1
+            except Exception as e:
+                report["failed"] += 1
+                logger.error(f"Failed to probe media {media.id}: {str(e)}")
+            finally:
+                release_source(file_record)
+        db.commit()
+
+    return report
+
+def enqueue_ingest(media_id: int) -> Optional[str]:
+    """Queue the ingest chain for a committed media row.
+
+    A broker outage leaves the row pending rather than failing the upload;
+    `python -m app.cli ingest` queues such rows again.
+    """
+    from app.worker import start_ingest
+    try:
+        return start_ingest(media_id)
+    except Exception as e:
+        logger.error(f"Failed to queue ingest for media {media_id}: {str(e)}")
+        return None
\ No newline at end of file
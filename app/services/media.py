@@ -1,10 +1,21 @@
 import os
+from typing import List
 from fastapi import UploadFile, HTTPException, BackgroundTasks
 from sqlalchemy.orm import Session
 from app import models
-from app.schemas.media import MediaCreate
+from app.schemas.media import MediaCreate, BatchMediaItem, PresignedUploadConfirm
 from app.db.crud.jobsite import get_or_create_jobsite
 from app.services.storage import storage
+from app.services.ingest import enqueue_ingest, PROCESSING_PENDING
+
+def accepted_response(media: models.Media) -> dict:
+    """Response fields for media stored and queued for processing"""
+    return {
+        "media_id": media.id,
+        "file_url": media.file_url,
+        "processing_status": media.processing_status or PROCESSING_PENDING,
+        "status_url": f"/api/media/{media.id}/status"
+    }
 
 async def handle_upload_and_create_media(
     file: UploadFile,
@@ -13,7 +24,7 @@ async def handle_upload_and_create_media(
     db: Session
 ) -> dict:
     try:
-        # Upload file to database storage
+        # Stream file into the configured storage backend
         file_url = await upload_file_to_database(file, db)
         
         # Get or create jobsite
@@ -22,6 +33,7 @@ async def handle_upload_and_create_media(
         # Create media record
         media = models.Media(
             file_url=file_url,
+            content_hash=storage.get_file_by_url(file_url, db).content_hash,
             description=data.description,
             notes=data.notes,
             star_rating=data.star_rating,
@@ -34,12 +46,13 @@ async def handle_upload_and_create_media(
         db.commit()
         db.refresh(media)
 
-        return {
-            "message": "Media uploaded successfully",
-            "media_id": media.id,
-            "file_url": file_url
-        }
+        # Validation, metadata and renditions run in the worker
+        enqueue_ingest(media.id)
+        return {"message": "Media uploaded; processing has been queued", **accepted_response(media)}
 
+    except HTTPException:
+        # Validation errors from the streaming ingest keep their status code
+        raise
     except Exception as e:
         # Cleanup on failure
         if 'file_url' in locals():
@@ -49,58 +62,110 @@ async def handle_upload_and_create_media(
                 pass
         raise HTTPException(status_code=500, detail=str(e))
 
-async def upload_file_to_database(file: UploadFile, db: Session) -> str:
-    """Upload file to database and return URL"""
-    # Read file content
-    content = await file.read()
-    
-    # Validate file size (50MB limit)
-    max_size = 50 * 1024 * 1024
-    if len(content) > max_size:
-        raise HTTPException(
-            status_code=413,
-            detail=f"File size exceeds maximum limit of {max_size/1024/1024}MB"
+async def handle_batch_upload_and_create_media(
+    files: List[UploadFile],
+    items: List[BatchMediaItem],
+    jobsite_address: str,
+    user: models.User,
+    db: Session
+) -> dict:
+    """Store many files for one jobsite and create their media in one transaction.
+
+    Each file is validated and streamed to storage on its own, so a bad
+    file is reported in its result without failing the rest of the batch.
+    """
+    jobsite = get_or_create_jobsite(db, user, jobsite_address)
+
+    results = []
+    new_media = []
+    blobs = {}
+    for index, (file, item) in enumerate(zip(files, items)):
+        try:
+            file_url = await storage.upload_file(file, db, commit=False)
+        except HTTPException as e:
+            results.append({"index": index, "filename": file.filename, "error": e.detail})
+            continue
+        except Exception as e:
+            results.append({"index": index, "filename": file.filename, "error": str(e)})
+            continue
+
+        file_record = storage.get_file_by_url(file_url, db)
+        blobs[file_record.id] = (file_record.storage_backend, file_record.storage_key)
+        media = models.Media(
+            file_url=file_url,
+            content_hash=file_record.content_hash,
+            description=item.description,
+            notes=item.notes,
+            star_rating=item.star_rating,
+            earliest_upload=item.earliest_upload,
+            status=item.status,
+            jobsite_id=jobsite.id,
+            user_id=user.id
         )
-    
-    # Validate file type
-    import magic
-    content_type = magic.from_buffer(content, mime=True)
-    allowed_types = [
-        'image/jpeg', 'image/png', 'image/gif', 'image/webp',
-        'video/mp4', 'video/quicktime', 'video/webm'
-    ]
-    
-    if content_type not in allowed_types:
-        raise HTTPException(
-            status_code=400,
-            detail=f"File type {content_type} not allowed"
+        new_media.append(media)
+        results.append({"index": index, "filename": file.filename, "media": media})
+
+    try:
+        db.add_all(new_media)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        # Blobs this batch wrote outside the database went nowhere
+        storage.discard_rolled_back(blobs, db)
+        raise HTTPException(status_code=500, detail=str(e))
+
+    for result in results:
+        media = result.pop("media", None)
+        if media is not None:
+            enqueue_ingest(media.id)
+            result.update(accepted_response(media))
+
+    return {
+        "message": f"Uploaded {len(new_media)} of {len(files)} files",
+        "jobsite_id": jobsite.id,
+        "uploaded": len(new_media),
+        "failed": len(files) - len(new_media),
+        "results": results
+    }
+
+def confirm_presigned_upload(
+    data: PresignedUploadConfirm,
+    user: models.User,
+    db: Session
+) -> dict:
+    """Create media for an object the client uploaded straight to the bucket"""
+    try:
+        file_url = storage.register_uploaded_object(data.sha256, data.filename, user.id, db, commit=False)
+        jobsite = get_or_create_jobsite(db, user, data.jobsite_address)
+
+        media = models.Media(
+            file_url=file_url,
+            content_hash=storage.get_file_by_url(file_url, db).content_hash,
+            description=data.description,
+            notes=data.notes,
+            star_rating=data.star_rating,
+            earliest_upload=data.earliest_upload,
+            status=data.status,
+            jobsite_id=jobsite.id,
+            user_id=user.id
         )
-    
-    # Generate unique ID
-    import uuid
-    file_id = str(uuid.uuid4())
-    
-    # Get file extension
-    file_extension = ""
-    if file.filename and '.' in file.filename:
-        file_extension = '.' + file.filename.rsplit('.', 1)[1].lower()
-    
-    filename = f"{file_id}{file_extension}"
-    
-    # Create file record
-    file_record = models.MediaFile(
-        id=file_id,
-        filename=filename,
-        original_filename=file.filename,
-        content_type=content_type,
-        file_size=len(content),
-        file_data=content
-    )
-    
-    db.add(file_record)
-    db.commit()
-    
-    return f"/api/media/files/{file_id}"
+        db.add(media)
+        db.commit()
+        db.refresh(media)
+
+        enqueue_ingest(media.id)
+        return {"message": "Media uploaded; processing has been queued", **accepted_response(media)}
+
+    except HTTPException:
+        db.rollback()
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def upload_file_to_database(file: UploadFile, db: Session) -> str:
+    """Stream file into the configured storage backend and return URL"""
+    return await storage.upload_file(file, db)
 
 def get_media_by_id(media_id: int, db: Session) -> models.Media:
     """Get media by ID"""
@@ -0,0 +1,237 @@
+import os
+import time
+import tempfile
+import threading
+import logging
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Seconds between rescans of a shared disk tier, which pick up other processes' writes
+DISK_RESCAN_INTERVAL = 60
+
+class MediaBytesCache:
+    """Read-through cache for hot media files: memory LRU backed by a disk LRU.
+
+    Entries are keyed by file id and content hash, and both tiers are
+    bounded by a byte budget. Files larger than max_item_size are never
+    cached so videos keep streaming straight from storage. Each process has
+    its own memory tier; the disk tier directory may be shared, so its
+    usage is recounted from the directory itself when this process's
+    count goes over budget or is older than DISK_RESCAN_INTERVAL (keeping
+    every process to one budget between them), and a disk entry removed
+    by another process is simply treated as a miss.
+    """
+
+    def __init__(
+        self,
+        memory_budget: int,
+        disk_dir: Optional[str],
+        disk_budget: int,
+        max_item_size: int
+    ):
+        self.memory_budget = memory_budget
+        self.disk_budget = disk_budget if disk_dir else 0
+        self.max_item_size = max_item_size
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_bytes = 0
+        self._disk_scanned_at = time.monotonic()
+        self.disk_rescan_interval = DISK_RESCAN_INTERVAL
+        self._lock = threading.Lock()
+        self._counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "memory_evictions": 0,
+            "disk_evictions": 0,
+            "invalidations": 0
+        }
+
+        if self.disk_dir:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            self._disk, self._disk_bytes = self._scan_disk()
+
+    @staticmethod
+    def cache_key(file_id: str, content_hash: str) -> str:
+        return f"{file_id}-{content_hash}"
+
+    def get_or_load(self, file_id: str, content_hash: str, loader: Callable[[], bytes]) -> bytes:
+        """Cached bytes for a file, calling loader() on a miss"""
+        key = self.cache_key(file_id, content_hash)
+        data = self.get(key)
+        if data is None:
+            data = loader()
+            self.put(key, data)
+        return data
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self._counters["memory_hits"] += 1
+                return data
+
+            in_disk_index = key in self._disk
+
+        if in_disk_index:
+            path = self.disk_dir / key
+            try:
+                data = path.read_bytes()
+                # Recency is shared through the mtime, which the scan orders by
+                os.utime(path)
+            except FileNotFoundError:
+                data = None
+
+            with self._lock:
+                if data is None:
+                    self._drop_disk_entry(key)
+                else:
+                    if key in self._disk:
+                        self._disk.move_to_end(key)
+                    self._counters["disk_hits"] += 1
+                    self._put_memory(key, data)
+                    return data
+
+        with self._lock:
+            self._counters["misses"] += 1
+        return None
+
+    def put(self, key: str, data: bytes):
+        size = len(data)
+        if size > self.max_item_size:
+            return
+
+        with self._lock:
+            self._put_memory(key, data)
+
+        if self.disk_dir and size <= self.disk_budget:
+            self._put_disk(key, data)
+
+    def invalidate(self, file_id: str, content_hash: str):
+        """Forget a file in both tiers, e.g. once its blob is deleted"""
+        key = self.cache_key(file_id, content_hash)
+        with self._lock:
+            data = self._memory.pop(key, None)
+            if data is not None:
+                self._memory_bytes -= len(data)
+            self._drop_disk_entry(key)
+            self._counters["invalidations"] += 1
+
+        if self.disk_dir:
+            try:
+                os.remove(self.disk_dir / key)
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                **self._counters,
+                "memory_items": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "memory_budget": self.memory_budget,
+                "disk_items": len(self._disk),
+                "disk_bytes": self._disk_bytes,
+                "disk_budget": self.disk_budget
+            }
+
+    def _put_memory(self, key: str, data: bytes):
+        # Caller holds the lock
+        if len(data) > self.memory_budget:
+            return
+
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= len(previous)
+
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+
+        while self._memory_bytes > self.memory_budget:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self._counters["memory_evictions"] += 1
+
+    def _put_disk(self, key: str, data: bytes):
+        path = self.disk_dir / key
+        try:
+            # Write then rename so readers in other processes never see a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=self.disk_dir, prefix=".tmp-")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Media cache disk write failed for {key}: {str(e)}")
+            return
+
+        with self._lock:
+            self._drop_disk_entry(key)
+            self._disk[key] = len(data)
+            self._disk_bytes += len(data)
+            rescan = (
+                self._disk_bytes > self.disk_budget
+                or time.monotonic() - self._disk_scanned_at >= self.disk_rescan_interval
+            )
+
+        if rescan:
+            # Other processes sharing the directory write to it too, so count
+            # what is actually there before evicting anything
+            entries, total = self._scan_disk()
+            with self._lock:
+                self._disk, self._disk_bytes = entries, total
+                self._disk_scanned_at = time.monotonic()
+                if key in self._disk:
+                    self._disk.move_to_end(key)
+
+        evicted = []
+        with self._lock:
+            while self._disk_bytes > self.disk_budget:
+                old_key, old_size = self._disk.popitem(last=False)
+                self._disk_bytes -= old_size
+                self._counters["disk_evictions"] += 1
+                evicted.append(old_key)
+
+        for old_key in evicted:
+            try:
+                os.remove(self.disk_dir / old_key)
+            except FileNotFoundError:
+                pass
+
+    def _drop_disk_entry(self, key: str):
+        # Caller holds the lock
+        size = self._disk.pop(key, None)
+        if size is not None:
+            self._disk_bytes -= size
+
+    def _scan_disk(self) -> Tuple["OrderedDict[str, int]", int]:
+        """The disk LRU as found in the directory, oldest mtime first, and its total size"""
+        entries = []
+        with os.scandir(self.disk_dir) as it:
+            for entry in it:
+                if entry.name.startswith(".tmp-"):
+                    continue
+                try:
+                    stat = entry.stat(follow_symlinks=False)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, entry.name, stat.st_size))
+
+        disk: "OrderedDict[str, int]" = OrderedDict()
+        for _, key, size in sorted(entries):
+            disk[key] = size
+        return disk, sum(disk.values())
+
+media_cache = MediaBytesCache(
+    memory_budget=settings.MEDIA_CACHE_MEMORY_BYTES,
+    disk_dir=settings.MEDIA_CACHE_DISK_DIR or None,
+    disk_budget=settings.MEDIA_CACHE_DISK_BYTES,
+    max_item_size=settings.MEDIA_CACHE_MAX_ITEM_BYTES
+)
\ No newline at end of file
@@ -0,0 +1,291 @@
+import os
+import shutil
+import time
+import logging
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set
+from sqlalchemy import and_, exists, literal, or_
+from sqlalchemy.orm import Session
+from app import models
+from app.config import settings
+from app.services.storage import storage
+
+logger = logging.getLogger(__name__)
+
+FILE_URL_PREFIX = "/api/media/files/"
+REPORT_SAMPLE_SIZE = 20
+
+def _report(dry_run: bool) -> Dict:
+    return {"dry_run": dry_run, "candidates": 0, "deleted": 0, "bytes": 0, "sample": []}
+
+def _record(report: Dict, item: str, size: int):
+    report["candidates"] += 1
+    report["bytes"] += size
+    if len(report["sample"]) < REPORT_SAMPLE_SIZE:
+        report["sample"].append(item)
+
+def _orphaned_files_filter(cutoff: datetime):
+    """media_files rows created and last referenced before the grace period that no Media.file_url points at.
+
+    ref_count alone cannot tell: a failed upload leaves its blob at 1
+    with no media, while a re-upload of the same bytes raises it before
+    its Media row is committed.
+    """
+    referenced = exists().where(
+        models.Media.file_url == literal(FILE_URL_PREFIX) + models.MediaFile.id
+    )
+    return and_(
+        ~referenced,
+        models.MediaFile.created_at < cutoff,
+        or_(models.MediaFile.last_referenced_at.is_(None), models.MediaFile.last_referenced_at < cutoff)
+    )
+
+def sweep_orphaned_files(
+    db: Session,
+    batch_size: int = settings.MEDIA_GC_BATCH_SIZE,
+    grace: timedelta = timedelta(hours=settings.MEDIA_GC_GRACE_HOURS),
+    max_batches: Optional[int] = None,
+    dry_run: bool = False
+) -> Dict:
+    """Delete stored files no media row references.
+
+    These are left behind when an upload stores its blob but fails before
+    the Media row is committed. Rows newer than the grace period are
+    skipped so in-flight uploads are never collected. Walks the table in
+    keyset batches of batch_size, each re-checked under a row lock before
+    it is purged.
+    """
+    report = _report(dry_run)
+    cutoff = datetime.utcnow() - grace
+    last_id = ""
+    batches = 0
+
+    while max_batches is None or batches < max_batches:
+        batch = (
+            db.query(models.MediaFile.id, models.MediaFile.file_size)
+            .filter(models.MediaFile.id > last_id, _orphaned_files_filter(cutoff))
+            .order_by(models.MediaFile.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not batch:
+            break
+        batches += 1
+        last_id = batch[-1].id
+
+        for file_id, file_size in batch:
+            _record(report, file_id, file_size)
+            if dry_run:
+                continue
+
+            # A new upload may have referenced the blob since the batch was read
+            file_record = (
+                db.query(models.MediaFile)
+                .filter(models.MediaFile.id == file_id, _orphaned_files_filter(cutoff))
+                .with_for_update()
+                .first()
+            )
+            if file_record is None:
+                db.rollback()
+                continue
+
+            try:
+                storage.purge_file(file_record, db)
+                report["deleted"] += 1
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Failed to purge orphaned file {file_id}: {str(e)}")
+
+    return report
+
+def _referenced_rendition_names(db: Session, batch_size: int) -> Set[str]:
+    """File names of every rendition recorded in Media.processed_urls or MediaGrouping.composite_urls"""
+    names = set()
+
+    def collect(value):
+        if isinstance(value, str):
+            names.add(os.path.basename(value))
+        elif isinstance(value, dict):
+            for item in value.values():
+                collect(item)
+        elif isinstance(value, list):
+            for item in value:
+                collect(item)
+
+    rows = (
+        db.query(models.Media.processed_urls)
+        .filter(models.Media.processed_urls.isnot(None))
+        .execution_options(yield_per=batch_size)
+    )
+    for (processed_urls,) in rows:
+        collect(processed_urls)
+
+    rows = (
+        db.query(models.MediaGrouping.composite_urls)
+        .filter(models.MediaGrouping.composite_urls.isnot(None))
+        .execution_options(yield_per=batch_size)
+    )
+    for (composite_urls,) in rows:
+        collect(composite_urls)
+    return names
+
+def _rendition_files(cache_dir: Path) -> Iterator[os.DirEntry]:
+    # Only top-level files are renditions; subdirectories (e.g. the
+    # media bytes cache) belong to other components
+    with os.scandir(cache_dir) as entries:
+        for entry in entries:
+            if entry.is_file(follow_symlinks=False) and not entry.name.startswith("."):
+                yield entry
+
+def sweep_orphaned_renditions(
+    db: Session,
+    cache_dir: str = settings.RENDITION_CACHE_DIR,
+    batch_size: int = settings.MEDIA_GC_BATCH_SIZE,
+    grace: timedelta = timedelta(hours=settings.MEDIA_GC_GRACE_HOURS),
+    max_batches: Optional[int] = None,
+    dry_run: bool = False
+) -> Dict:
+    """Delete rendition files in the MediaProcessor cache dir no media owns"""
+    report = _report(dry_run)
+    cache_path = Path(cache_dir)
+    if not cache_path.is_dir():
+        return report
+
+    referenced = _referenced_rendition_names(db, batch_size)
+    cutoff = time.time() - grace.total_seconds()
+    batch: List[os.DirEntry] = []
+    batches = 0
+
+    def flush():
+        if not dry_run:
+            for entry in batch:
+                try:
+                    os.remove(entry.path)
+                    report["deleted"] += 1
+                except FileNotFoundError:
+                    pass
+            # Keep the rendition cache's byte accounting in step
+            db.query(models.Rendition).filter(
+                models.Rendition.key.in_([entry.name for entry in batch])
+            ).delete(synchronize_session=False)
+            db.commit()
+        batch.clear()
+
+    for entry in _rendition_files(cache_path):
+        try:
+            stat = entry.stat(follow_symlinks=False)
+        except FileNotFoundError:
+            continue
+        if entry.name in referenced or stat.st_mtime >= cutoff:
+            continue
+
+        _record(report, entry.name, stat.st_size)
+        batch.append(entry)
+        if len(batch) >= batch_size:
+            flush()
+            batches += 1
+            if max_batches is not None and batches >= max_batches:
+                return report
+
+    flush()
+    return report
+
+def sweep_stale_upload_sessions(
+    db: Session,
+    ttl: timedelta = timedelta(hours=settings.UPLOAD_SESSION_TTL_HOURS),
+    batch_size: int = settings.MEDIA_GC_BATCH_SIZE,
+    max_batches: Optional[int] = None,
+    dry_run: bool = False
+) -> Dict:
+    """Drop resumable upload sessions idle for longer than ttl, with their chunks"""
+    report = _report(dry_run)
+    cutoff = datetime.utcnow() - ttl
+    session_root = Path(settings.UPLOAD_SESSION_DIR)
+    last_id = ""
+    batches = 0
+
+    while max_batches is None or batches < max_batches:
+        batch = (
+            db.query(models.UploadSession)
+            .filter(models.UploadSession.id > last_id, models.UploadSession.updated_at < cutoff)
+            .order_by(models.UploadSession.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not batch:
+            break
+        batches += 1
+        last_id = batch[-1].id
+
+        for upload in batch:
+            session_dir = session_root / upload.id
+            size = sum(p.stat().st_size for p in session_dir.glob("*")) if session_dir.is_dir() else 0
+            _record(report, upload.id, size)
+            if not dry_run:
+                shutil.rmtree(session_dir, ignore_errors=True)
+                db.delete(upload)
+                report["deleted"] += 1
+
+        if not dry_run:
+            db.commit()
+
+    return report
+
+def sweep_stale_scratch_files(
+    scratch_dir: str = settings.INGEST_SCRATCH_DIR,
+    grace: timedelta = timedelta(hours=settings.MEDIA_GC_GRACE_HOURS),
+    dry_run: bool = False
+) -> Dict:
+    """Delete ingest scratch copies unused for longer than grace.
+
+    The last step of a chain releases its copy, but steps that ran on
+    another worker, or chains that died, leave theirs behind.
+    """
+    report = _report(dry_run)
+    scratch_path = Path(scratch_dir)
+    if not scratch_path.is_dir():
+        return report
+
+    cutoff = time.time() - grace.total_seconds()
+    with os.scandir(scratch_path) as entries:
+        for entry in entries:
+            try:
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+                stat = entry.stat(follow_symlinks=False)
+            except FileNotFoundError:
+                continue
+            if stat.st_mtime >= cutoff:
+                continue
+
+            _record(report, entry.name, stat.st_size)
+            if not dry_run:
+                try:
+                    os.remove(entry.path)
+                    report["deleted"] += 1
+                except FileNotFoundError:
+                    pass
+
+    return report
+
+def collect_garbage(
+    db: Session,
+    batch_size: int = settings.MEDIA_GC_BATCH_SIZE,
+    max_batches: Optional[int] = None,
+    dry_run: bool = False
+) -> Dict[str, Dict]:
+    """Run every sweep and return a report per sweep"""
+    report = {
+        "files": sweep_orphaned_files(db, batch_size=batch_size, max_batches=max_batches, dry_run=dry_run),
+        "renditions": sweep_orphaned_renditions(db, batch_size=batch_size, max_batches=max_batches, dry_run=dry_run),
+        "upload_sessions": sweep_stale_upload_sessions(db, batch_size=batch_size, max_batches=max_batches, dry_run=dry_run),
+        "scratch": sweep_stale_scratch_files(dry_run=dry_run)
+    }
+    for name, sweep in report.items():
+        logger.info(
+            f"Media GC {name}: {sweep['candidates']} candidates, "
+            f"{sweep['deleted']} deleted, {sweep['bytes']} bytes"
+            + (" (dry run)" if dry_run else "")
+        )
+    return report
\ No newline at end of file
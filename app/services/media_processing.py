@@ -1,16 +1,86 @@
-from PIL import Image
+from PIL import Image, features
 import ffmpeg
 from pathlib import Path
 import os
-from typing import Dict, Tuple
+from typing import Dict, List, Optional, Tuple
 import json
 from datetime import datetime
 import hashlib
+import math
+import shutil
+import statistics
+import struct
+import tempfile
+from app.config import settings
+from app.services.ffmpeg_pool import ffmpeg_slots
+from app.services.smart_crop import CROP_ASPECTS, centered_crop
+
+THUMBNAIL_SIZE = (300, 300)
+RENDITION_SPEC_VERSION = "2"  # Bump when PLATFORM_SPECS or encoding settings change
+HASH_CHUNK_SIZE = 1024 * 1024
+VIDEO_ENCODING = {'c:v': 'libx264', 'crf': 23, 'preset': 'medium'}
+AUDIO_ENCODING = {'c:a': 'aac'}
+VIDEO_THUMBNAIL_AT = 1.0  # Seconds into the video, or its midpoint if shorter
+
+# What _render_videos does per platform, from the cheapest
+VIDEO_NOOP = "noop"  # Already compliant: the source is the rendition
+VIDEO_REMUX = "remux"  # Compliant streams in the wrong container: -c copy, faststart
+VIDEO_TRIM = "trim"  # Compliant but too long: -c copy up to a keyframe before max_length
+VIDEO_TRANSCODE = "transcode"
+TRIM_MAX_SHORTFALL = 2.0  # Seconds a keyframe cut may end before max_length
+PASSTHROUGH_VIDEO_CODECS = {'h264'}
+PASSTHROUGH_PIXEL_FORMATS = {'yuv420p', 'yuvj420p'}
+PASSTHROUGH_AUDIO_CODECS = {'aac'}
+QUICKTIME_BRAND = 'qt  '
+
+PROBE_VERSION = 2  # Bump when probe_video's output changes so backfill redoes it
+KEYFRAME_PROBE_SECONDS = 30
+
+# Extra encodings of the largest image rendition, served to browsers that
+# accept them. Platform uploads always use the JPEGs.
+WEB_VARIANT_PREFIX = "web"
+WEB_VARIANTS = {
+    ext: spec for ext, spec in {
+        'webp': {'format': 'WEBP', 'media_type': 'image/webp', 'options': {'quality': 80, 'method': 4}},
+        'avif': {'format': 'AVIF', 'media_type': 'image/avif', 'options': {'quality': 60}}
+    }.items()
+    if features.check(ext)
+}
+
+def web_variant_paths(cache_dir: Path, content_hash: str) -> Dict[str, Path]:
+    """Where the WebP/AVIF variants of a file's largest rendition live, by extension"""
+    return {
+        ext: Path(cache_dir) / f"{WEB_VARIANT_PREFIX}_{content_hash}.{ext}"
+        for ext in WEB_VARIANTS
+    }
+
+def rendition_spec_hash(kind: str, platform: Optional[str] = None) -> str:
+    """Hash of the settings a rendition kind depends on, stored as Rendition.spec_hash.
+
+    Changing a platform's entry in MediaProcessor.PLATFORM_SPECS changes
+    only that platform's hashes, so `python -m app.cli reprocess` rebuilds
+    just the renditions it affects.
+    """
+    specs = MediaProcessor.PLATFORM_SPECS
+    if kind == 'image':
+        spec = specs[platform]['image']
+    elif kind == 'video':
+        spec = [specs[platform]['video'], VIDEO_ENCODING, AUDIO_ENCODING, TRIM_MAX_SHORTFALL]
+    elif kind == 'thumbnail':
+        spec = [THUMBNAIL_SIZE, VIDEO_THUMBNAIL_AT]
+    elif kind == WEB_VARIANT_PREFIX:
+        # Variants are encoded from the largest image rendition, only at the source's size
+        spec = [WEB_VARIANTS, {name: platform_specs['image'] for name, platform_specs in specs.items()}, 'source_size']
+    else:
+        spec = None
+    payload = json.dumps([kind, platform, spec, RENDITION_SPEC_VERSION], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
 
 class MediaProcessor:
     PLATFORM_SPECS = {
         'instagram': {
-            'image': {'max_size': (1080, 1080), 'formats': ['jpg', 'png']},
+            # Feed posts outside 4:5 to 1.91:1 are cropped by Instagram, so crop them first
+            'image': {'max_size': (1080, 1080), 'formats': ['jpg', 'png'], 'aspect_range': ('4:5', '1.91:1')},
             'video': {'max_size': (1080, 1920), 'formats': ['mp4'], 'max_length': 60}
         },
         'facebook': {
@@ -23,18 +93,127 @@ class MediaProcessor:
         }
     }
 
-    def __init__(self, upload_dir: str = "uploads", cache_dir: str = "cache"):
+    def __init__(self, upload_dir: str = "uploads", cache_dir: str = settings.RENDITION_CACHE_DIR):
         self.upload_dir = Path(upload_dir)
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(exist_ok=True)
 
-    def process_image(self, file_path: str, platform: str) -> Dict[str, str]:
+    def process_all_platforms(
+        self,
+        file_path: str,
+        media_type: str = 'image',
+        content_hash: Optional[str] = None,
+        probe: Optional[Dict] = None,
+        crops: Optional[Dict] = None
+    ) -> Dict[str, str]:
+        """Render every platform's version of a file and return the manifest
+        stored in Media.processed_urls ({platform: path, platform_thumbnail: path,
+        web_<ext>: path}).
+
+        Images are decoded once; renditions are derived largest to smallest,
+        each from the smallest already-rendered image that still covers it.
+        Platforms with an aspect_range get the image's stored smart crop
+        (Media.metadata["crops"]) when it falls outside the range. The
+        web_<ext> variants are served in place of the original, so they
+        are only made for images that fit the largest rendition unscaled.
+        Videos are rendered by a single ffmpeg run (see _render_videos).
+        Pass the stored content_hash so a cache hit never reads the file,
+        and a video's stored probe_video result so it is not probed again.
+        """
+        file_hash = content_hash or self._file_hash(file_path)
+        if media_type == 'video':
+            return self._render_videos(file_path, file_hash, list(self.PLATFORM_SPECS), probe)
+
+        outputs = {
+            platform: self.cache_dir / f"{platform}_{file_hash}.jpg"
+            for platform in self.PLATFORM_SPECS
+        }
+        thumb_path = self.cache_dir / f"{file_hash}_thumb.jpg"
+        variant_paths = web_variant_paths(self.cache_dir, file_hash)
+
+        manifest = {}
+        for platform, path in outputs.items():
+            manifest[platform] = str(path)
+            manifest[f"{platform}_thumbnail"] = str(thumb_path)
+
+        if all(os.path.exists(path) for path in manifest.values()):
+            # Variants exist only for images that fit the largest rendition
+            for ext, path in variant_paths.items():
+                if path.exists():
+                    manifest[f"{WEB_VARIANT_PREFIX}_{ext}"] = str(path)
+            return manifest
+
+        with Image.open(file_path) as source:
+            # Sizes come from the header, before anything is decoded
+            width, height = source.size
+            boxes = {
+                platform: self._crop_box(source.size, specs['image'], crops)
+                for platform, specs in self.PLATFORM_SPECS.items()
+            }
+            regions = {
+                platform: (width * (box[2] - box[0]), height * (box[3] - box[1])) if box else source.size
+                for platform, box in boxes.items()
+            }
+            regions[None] = source.size
+            targets = {
+                platform: self._calculate_video_dimensions(tuple(map(int, regions[platform])), specs['image']['max_size'])
+                for platform, specs in self.PLATFORM_SPECS.items()
+            }
+            targets[None] = self._calculate_video_dimensions(source.size, THUMBNAIL_SIZE)
+            # Decode at the scale the most demanding rendition needs
+            scale = min(1.0, max(
+                max(targets[p][0] / regions[p][0], targets[p][1] / regions[p][1]) for p in targets
+            ))
+            img = self._decode(source, (math.ceil(width * scale), math.ceil(height * scale)))
+
+            for platform, box in boxes.items():
+                path = outputs[platform]
+                if box and not path.exists():
+                    left, top, right, bottom = box
+                    region = img.crop((
+                        round(left * img.width), round(top * img.height),
+                        round(right * img.width), round(bottom * img.height)
+                    ))
+                    self.save_image(region.resize(targets[platform], Image.LANCZOS), path, 'JPEG', quality=85)
+
+            order = sorted(
+                (p for p in targets if not boxes.get(p)),
+                key=lambda p: targets[p][0] * targets[p][1],
+                reverse=True
+            )
+            base = img
+            for platform in order:
+                size = targets[platform]
+                if base.size[0] < size[0] or base.size[1] < size[1]:
+                    base = img
+                rendition = base if base.size == size else base.resize(size, Image.LANCZOS)
+
+                path = thumb_path if platform is None else outputs[platform]
+                if not path.exists():
+                    self.save_image(rendition, path, 'JPEG', quality=85)
+                # Variants stand in for the original when it is served, so
+                # only an undownscaled rendition will do
+                if platform == order[0] and size == (width, height):
+                    for ext, variant in WEB_VARIANTS.items():
+                        if not variant_paths[ext].exists():
+                            self.save_image(rendition, variant_paths[ext], variant['format'], **variant['options'])
+                        manifest[f"{WEB_VARIANT_PREFIX}_{ext}"] = str(variant_paths[ext])
+                base = rendition
+
+        return manifest
+
+    def process_image(
+        self,
+        file_path: str,
+        platform: str,
+        content_hash: Optional[str] = None,
+        crops: Optional[Dict] = None
+    ) -> Dict[str, str]:
         """Process image for specific platform requirements"""
-        img = Image.open(file_path)
         specs = self.PLATFORM_SPECS[platform]['image']
         
         # Generate cache key
-        cache_key = self._generate_cache_key(file_path, platform)
+        cache_key = self._generate_cache_key(file_path, platform, content_hash)
         cached_path = self.cache_dir / f"{cache_key}.jpg"
 
         if cached_path.exists():
@@ -43,72 +222,207 @@ class MediaProcessor:
                 'thumbnail': str(self.cache_dir / f"{cache_key}_thumb.jpg")
             }
 
-        # Resize if needed
-        if img.size[0] > specs['max_size'][0] or img.size[1] > specs['max_size'][1]:
-            img.thumbnail(specs['max_size'])
+        with Image.open(file_path) as source:
+            box = self._crop_box(source.size, specs, crops)
+            img = self._decode(
+                source,
+                self._calculate_video_dimensions(source.size, specs['max_size'])
+            )
+
+            if box:
+                left, top, right, bottom = box
+                img = img.crop((
+                    round(left * img.width), round(top * img.height),
+                    round(right * img.width), round(bottom * img.height)
+                ))
+
+            # Resize if needed
+            if img.size[0] > specs['max_size'][0] or img.size[1] > specs['max_size'][1]:
+                img.thumbnail(specs['max_size'])
 
-        # Save processed image
-        img.save(cached_path, 'JPEG', quality=85)
+            # Save processed image
+            img.save(cached_path, 'JPEG', quality=85)
 
-        # Generate thumbnail
-        thumb = img.copy()
-        thumb.thumbnail((300, 300))
-        thumb.save(self.cache_dir / f"{cache_key}_thumb.jpg", 'JPEG')
+            # Generate thumbnail
+            thumb = img.copy()
+            thumb.thumbnail((300, 300))
+            thumb.save(self.cache_dir / f"{cache_key}_thumb.jpg", 'JPEG')
 
         return {
             'processed_path': str(cached_path),
             'thumbnail': str(self.cache_dir / f"{cache_key}_thumb.jpg")
         }
 
-    def process_video(self, file_path: str, platform: str) -> Dict[str, str]:
+    def process_video(
+        self,
+        file_path: str,
+        platform: str,
+        content_hash: Optional[str] = None
+    ) -> Dict[str, str]:
         """Process video for specific platform requirements"""
-        specs = self.PLATFORM_SPECS[platform]['video']
-        cache_key = self._generate_cache_key(file_path, platform)
-        cached_path = self.cache_dir / f"{cache_key}.mp4"
+        file_hash = content_hash or self._file_hash(file_path)
+        manifest = self._render_videos(file_path, file_hash, [platform])
+        return {
+            'processed_path': manifest[platform],
+            'thumbnail': manifest[f"{platform}_thumbnail"]
+        }
 
-        if cached_path.exists():
-            return {
-                'processed_path': str(cached_path),
-                'thumbnail': str(self.cache_dir / f"{cache_key}_thumb.jpg")
-            }
+    def plan_video(self, probe: Dict, platforms: Optional[List[str]] = None) -> Dict[str, str]:
+        """Choose noop, remux or transcode for each platform from a probe_video result.
 
-        # Get video metadata
-        probe = ffmpeg.probe(file_path)
-        video_info = next(s for s in probe['streams'] if s['codec_type'] == 'video')
-        
-        # Calculate new dimensions
-        width = int(video_info['width'])
-        height = int(video_info['height'])
-        new_width, new_height = self._calculate_video_dimensions(
-            (width, height), 
-            specs['max_size']
+        H.264/AAC within the platform's size limits needs no encode: it
+        passes through as is when it is already an MP4 with the index up
+        front, and is remuxed with -c copy otherwise. If it is too long it
+        is stream-copied up to the last keyframe before max_length, as long
+        as that falls within TRIM_MAX_SHORTFALL of it.
+        """
+        streams_ok = (
+            probe['video_codec'] in PASSTHROUGH_VIDEO_CODECS
+            and probe['pix_fmt'] in PASSTHROUGH_PIXEL_FORMATS
+            and len(probe['audio_codecs']) <= 1
+            and all(codec in PASSTHROUGH_AUDIO_CODECS for codec in probe['audio_codecs'])
         )
+        container_ok = probe['mp4_brand'] not in (None, QUICKTIME_BRAND) and probe['faststart']
+        width, height, duration = probe['width'], probe['height'], probe['duration']
 
-        # Process video
-        stream = ffmpeg.input(file_path)
-        stream = ffmpeg.filter(stream, 'scale', new_width, new_height)
-        stream = ffmpeg.output(stream, str(cached_path), 
-                             **{'c:v': 'libx264', 'crf': 23, 'preset': 'medium'})
-        ffmpeg.run(stream, overwrite_output=True)
+        plan = {}
+        for platform in platforms or self.PLATFORM_SPECS:
+            specs = self.PLATFORM_SPECS[platform]['video']
+            max_width, max_height = specs['max_size']
+            if not (streams_ok and width <= max_width and height <= max_height):
+                plan[platform] = VIDEO_TRANSCODE
+            elif duration > specs['max_length']:
+                cut = probe.get('keyframe_cuts', {}).get(str(specs['max_length']))
+                plan[platform] = VIDEO_TRANSCODE if cut is None else VIDEO_TRIM
+            elif container_ok:
+                plan[platform] = VIDEO_NOOP
+            else:
+                plan[platform] = VIDEO_REMUX
+        return plan
 
-        # Generate thumbnail
-        thumbnail_path = self.cache_dir / f"{cache_key}_thumb.jpg"
-        stream = ffmpeg.input(file_path, ss=1)
-        stream = ffmpeg.filter(stream, 'scale', 300, -1)
-        stream = ffmpeg.output(stream, str(thumbnail_path), vframes=1)
-        ffmpeg.run(stream, overwrite_output=True)
+    def _render_videos(
+        self,
+        file_path: str,
+        file_hash: str,
+        platforms: List[str],
+        probe: Optional[Dict] = None
+    ) -> Dict[str, str]:
+        """Produce the missing video renditions and thumbnail in one ffmpeg run.
 
-        return {
-            'processed_path': str(cached_path),
-            'thumbnail': str(thumbnail_path)
-        }
+        Each platform is handled as plan_video decides. Passthroughs are
+        linked to the source, remuxes share one copy-only output, trims get
+        one copy-only output per cut point, and transcodes are decoded
+        once and split in the filter graph: one
+        branch per distinct target (platforms with the same size and cut
+        share an encode) plus one for the thumbnail. The run holds an
+        ffmpeg slot, so the host never runs more encoders than it has cores.
+        """
+        outputs = {platform: self.cache_dir / f"{platform}_{file_hash}.mp4" for platform in platforms}
+        thumb_path = self.cache_dir / f"{file_hash}_thumb.jpg"
+
+        manifest = {}
+        for platform, path in outputs.items():
+            manifest[platform] = str(path)
+            manifest[f"{platform}_thumbnail"] = str(thumb_path)
+
+        missing = [platform for platform, path in outputs.items() if not path.exists()]
+        if not missing and thumb_path.exists():
+            return manifest
+
+        probe = probe or self.probe_video(file_path)
+        has_audio = bool(probe['audio_codecs'])
+        # ffmpeg applies the rotation before scaling, so size by display dimensions
+        source_size = (probe['width'], probe['height'])
+        duration = probe['duration']
+        plan = self.plan_video(probe, missing)
 
-    def extract_metadata(self, file_path: str) -> Dict:
-        """Extract metadata from media file"""
-        if file_path.lower().endswith(('.jpg', '.jpeg', '.png')):
+        remuxed: List[str] = []
+        trims: Dict[float, List[str]] = {}
+        encodes: Dict[Tuple, List[str]] = {}
+        for platform in missing:
+            if plan[platform] == VIDEO_NOOP:
+                self._link(Path(file_path), outputs[platform])
+            elif plan[platform] == VIDEO_REMUX:
+                remuxed.append(platform)
+            elif plan[platform] == VIDEO_TRIM:
+                max_length = self.PLATFORM_SPECS[platform]['video']['max_length']
+                trims.setdefault(probe['keyframe_cuts'][str(max_length)], []).append(platform)
+            else:
+                specs = self.PLATFORM_SPECS[platform]['video']
+                size = self._calculate_video_dimensions(source_size, specs['max_size'])
+                # libx264 needs even dimensions for yuv420p
+                size = (size[0] - size[0] % 2, size[1] - size[1] % 2)
+                cut = specs['max_length'] if duration > specs['max_length'] else None
+                encodes.setdefault((size, cut), []).append(platform)
+
+        source = ffmpeg.input(file_path)
+        split_count = len(encodes) + (0 if thumb_path.exists() else 1)
+        branches = source.video.filter_multi_output('split', split_count) if split_count else None
+        audio = [source.audio] if has_audio else []
+        targets = {}  # temp path -> final paths
+        streams = []
+
+        if remuxed:
+            tmp_path = self._temp_path('.mp4')
+            targets[tmp_path] = [outputs[platform] for platform in remuxed]
+            streams.append(ffmpeg.output(source.video, *audio, tmp_path, c='copy', movflags='+faststart'))
+
+        for cut, group in trims.items():
+            tmp_path = self._temp_path('.mp4')
+            targets[tmp_path] = [outputs[platform] for platform in group]
+            # Output stops before the keyframe at cut, so every GOP kept is whole
+            streams.append(ffmpeg.output(source.video, *audio, tmp_path, c='copy', t=cut, movflags='+faststart'))
+
+        for index, ((size, cut), group) in enumerate(encodes.items()):
+            tmp_path = self._temp_path('.mp4')
+            targets[tmp_path] = [outputs[platform] for platform in group]
+            options = {**VIDEO_ENCODING, **(AUDIO_ENCODING if has_audio else {}), 'movflags': '+faststart'}
+            if cut:
+                options['t'] = cut
+            streams.append(ffmpeg.output(branches[index].filter('scale', *size), *audio, tmp_path, **options))
+
+        if not thumb_path.exists():
+            tmp_path = self._temp_path('.jpg')
+            targets[tmp_path] = [thumb_path]
+            thumb = (
+                branches[len(encodes)]
+                .filter('trim', start=min(VIDEO_THUMBNAIL_AT, duration / 2))
+                .filter('scale', THUMBNAIL_SIZE[0], -1)
+            )
+            streams.append(ffmpeg.output(thumb, tmp_path, vframes=1))
+
+        if not streams:
+            return manifest
+
+        try:
+            ffmpeg_slots.run(ffmpeg.merge_outputs(*streams), overwrite_output=True)
+            for tmp_path, paths in targets.items():
+                os.replace(tmp_path, paths[0])
+                for path in paths[1:]:
+                    self._link(paths[0], path)
+        finally:
+            for tmp_path in targets:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+        return manifest
+
+    def extract_metadata(
+        self,
+        file_path: str,
+        content_type: Optional[str] = None,
+        probe: Optional[Dict] = None
+    ) -> Dict:
+        """Extract metadata from media file, by content type when known"""
+        if content_type:
+            if content_type.startswith('image/'):
+                return self._extract_image_metadata(file_path)
+            if content_type.startswith('video/'):
+                return self._extract_video_metadata(file_path, probe)
+        elif file_path.lower().endswith(('.jpg', '.jpeg', '.png')):
             return self._extract_image_metadata(file_path)
         elif file_path.lower().endswith(('.mp4', '.mov')):
-            return self._extract_video_metadata(file_path)
+            return self._extract_video_metadata(file_path, probe)
         raise ValueError("Unsupported file type")
 
     def _extract_image_metadata(self, file_path: str) -> Dict:
@@ -123,18 +437,115 @@ class MediaProcessor:
             'created_at': datetime.fromtimestamp(os.path.getctime(file_path))
         }
 
-    def _extract_video_metadata(self, file_path: str) -> Dict:
-        probe = ffmpeg.probe(file_path)
-        video_stream = next(s for s in probe['streams'] if s['codec_type'] == 'video')
-        
+    def _extract_video_metadata(self, file_path: str, probe: Optional[Dict] = None) -> Dict:
+        probe = probe or self.probe_video(file_path)
+
         return {
-            'dimensions': (int(video_stream['width']), int(video_stream['height'])),
-            'duration': float(probe['format']['duration']),
-            'format': probe['format']['format_name'],
-            'codec': video_stream['codec_name'],
-            'created_at': datetime.fromtimestamp(os.path.getctime(file_path))
+            'dimensions': (probe['width'], probe['height']),
+            'duration': probe['duration'],
+            'format': probe['format'],
+            'codec': probe['video_codec'],
+            'created_at': datetime.fromtimestamp(os.path.getctime(file_path)),
+            'probe': probe
+        }
+
+    def probe_video(self, file_path: str) -> Dict:
+        """ffprobe a video into the flat dict stored as Media.metadata["probe"].
+
+        width and height are display dimensions, i.e. after rotation.
+        Raises ffmpeg.Error if the file cannot be probed and ValueError if
+        it has no video stream.
+        """
+        raw = ffmpeg.probe(file_path)
+        video = next((s for s in raw['streams'] if s['codec_type'] == 'video'), None)
+        if video is None:
+            raise ValueError("No video stream")
+
+        rotation = self._rotation(video)
+        coded = (int(video['width']), int(video['height']))
+        width, height = (coded[1], coded[0]) if rotation in (90, 270) else coded
+        brand, faststart = self._mp4_layout(file_path)
+        bitrate = raw['format'].get('bit_rate') or video.get('bit_rate')
+        duration = float(raw['format'].get('duration') or video.get('duration') or 0)
+
+        return {
+            'version': PROBE_VERSION,
+            'width': width,
+            'height': height,
+            'coded_width': coded[0],
+            'coded_height': coded[1],
+            'rotation': rotation,
+            'duration': duration,
+            'format': raw['format'].get('format_name'),
+            'bitrate': int(bitrate) if bitrate else None,
+            'video_codec': video.get('codec_name'),
+            'pix_fmt': video.get('pix_fmt'),
+            'frame_rate': self._frame_rate(video.get('avg_frame_rate')),
+            'audio_codecs': [s.get('codec_name') for s in raw['streams'] if s['codec_type'] == 'audio'],
+            'keyframe_interval': self._keyframe_interval(file_path),
+            'keyframe_cuts': self._keyframe_cuts(file_path, duration),
+            'mp4_brand': brand,
+            'faststart': faststart
         }
 
+    def _rotation(self, video: Dict) -> int:
+        """Clockwise display rotation in degrees: 0, 90, 180 or 270"""
+        if 'rotate' in video.get('tags', {}):
+            return int(video['tags']['rotate']) % 360
+        for side_data in video.get('side_data_list', []):
+            if 'rotation' in side_data:
+                # The display matrix angle is counter-clockwise
+                return -int(side_data['rotation']) % 360
+        return 0
+
+    def _frame_rate(self, rate: Optional[str]) -> Optional[float]:
+        try:
+            numerator, _, denominator = rate.partition('/')
+            return round(int(numerator) / int(denominator or 1), 3)
+        except (AttributeError, ValueError, ZeroDivisionError):
+            return None
+
+    def _keyframe_times(self, file_path: str, read_intervals: str) -> List[float]:
+        """Sorted keyframe timestamps of the first video stream within read_intervals.
+
+        Read from packet flags, so nothing is decoded.
+        """
+        try:
+            raw = ffmpeg.probe(
+                file_path,
+                select_streams='v:0',
+                show_entries='packet=pts_time,flags',
+                read_intervals=read_intervals
+            )
+        except ffmpeg.Error:
+            return []
+
+        return sorted(
+            float(packet['pts_time']) for packet in raw.get('packets', [])
+            if 'K' in packet.get('flags', '') and packet.get('pts_time') not in (None, 'N/A')
+        )
+
+    def _keyframe_interval(self, file_path: str) -> Optional[float]:
+        """Median seconds between keyframes early in the video"""
+        times = self._keyframe_times(file_path, f'%+{KEYFRAME_PROBE_SECONDS}')
+        gaps = [later - earlier for earlier, later in zip(times, times[1:])]
+        return round(statistics.median(gaps), 3) if gaps else None
+
+    def _keyframe_cuts(self, file_path: str, duration: float) -> Dict[str, Optional[float]]:
+        """Last keyframe within TRIM_MAX_SHORTFALL before each max_length the video exceeds.
+
+        Keyed by max_length as a string (the dict is stored as JSON);
+        None where there is no such keyframe and trimming must transcode.
+        """
+        cuts = {}
+        for max_length in sorted({specs['video']['max_length'] for specs in self.PLATFORM_SPECS.values()}):
+            if duration <= max_length:
+                continue
+            times = self._keyframe_times(file_path, f'{max(max_length - TRIM_MAX_SHORTFALL, 0)}%{max_length}')
+            candidates = [t for t in times if 0 < t <= max_length and t >= max_length - TRIM_MAX_SHORTFALL]
+            cuts[str(max_length)] = max(candidates) if candidates else None
+        return cuts
+
     def _calculate_video_dimensions(
         self, 
         current: Tuple[int, int], 
@@ -150,7 +561,117 @@ class MediaProcessor:
         ratio = min(max_width/width, max_height/height)
         return int(width * ratio), int(height * ratio)
 
-    def _generate_cache_key(self, file_path: str, platform: str) -> str:
-        """Generate unique cache key based on file content and platform"""
-        file_hash = hashlib.md5(open(file_path, 'rb').read()).hexdigest()
-        return f"{platform}_{file_hash}"
\ No newline at end of file
+    def _crop_box(
+        self,
+        size: Tuple[int, int],
+        image_specs: Dict,
+        crops: Optional[Dict] = None
+    ) -> Optional[Tuple[float, float, float, float]]:
+        """Crop box (fractions) bringing an image inside the spec's aspect_range, if it is outside"""
+        if 'aspect_range' not in image_specs:
+            return None
+
+        narrowest, widest = image_specs['aspect_range']
+        aspect = size[0] / size[1]
+        if aspect < CROP_ASPECTS[narrowest]:
+            name = narrowest
+        elif aspect > CROP_ASPECTS[widest]:
+            name = widest
+        else:
+            return None
+
+        box = (crops or {}).get(name)
+        return tuple(box) if box else centered_crop(size, CROP_ASPECTS[name])
+
+    def _decode(self, source: Image.Image, size: Tuple[int, int]) -> Image.Image:
+        """Decode to RGB at no less than size.
+
+        JPEGs are decoded straight to the smallest 1/2, 1/4 or 1/8 DCT
+        scale that still covers size, which skips most of the IDCT work
+        and memory for phone photos. Other formats decode in full.
+        """
+        source.draft('RGB', size)
+        source.load()
+        # Drafted JPEGs are already RGB; convert() would copy every pixel,
+        # so the source is returned and callers keep it open while using it
+        return source if source.mode == 'RGB' else source.convert('RGB')
+
+    def _mp4_layout(self, file_path: str) -> Tuple[Optional[str], bool]:
+        """Major brand of an ISO media file and whether moov precedes mdat.
+
+        Walks the top-level box headers only. The brand is None when the
+        file is not ISO media; moov after mdat means players must fetch the
+        end of the file before they can start (no faststart).
+        """
+        brand = None
+        try:
+            with open(file_path, 'rb') as f:
+                file_size = os.fstat(f.fileno()).st_size
+                offset = 0
+                while offset + 8 <= file_size:
+                    f.seek(offset)
+                    size, box_type = struct.unpack('>I4s', f.read(8))
+                    header = 8
+                    if size == 1:
+                        size = struct.unpack('>Q', f.read(8))[0]
+                        header = 16
+                    elif size == 0:
+                        size = file_size - offset
+                    if size < header:
+                        return brand, False
+
+                    if box_type == b'ftyp':
+                        brand = f.read(4).decode('latin-1')
+                    elif brand is None:
+                        return None, False
+                    elif box_type == b'moov':
+                        return brand, True
+                    elif box_type == b'mdat':
+                        return brand, False
+                    offset += size
+        except (OSError, struct.error):
+            pass
+        return brand, False
+
+    def _temp_path(self, suffix: str) -> str:
+        """A fresh temp file in the cache dir; the dot prefix keeps GC off it"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=".tmp-", suffix=suffix)
+        os.close(fd)
+        return tmp_path
+
+    def _link(self, source: Path, path: Path):
+        """Give an identical rendition a second name without a second copy"""
+        try:
+            os.link(source, path)
+        except FileExistsError:
+            pass
+        except OSError:
+            shutil.copyfile(source, path)
+
+    def save_image(self, img: Image.Image, path: Path, format: str, **options):
+        """Write via a temp file so a crash never leaves a truncated cache hit"""
+        tmp_path = self._temp_path(path.suffix)
+        try:
+            with open(tmp_path, 'wb') as f:
+                img.save(f, format, **options)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _file_hash(self, file_path: str) -> str:
+        """SHA-256 of a file, read in chunks; matches MediaFile.content_hash"""
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _generate_cache_key(
+        self,
+        file_path: str,
+        platform: str,
+        content_hash: Optional[str] = None
+    ) -> str:
+        """Cache key from the stored content hash, hashing the file only without one"""
+        return f"{platform}_{content_hash or self._file_hash(file_path)}"
\ No newline at end of file
@@ -2,6 +2,10 @@ from celery import Celery
 from typing import List, Optional
 from sqlalchemy.orm import Session
 from app import models
+from app.services.compositor import enqueue_composites
+from app.services.image_quality import rank_score
+from app.services.near_duplicates import without_near_duplicates
+from app.services.storage import storage
 from app.db.session import get_db
 from datetime import datetime
 
@@ -37,6 +41,7 @@ class MediaProcessor:
         
         self.db.commit()
         self.db.refresh(grouping)
+        enqueue_composites(grouping.id)
         return grouping
 
     def get_best_media_combinations(self, jobsite_id: int) -> List[List[models.Media]]:
@@ -45,22 +50,35 @@ class MediaProcessor:
             jobsite_id=jobsite_id,
             grouping_id=None
         ).all()
+        # One shot of each burst is enough
+        media_items = without_near_duplicates(media_items)
 
         combinations = []
 
-        before_items = [m for m in media_items if m.status == "before"]
-        after_items = [m for m in media_items if m.status == "after"]
-        videos = [m for m in media_items if m.file_url.lower().endswith(('.mp4', '.mov'))]
+        # File URLs carry no extension, so photos and videos go by the stored content type
+        content_types = storage.content_types_by_url([m.file_url for m in media_items], self.db)
+        photos = [m for m in media_items if content_types.get(m.file_url, "").startswith("image/")]
+
+        # Ranked by stored rating and quality scores; no file is opened here
+        before_items = sorted((m for m in photos if m.status.value == "before"), key=rank_score, reverse=True)
+        after_items = sorted((m for m in photos if m.status.value == "after"), key=rank_score, reverse=True)
+        videos = sorted(
+            (m for m in media_items if content_types.get(m.file_url, "").startswith("video/")),
+            key=rank_score,
+            reverse=True
+        )
 
         for before in before_items:
             for after in after_items:
                 combo = [before, after]
-                # Just pick the first available video (no rating logic)
+                # Every combination gets the best video
                 matching_video = videos[0] if videos else None
                 if matching_video:
                     combo.append(matching_video)
                 combinations.append(combo)
 
+        # Best pair first; process_jobsite_media uses combinations[0]
+        combinations.sort(key=lambda combo: rank_score(combo[0]) + rank_score(combo[1]), reverse=True)
         return combinations
 
     def process_jobsite_media(self, jobsite_id: int) -> Optional[models.MediaGrouping]:
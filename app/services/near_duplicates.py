@@ -0,0 +1,164 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from PIL import Image
+from sqlalchemy.orm import Session
+from app import models
+
+DHASH_SIZE = 8  # 8x8 comparisons, a 64-bit hash
+DUPLICATE_MAX_DISTANCE = 6  # Differing bits still counted as the same shot
+INDEX_MAX_JOBSITES = 256
+UNFINISHED_STATUSES = ("pending", "processing")
+
+def dhash(img: Image.Image) -> str:
+    """64-bit difference hash of an image as 16 hex digits.
+
+    Each bit says whether a pixel of a 9x8 grayscale thumbnail is
+    brighter than its right-hand neighbour, which survives rescaling,
+    recompression and small exposure changes between burst shots.
+    """
+    thumb = img.convert('L').resize((DHASH_SIZE + 1, DHASH_SIZE), Image.BILINEAR)
+    pixels = np.asarray(thumb, dtype=np.int16)
+    bits = pixels[:, 1:] > pixels[:, :-1]
+    return np.packbits(bits).tobytes().hex()
+
+def image_dhash(file_path: str) -> str:
+    with Image.open(file_path) as img:
+        # JPEGs decode at 1/8 scale; the hash only needs a few pixels
+        img.draft('L', (DHASH_SIZE * 8, DHASH_SIZE * 8))
+        return dhash(img)
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+class BKTree:
+    """Burkhard-Keller tree of 64-bit hashes under Hamming distance.
+
+    Children hang off each node by their distance to it, so by the
+    triangle inequality a search within radius r only follows edges
+    within r of the query's distance to the node, and most of the
+    tree is never visited.
+    """
+
+    def __init__(self):
+        self._root = None  # [hash, items, {distance: child}]
+        self.size = 0
+
+    def add(self, value: int, item: Any):
+        self.size += 1
+        if self._root is None:
+            self._root = [value, [item], {}]
+            return
+
+        node = self._root
+        while True:
+            distance = hamming(value, node[0])
+            if distance == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, [item], {}]
+                return
+            node = child
+
+    def search(self, value: int, radius: int) -> List[Tuple[int, Any]]:
+        """(distance, item) for every item within radius of value, nearest first"""
+        found = []
+        pending = [self._root] if self._root else []
+        while pending:
+            node = pending.pop()
+            distance = hamming(value, node[0])
+            if distance <= radius:
+                found.extend((distance, item) for item in node[1])
+            for edge, child in node[2].items():
+                if distance - radius <= edge <= distance + radius:
+                    pending.append(child)
+        return sorted(found, key=lambda match: match[0])
+
+class NearDuplicateIndex:
+    """Per-jobsite BK-trees of the perceptual hashes of original shots.
+
+    Each process keeps the trees of its most recently used jobsites and
+    catches them up from the database on every lookup. Only rows past
+    the lowest one that was still being ingested at the previous lookup
+    are read again, so a refresh costs the recent uploads, not the
+    whole jobsite. Media flagged as duplicates are never indexed, so
+    every match is an original.
+    """
+
+    def __init__(self, max_jobsites: int = INDEX_MAX_JOBSITES):
+        self.max_jobsites = max_jobsites
+        self._jobsites: "OrderedDict[int, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _refresh(self, jobsite_id: int, db: Session) -> BKTree:
+        entry = self._jobsites.get(jobsite_id)
+        if entry is None:
+            entry = {"tree": BKTree(), "indexed": set(), "floor": 0}
+            self._jobsites[jobsite_id] = entry
+        self._jobsites.move_to_end(jobsite_id)
+        while len(self._jobsites) > self.max_jobsites:
+            self._jobsites.popitem(last=False)
+
+        rows = (
+            db.query(
+                models.Media.id,
+                models.Media.perceptual_hash,
+                models.Media.duplicate_of_id,
+                models.Media.processing_status
+            )
+            .filter(models.Media.jobsite_id == jobsite_id, models.Media.id > entry["floor"])
+            .order_by(models.Media.id)
+        )
+        floor = None
+        for media_id, perceptual_hash, duplicate_of_id, status in rows:
+            if perceptual_hash and duplicate_of_id is None and media_id not in entry["indexed"]:
+                entry["tree"].add(int(perceptual_hash, 16), media_id)
+                entry["indexed"].add(media_id)
+            elif not perceptual_hash and status in UNFINISHED_STATUSES and floor is None:
+                # May still be hashed; read again from here next time
+                floor = media_id - 1
+            if floor is None:
+                entry["floor"] = media_id
+        if floor is not None:
+            entry["floor"] = floor
+        entry["indexed"] = {media_id for media_id in entry["indexed"] if media_id > entry["floor"]}
+        return entry["tree"]
+
+    def find_original(
+        self,
+        media: models.Media,
+        perceptual_hash: str,
+        db: Session,
+        max_distance: int = DUPLICATE_MAX_DISTANCE
+    ) -> Optional[int]:
+        """Id of an earlier original that media is likely a near-duplicate of.
+
+        Call before storing perceptual_hash on media, or an autoflush
+        would index it as an original itself.
+        """
+        if media.jobsite_id is None:
+            return None
+
+        with self._lock:
+            tree = self._refresh(media.jobsite_id, db)
+            matches = tree.search(int(perceptual_hash, 16), max_distance)
+
+        candidate_ids = [media_id for _, media_id in matches if media_id < media.id]
+        if not candidate_ids:
+            return None
+        # Deleted media linger in the tree until the process restarts
+        existing = {
+            media_id for (media_id,) in
+            db.query(models.Media.id).filter(models.Media.id.in_(candidate_ids))
+        }
+        return next((media_id for media_id in candidate_ids if media_id in existing), None)
+
+def without_near_duplicates(media_items: List[models.Media]) -> List[models.Media]:
+    """Drop media whose original is also in the list"""
+    ids = {media.id for media in media_items}
+    return [media for media in media_items if media.duplicate_of_id not in ids]
+
+near_duplicate_index = NearDuplicateIndex()
\ No newline at end of file
@@ -0,0 +1,226 @@
+import os
+import logging
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List
+from sqlalchemy import func, select, or_, and_
+from sqlalchemy.orm import Session
+from app import models
+from app.config import settings
+from app.models.post import PostStatus
+from app.services.media_processing import RENDITION_SPEC_VERSION, WEB_VARIANT_PREFIX, rendition_spec_hash
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_SUFFIX = "_thumbnail"
+COMPOSITE_PREFIX = "composite"  # File name prefix of before/after composites
+
+class RenditionCache:
+    """Byte budget for the MediaProcessor cache dir.
+
+    Every rendition written by the ingest chain gets a row in the
+    renditions table (size, last access, spec version), shared by all
+    workers. evict() deletes least recently used renditions until the
+    total fits the budget, but never those of media in posts scheduled
+    within pin_days. Media entering that window have their evicted
+    renditions rendered again by prerender_pinned, ahead of publishing.
+    """
+
+    def __init__(self, cache_dir: str, budget_bytes: int, pin_days: int):
+        self.cache_dir = Path(cache_dir)
+        self.budget_bytes = budget_bytes
+        self.pin_days = pin_days
+        self._evictions = 0
+
+    def record_manifest(self, manifest: Dict[str, str], content_hash: str, db: Session):
+        """Add or refresh rows for the files of a processed_urls or composite_urls manifest"""
+        now = datetime.utcnow()
+        for name, path in manifest.items():
+            key = os.path.basename(path)
+            try:
+                size = os.path.getsize(path)
+            except FileNotFoundError:
+                continue
+
+            if name.endswith(THUMBNAIL_SUFFIX):
+                kind, platform = "thumbnail", None
+            elif name.startswith(f"{WEB_VARIANT_PREFIX}_"):
+                kind, platform = WEB_VARIANT_PREFIX, None
+            elif key.startswith(f"{COMPOSITE_PREFIX}_"):
+                kind, platform = COMPOSITE_PREFIX, name
+            else:
+                kind, platform = ("video" if key.endswith(".mp4") else "image"), name
+
+            rendition = db.get(models.Rendition, key)
+            if rendition is None:
+                db.add(models.Rendition(
+                    key=key,
+                    content_hash=content_hash,
+                    platform=platform,
+                    kind=kind,
+                    size=size,
+                    spec_version=RENDITION_SPEC_VERSION,
+                    spec_hash=rendition_spec_hash(kind, platform),
+                    created_at=now,
+                    last_accessed_at=now
+                ))
+                # Thumbnails are shared by every platform of a manifest
+                db.flush()
+            else:
+                # spec_hash stays that of the render; an existing file may predate the current spec
+                rendition.size = size
+                rendition.last_accessed_at = now
+        db.commit()
+
+    def touch(self, manifest: Dict[str, str], db: Session):
+        """Mark a manifest's renditions as just used"""
+        keys = {os.path.basename(path) for path in manifest.values()}
+        db.query(models.Rendition).filter(models.Rendition.key.in_(keys)).update(
+            {models.Rendition.last_accessed_at: datetime.utcnow()},
+            synchronize_session=False
+        )
+        db.commit()
+
+    def is_complete(self, manifest: Dict[str, str]) -> bool:
+        return bool(manifest) and all(os.path.exists(path) for path in manifest.values())
+
+    def _pinned_window(self):
+        now = datetime.utcnow()
+        return (
+            models.Post.status == PostStatus.scheduled,
+            models.Post.scheduled_for >= now,
+            models.Post.scheduled_for <= now + timedelta(days=self.pin_days)
+        )
+
+    def pinned_hashes(self):
+        """Content hashes of media in posts scheduled within pin_days"""
+        return (
+            select(models.Media.content_hash)
+            .join(models.Post, models.Post.grouping_id == models.Media.grouping_id)
+            .where(
+                *self._pinned_window(),
+                # NOT IN against a NULL would match nothing
+                models.Media.content_hash.isnot(None)
+            )
+        )
+
+    def pinned_media(self, db: Session) -> List[models.Media]:
+        """Ready media in posts scheduled within pin_days"""
+        return (
+            db.query(models.Media)
+            .join(models.Post, models.Post.grouping_id == models.Media.grouping_id)
+            .filter(*self._pinned_window(), models.Media.processing_status == "ready")
+            .order_by(models.Media.id)
+            .all()
+        )
+
+    def total_bytes(self, db: Session) -> int:
+        return db.query(func.coalesce(func.sum(models.Rendition.size), 0)).scalar()
+
+    def evict(self, db: Session, batch_size: int = 500, dry_run: bool = False) -> Dict:
+        """Delete least recently used, unpinned renditions until under budget"""
+        total = self.total_bytes(db)
+        report = {"dry_run": dry_run, "evicted": 0, "freed_bytes": 0, "total_bytes": total}
+        if total <= self.budget_bytes:
+            return report
+
+        pinned = self.pinned_hashes()
+        cursor = None
+        while total > self.budget_bytes:
+            query = db.query(models.Rendition).filter(
+                models.Rendition.content_hash.not_in(pinned)
+            )
+            if cursor:
+                # Keyset pagination on (last_accessed_at, key)
+                query = query.filter(or_(
+                    models.Rendition.last_accessed_at > cursor[0],
+                    and_(models.Rendition.last_accessed_at == cursor[0], models.Rendition.key > cursor[1])
+                ))
+            batch: List[models.Rendition] = (
+                query.order_by(models.Rendition.last_accessed_at, models.Rendition.key)
+                .limit(batch_size)
+                .all()
+            )
+            if not batch:
+                logger.warning(f"Rendition cache still {total} bytes over a {self.budget_bytes} budget; the rest is pinned")
+                break
+            cursor = (batch[-1].last_accessed_at, batch[-1].key)
+
+            for rendition in batch:
+                if total <= self.budget_bytes:
+                    break
+                if not dry_run:
+                    try:
+                        os.remove(self.cache_dir / rendition.key)
+                    except FileNotFoundError:
+                        pass
+                    db.delete(rendition)
+                    self._evictions += 1
+                total -= rendition.size
+                report["evicted"] += 1
+                report["freed_bytes"] += rendition.size
+
+            if not dry_run:
+                db.commit()
+
+        report["total_bytes"] = total
+        return report
+
+    def stats(self, db: Session) -> Dict:
+        items, total, oldest = db.query(
+            func.count(models.Rendition.key),
+            func.coalesce(func.sum(models.Rendition.size), 0),
+            func.min(models.Rendition.last_accessed_at)
+        ).one()
+        pinned_items, pinned_bytes = db.query(
+            func.count(models.Rendition.key),
+            func.coalesce(func.sum(models.Rendition.size), 0)
+        ).filter(models.Rendition.content_hash.in_(self.pinned_hashes())).one()
+
+        return {
+            "items": items,
+            "bytes": total,
+            "budget": self.budget_bytes,
+            "pinned_items": pinned_items,
+            "pinned_bytes": pinned_bytes,
+            "oldest_access": oldest.isoformat() if oldest else None,
+            "evictions": self._evictions
+        }
+
+def ensure_renditions(media_items: List[models.Media], db: Session) -> int:
+    """Render again any evicted renditions before they are published; returns how many media were rendered"""
+    from app.services.ingest import generate_renditions, release_source
+    from app.services.storage import storage
+
+    rendered = 0
+    for media in media_items:
+        manifest = media.processed_urls or {}
+        if rendition_cache.is_complete(manifest):
+            rendition_cache.touch(manifest, db)
+            continue
+
+        generate_renditions(media.id, db)
+        rendered += 1
+        file_record = storage.get_file_by_url(media.file_url, db)
+        if file_record:
+            release_source(file_record)
+    return rendered
+
+def prerender_pinned(db: Session) -> Dict:
+    """Render evicted renditions of media in posts entering the pin window, ahead of publishing"""
+    report = {"checked": 0, "rendered": 0, "failed": 0}
+    for media in rendition_cache.pinned_media(db):
+        report["checked"] += 1
+        try:
+            report["rendered"] += ensure_renditions([media], db)
+        except Exception as e:
+            db.rollback()
+            report["failed"] += 1
+            logger.warning(f"Could not prerender renditions of media {media.id}: {str(e)}")
+    return report
+
+rendition_cache = RenditionCache(
+    cache_dir=settings.RENDITION_CACHE_DIR,
+    budget_bytes=settings.RENDITION_CACHE_BYTES,
+    pin_days=settings.RENDITION_PIN_DAYS
+)
\ No newline at end of file
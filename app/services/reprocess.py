@@ -0,0 +1,168 @@
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import Session
+from app import models
+from app.config import settings
+from app.models.post import PostStatus
+from app.services.ingest import generate_renditions, release_source
+from app.services.media_processing import MediaProcessor, WEB_VARIANT_PREFIX, rendition_spec_hash
+from app.services.storage import storage
+
+logger = logging.getLogger(__name__)
+
+# Composites are not listed: their spec is part of their file name
+REPROCESSED_KINDS = ("image", "video", "thumbnail", WEB_VARIANT_PREFIX)
+
+def current_spec_hashes() -> Set[str]:
+    hashes = {rendition_spec_hash("thumbnail"), rendition_spec_hash(WEB_VARIANT_PREFIX)}
+    for platform in MediaProcessor.PLATFORM_SPECS:
+        hashes.add(rendition_spec_hash("image", platform))
+        hashes.add(rendition_spec_hash("video", platform))
+    return hashes
+
+def stale_spec_hashes(db: Session) -> List[str]:
+    """Spec hashes in the renditions table that no current spec produces.
+
+    There are only a handful of distinct values, read off the spec_hash
+    index, so every later query can match stale rows with IN.
+    """
+    rendered = {
+        spec_hash for (spec_hash,) in
+        db.query(models.Rendition.spec_hash).filter(models.Rendition.spec_hash.isnot(None)).distinct()
+    }
+    return sorted(rendered - current_spec_hashes())
+
+def _stale(stale_hashes: List[str]):
+    return and_(
+        models.Rendition.kind.in_(REPROCESSED_KINDS),
+        or_(models.Rendition.spec_hash.in_(stale_hashes), models.Rendition.spec_hash.is_(None))
+    )
+
+def _unpublished():
+    """Media not in a published post; published renditions are never needed again"""
+    return ~(
+        select(models.Post.id)
+        .where(models.Post.grouping_id == models.Media.grouping_id, models.Post.status == PostStatus.published)
+        .exists()
+    )
+
+def stale_content_hashes(
+    db: Session,
+    stale_hashes: List[str],
+    after: Optional[str] = None,
+    limit: int = 50
+) -> List[str]:
+    """Next sources past after (keyset) with a stale rendition and unpublished media"""
+    wanted = (
+        select(models.Media.id)
+        .where(models.Media.content_hash == models.Rendition.content_hash, _unpublished())
+        .exists()
+    )
+    query = db.query(models.Rendition.content_hash).filter(_stale(stale_hashes), wanted)
+    if after:
+        query = query.filter(models.Rendition.content_hash > after)
+    return [
+        content_hash for (content_hash,) in
+        query.distinct().order_by(models.Rendition.content_hash).limit(limit)
+    ]
+
+def reprocess_source(content_hash: str, stale_hashes: List[str], db: Session) -> int:
+    """Delete one source's stale renditions and render them again; returns how many"""
+    media = (
+        db.query(models.Media)
+        .filter(models.Media.content_hash == content_hash, _unpublished())
+        .order_by(models.Media.id)
+        .first()
+    )
+    stale = db.query(models.Rendition).filter(
+        models.Rendition.content_hash == content_hash,
+        _stale(stale_hashes)
+    ).all()
+    if media is None or not stale:
+        return 0
+
+    # Until they are rendered again, publishing renders them on demand (ensure_renditions)
+    cache_dir = Path(settings.RENDITION_CACHE_DIR)
+    for rendition in stale:
+        try:
+            os.remove(cache_dir / rendition.key)
+        except FileNotFoundError:
+            pass
+        db.delete(rendition)
+    db.commit()
+
+    generate_renditions(media.id, db)
+    file_record = storage.get_file_by_url(media.file_url, db)
+    if file_record:
+        release_source(file_record)
+    return len(stale)
+
+def reprocess_stale(
+    session_factory: Callable[[], Session],
+    batch_size: int = 50,
+    workers: int = settings.RENDITION_REPROCESS_WORKERS,
+    max_batches: Optional[int] = None,
+    after: Optional[str] = None,
+    dry_run: bool = False,
+    progress: Optional[Callable[[Dict], None]] = None
+) -> Dict:
+    """Render again every rendition made with an outdated spec.
+
+    Sources are walked in content hash order, batch_size at a time, and
+    each batch is rendered by workers threads with a session apiece.
+    Rendered sources drop out of the stale set, so running again resumes
+    where an interrupted run stopped; pass the reported cursor as after
+    to also skip sources that keep failing. progress gets the report
+    after every batch.
+    """
+    with session_factory() as db:
+        stale_hashes = stale_spec_hashes(db)
+    report = {
+        "dry_run": dry_run,
+        "batches": 0,
+        "sources": 0,
+        "renditions": 0,
+        "failed": 0,
+        "cursor": after
+    }
+
+    def reprocess(content_hash: str) -> Optional[int]:
+        with session_factory() as db:
+            try:
+                return reprocess_source(content_hash, stale_hashes, db)
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Failed to reprocess renditions of {content_hash}: {str(e)}")
+                return None
+
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+        while max_batches is None or report["batches"] < max_batches:
+            with session_factory() as db:
+                batch = stale_content_hashes(db, stale_hashes, after=report["cursor"], limit=batch_size)
+                if dry_run and batch:
+                    report["renditions"] += db.query(models.Rendition).filter(
+                        models.Rendition.content_hash.in_(batch),
+                        _stale(stale_hashes)
+                    ).count()
+            if not batch:
+                break
+
+            if dry_run:
+                report["sources"] += len(batch)
+            else:
+                for count in pool.map(reprocess, batch):
+                    if count is None:
+                        report["failed"] += 1
+                    else:
+                        report["sources"] += 1
+                        report["renditions"] += count
+            report["batches"] += 1
+            report["cursor"] = batch[-1]
+            if progress:
+                progress(dict(report))
+
+    return report
\ No newline at end of file
@@ -0,0 +1,253 @@
+import os
+import shutil
+import tempfile
+import uuid
+import logging
+import aiofiles
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import AsyncIterator, BinaryIO, List
+from fastapi import UploadFile, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import or_, and_
+from sqlalchemy.orm import Session
+from app import models
+from app.config import settings
+from app.schemas.media import MediaCreate, UploadSessionCreate, UploadSessionOut
+from app.services.media import accepted_response, handle_upload_and_create_media
+from app.services.storage import storage
+
+DEFAULT_CHUNK_SIZE = 5 * 1024 * 1024  # 5MB: roughly one LTE hiccup's worth of retry
+MIN_CHUNK_SIZE = 256 * 1024
+MAX_CHUNK_SIZE = 16 * 1024 * 1024
+COPY_BUFFER_SIZE = 1024 * 1024
+# A completion still "finalizing" after this long died mid-way; another may claim the session
+FINALIZE_TIMEOUT = timedelta(minutes=15)
+
+logger = logging.getLogger(__name__)
+
+def _session_dir(upload: models.UploadSession) -> Path:
+    return Path(settings.UPLOAD_SESSION_DIR) / upload.id
+
+def _part_path(upload: models.UploadSession, index: int) -> Path:
+    return _session_dir(upload) / f"{index}.part"
+
+def _expected_chunk_length(upload: models.UploadSession, index: int) -> int:
+    if index == upload.total_chunks - 1:
+        return upload.total_size - index * upload.chunk_size
+    return upload.chunk_size
+
+def create_upload_session(
+    data: UploadSessionCreate,
+    user: models.User,
+    db: Session
+) -> models.UploadSession:
+    """Start a resumable upload"""
+    if not 0 < data.total_size <= storage.max_file_size:
+        raise HTTPException(
+            status_code=413,
+            detail=f"File size exceeds maximum limit of {storage.max_file_size/1024/1024}MB"
+        )
+
+    chunk_size = data.chunk_size or DEFAULT_CHUNK_SIZE
+    if not MIN_CHUNK_SIZE <= chunk_size <= MAX_CHUNK_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Chunk size must be between {MIN_CHUNK_SIZE} and {MAX_CHUNK_SIZE} bytes"
+        )
+
+    media_data = MediaCreate(**data.dict(exclude={"filename", "total_size", "chunk_size"}))
+    upload = models.UploadSession(
+        id=str(uuid.uuid4()),
+        user_id=user.id,
+        filename=data.filename,
+        total_size=data.total_size,
+        chunk_size=chunk_size,
+        media_data=media_data.dict(),
+        status="open"
+    )
+    db.add(upload)
+    db.commit()
+    db.refresh(upload)
+
+    _session_dir(upload).mkdir(parents=True, exist_ok=True)
+    return upload
+
+def get_upload_session(upload_id: str, user: models.User, db: Session) -> models.UploadSession:
+    upload = db.query(models.UploadSession).filter_by(id=upload_id, user_id=user.id).first()
+    if not upload:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return upload
+
+def get_received_chunks(upload: models.UploadSession) -> List[int]:
+    """Chunk indexes already on disk"""
+    return [
+        index for index in range(upload.total_chunks)
+        if _part_path(upload, index).exists()
+    ]
+
+def upload_session_status(upload: models.UploadSession) -> UploadSessionOut:
+    received = get_received_chunks(upload)
+    received_set = set(received)
+
+    # Offset up to the first gap, for clients that resume sequentially
+    received_offset = 0
+    for index in range(upload.total_chunks):
+        if index not in received_set:
+            break
+        received_offset += _expected_chunk_length(upload, index)
+
+    return UploadSessionOut(
+        upload_id=upload.id,
+        filename=upload.filename,
+        total_size=upload.total_size,
+        chunk_size=upload.chunk_size,
+        total_chunks=upload.total_chunks,
+        received_chunks=received,
+        missing_chunks=[i for i in range(upload.total_chunks) if i not in received_set],
+        received_offset=received_offset,
+        status=upload.status,
+        media_id=upload.media_id
+    )
+
+async def write_chunk(
+    upload: models.UploadSession,
+    index: int,
+    body: AsyncIterator[bytes],
+    db: Session
+):
+    """Stream one chunk to disk; re-sending a chunk replaces it"""
+    if upload.status != "open":
+        raise HTTPException(status_code=409, detail=f"Upload session is already {upload.status}")
+    if not 0 <= index < upload.total_chunks:
+        raise HTTPException(status_code=400, detail=f"Chunk index must be between 0 and {upload.total_chunks - 1}")
+
+    expected = _expected_chunk_length(upload, index)
+    part_path = _part_path(upload, index)
+    part_path.parent.mkdir(parents=True, exist_ok=True)
+
+    # Write to a temp name so an interrupted PUT never looks like a received chunk
+    fd, tmp_path = tempfile.mkstemp(dir=part_path.parent, prefix=f".{index}-")
+    os.close(fd)
+    try:
+        received = 0
+        async with aiofiles.open(tmp_path, "wb") as f:
+            async for data in body:
+                received += len(data)
+                if received > expected:
+                    raise HTTPException(status_code=400, detail=f"Chunk {index} must be {expected} bytes")
+                await f.write(data)
+
+        if received != expected:
+            raise HTTPException(status_code=400, detail=f"Chunk {index} must be {expected} bytes")
+        os.replace(tmp_path, part_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    # Touch the session so stale-upload cleanup sees activity
+    upload.updated_at = datetime.utcnow()
+    db.commit()
+
+def _assemble_parts(upload: models.UploadSession, assembled: BinaryIO):
+    for index in range(upload.total_chunks):
+        with open(_part_path(upload, index), "rb") as part:
+            shutil.copyfileobj(part, assembled, COPY_BUFFER_SIZE)
+    assembled.seek(0)
+
+async def finalize_upload_session(
+    upload: models.UploadSession,
+    user: models.User,
+    db: Session
+) -> dict:
+    """Assemble the chunks and hand them to the regular upload flow.
+
+    The session moves open -> finalizing with a conditional UPDATE before
+    anything is assembled, so of two concurrent completions only one
+    creates media; repeating a finished completion returns its result.
+    A failed completion moves the session back to open, and one left
+    finalizing for FINALIZE_TIMEOUT (the process died) can be claimed again.
+    """
+    if upload.status == "completed":
+        return _completed_response(upload, db)
+
+    missing = [i for i in range(upload.total_chunks) if not _part_path(upload, i).exists()]
+    if missing:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "Upload is missing chunks", "missing_chunks": missing}
+        )
+
+    now = datetime.utcnow()
+    claimed = db.query(models.UploadSession).filter(
+        models.UploadSession.id == upload.id,
+        or_(
+            models.UploadSession.status == "open",
+            and_(
+                models.UploadSession.status == "finalizing",
+                models.UploadSession.updated_at < now - FINALIZE_TIMEOUT
+            )
+        )
+    ).update(
+        {models.UploadSession.status: "finalizing", models.UploadSession.updated_at: now},
+        synchronize_session=False
+    )
+    db.commit()
+    db.refresh(upload)
+    if not claimed:
+        if upload.status == "completed":
+            return _completed_response(upload, db)
+        raise HTTPException(status_code=409, detail=f"Upload session is already {upload.status}")
+
+    session_dir = _session_dir(upload)
+    completed = False
+    try:
+        with tempfile.TemporaryFile(dir=session_dir) as assembled:
+            await run_in_threadpool(_assemble_parts, upload, assembled)
+
+            result = await handle_upload_and_create_media(
+                UploadFile(file=assembled, filename=upload.filename, size=upload.total_size),
+                MediaCreate(**upload.media_data),
+                user,
+                db
+            )
+
+        upload.status = "completed"
+        upload.media_id = result["media_id"]
+        db.commit()
+        completed = True
+    finally:
+        if not completed:
+            # Let the client fix the cause and complete again
+            _release_claim(upload, db)
+
+    shutil.rmtree(session_dir, ignore_errors=True)
+    return result
+
+def _release_claim(upload: models.UploadSession, db: Session):
+    """Move a session this request claimed back to open"""
+    try:
+        db.rollback()
+        db.query(models.UploadSession).filter_by(id=upload.id, status="finalizing").update(
+            {models.UploadSession.status: "open"},
+            synchronize_session=False
+        )
+        db.commit()
+        db.refresh(upload)
+    except Exception as e:
+        # FINALIZE_TIMEOUT frees the session instead
+        db.rollback()
+        logger.warning(f"Could not reopen upload session {upload.id}: {str(e)}")
+
+def _completed_response(upload: models.UploadSession, db: Session) -> dict:
+    """The 202 body of the completion that created the session's media"""
+    media = db.query(models.Media).filter_by(id=upload.media_id).first()
+    if not media:
+        raise HTTPException(status_code=404, detail="Media for this upload no longer exists")
+    return {"message": "Media uploaded; processing has been queued", **accepted_response(media)}
+
+def discard_upload_session(upload: models.UploadSession, db: Session):
+    """Drop a session and any chunks received so far"""
+    shutil.rmtree(_session_dir(upload), ignore_errors=True)
+    db.delete(upload)
+    db.commit()
\ No newline at end of file
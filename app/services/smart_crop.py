@@ -0,0 +1,76 @@
+from typing import Dict, List, Tuple
+import numpy as np
+
+# Crop shapes precomputed for every image, as width / height
+CROP_ASPECTS = {
+    "1:1": 1.0,
+    "4:5": 4 / 5,
+    "9:16": 9 / 16,
+    "1.91:1": 1.91
+}
+CENTER_TOLERANCE = 0.02  # Windows within this share of the best energy count as ties
+
+Box = Tuple[float, float, float, float]  # left, top, right, bottom as fractions of the image
+
+def energy_map(pixels: np.ndarray) -> np.ndarray:
+    """Gradient magnitude of a grayscale array.
+
+    Edges and texture (people, tools, finished work) score high;
+    sky, walls and blown-out areas score near zero.
+    """
+    energy = np.zeros_like(pixels)
+    energy[:, :-1] += np.abs(np.diff(pixels, axis=1))
+    energy[:-1, :] += np.abs(np.diff(pixels, axis=0))
+    return energy
+
+def integral_image(energy: np.ndarray) -> np.ndarray:
+    """Summed-area table with a zero first row and column"""
+    table = np.zeros((energy.shape[0] + 1, energy.shape[1] + 1), dtype=np.float64)
+    table[1:, 1:] = energy.cumsum(axis=0).cumsum(axis=1)
+    return table
+
+def best_crop(table: np.ndarray, aspect: float) -> Box:
+    """Largest crop of the given aspect holding the most energy.
+
+    The crop spans the image's full height or width, so only its offset
+    along the other axis varies; every offset's energy is read off the
+    summed-area table at once. Near-ties go to the most central window.
+    """
+    height, width = table.shape[0] - 1, table.shape[1] - 1
+    if width / height > aspect:
+        size = min(max(round(height * aspect), 1), width)
+        # Energy of every full-height window [x, x + size)
+        sums = table[height, size:] - table[height, :width - size + 1]
+        offset = _central_best(sums)
+        return (offset / width, 0.0, (offset + size) / width, 1.0)
+
+    size = min(max(round(width / aspect), 1), height)
+    sums = table[size:, width] - table[:height - size + 1, width]
+    offset = _central_best(sums)
+    return (0.0, offset / height, 1.0, (offset + size) / height)
+
+def _central_best(sums: np.ndarray) -> int:
+    ties = np.flatnonzero(sums >= sums.max() * (1 - CENTER_TOLERANCE))
+    center = (len(sums) - 1) / 2
+    return int(ties[np.argmin(np.abs(ties - center))])
+
+def centered_crop(size: Tuple[int, int], aspect: float) -> Box:
+    """The crop used when no smart crop was computed"""
+    width, height = size
+    if width / height > aspect:
+        share = height * aspect / width
+        return ((1 - share) / 2, 0.0, (1 + share) / 2, 1.0)
+    share = width / aspect / height
+    return (0.0, (1 - share) / 2, 1.0, (1 + share) / 2)
+
+def compute_crops(pixels: np.ndarray) -> Dict[str, List[float]]:
+    """Best box for every CROP_ASPECTS shape, stored as Media.metadata["crops"].
+
+    Boxes are fractions of the image, so they apply to the original and
+    to every rendition alike.
+    """
+    table = integral_image(energy_map(pixels))
+    return {
+        name: [round(edge, 4) for edge in best_crop(table, aspect)]
+        for name, aspect in CROP_ASPECTS.items()
+    }
\ No newline at end of file
@@ -1,9 +1,14 @@
+import logging
 from typing import List, Dict, Optional
 from sqlalchemy.orm import Session
 import requests
 from app.models import Media, SocialAccount
 from app.config import settings
 from app.core.cache import cache_get, cache_set
+from fastapi.concurrency import run_in_threadpool
+from app.services.rendition_cache import ensure_renditions
+
+logger = logging.getLogger(__name__)
 
 class InstagramAPI:
     def __init__(self, access_token: str):
@@ -134,6 +139,12 @@ async def post_to_instagram(db: Session, media_grouping_id: int, caption: str) -
     if not account:
         raise ValueError("Instagram account not connected")
 
+    # prerender_pinned_renditions renders evicted renditions ahead of the post;
+    # this only catches a post published before it got to them
+    rendered = await run_in_threadpool(ensure_renditions, media_items, db)
+    if rendered:
+        logger.warning(f"Rendered {rendered} media inline while publishing grouping {media_grouping_id}")
+
     # Create and publish post
     instagram_api = InstagramAPI(account.access_token)
     post = InstagramPost(media_items, caption)
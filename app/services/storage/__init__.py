@@ -0,0 +1,14 @@
+from .base import StorageBackend, BlobStat, shard_path
+from .registry import get_backend
+from .media_storage import MediaStorage, storage, UPLOAD_CHUNK_SIZE, MIME_SNIFF_BYTES
+
+__all__ = [
+    "StorageBackend",
+    "BlobStat",
+    "shard_path",
+    "get_backend",
+    "MediaStorage",
+    "storage",
+    "UPLOAD_CHUNK_SIZE",
+    "MIME_SNIFF_BYTES"
+]
\ No newline at end of file
@@ -0,0 +1,92 @@
+from abc import ABC, abstractmethod
+from typing import BinaryIO, Dict, Iterator, NamedTuple, Optional
+from sqlalchemy.orm import Session
+
+class BlobStat(NamedTuple):
+    size: int
+    content_type: Optional[str] = None
+    checksum_sha256: Optional[str] = None  # base64, when the backend verified one
+
+def shard_path(content_hash: str) -> str:
+    """Spread blobs over 65536 directories: ab/cd/abcd..."""
+    return f"{content_hash[:2]}/{content_hash[2:4]}/{content_hash}"
+
+class StorageBackend(ABC):
+    """Where media bytes live.
+
+    Backends only move bytes; the MediaFile row (hash, reference count,
+    content type) is kept in the database whichever backend holds the
+    payload. Methods take the request's session for backends that store
+    blobs in the database and ignore it otherwise.
+    """
+
+    name = ""
+    chunk_size: Optional[int] = None  # Set by backends that store fixed-size chunks
+    direct_uploads = False  # Clients can upload with a presign_upload form
+
+    @abstractmethod
+    def key_for(self, file_id: str, content_hash: str) -> str:
+        """Storage key for a new blob.
+
+        Unique to the MediaFile row, never shared by two rows over time:
+        the GC unlinks a purged row's blob after committing, and a
+        re-upload of the same bytes in between must not land on it.
+        """
+        raise NotImplementedError
+
+    def upload_key(self, owner: str, content_hash: str) -> str:
+        """Key one user uploads a blob to directly, so nobody else can confirm it"""
+        return f"uploads/{owner}/{shard_path(content_hash)}"
+
+    @abstractmethod
+    def put(self, key: str, file: BinaryIO, content_type: str, db: Optional[Session] = None):
+        """Store the contents of a file object under key"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def stream(
+        self,
+        key: str,
+        start: int = 0,
+        end: Optional[int] = None,
+        db: Optional[Session] = None
+    ) -> Iterator[bytes]:
+        """Yield bytes start..end (inclusive) of a stored blob"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, key: str, db: Optional[Session] = None):
+        """Remove a blob; missing blobs are not an error"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def stat(self, key: str, db: Optional[Session] = None) -> Optional[BlobStat]:
+        """Size of a stored blob, or None if it does not exist"""
+        raise NotImplementedError
+
+    def copy(self, src: str, dst: str):
+        """Copy a blob within the backend; needed by backends with direct_uploads"""
+        raise NotImplementedError
+
+    def presign(self, key: str, expires_in: int = 3600) -> Optional[str]:
+        """Time-limited URL clients can fetch directly, if the backend has one"""
+        return None
+
+    def presign_upload(
+        self,
+        key: str,
+        content_type: str,
+        max_size: int,
+        checksum_sha256: str,
+        expires_in: int = 900
+    ) -> Optional[Dict]:
+        """Form URL and fields for a direct browser/client upload, if supported"""
+        return None
+
+    def read_head(self, key: str, length: int, db: Optional[Session] = None) -> bytes:
+        """First bytes of a blob, e.g. for MIME sniffing"""
+        return b"".join(self.stream(key, 0, length - 1, db))
+
+    def local_path(self, key: str) -> Optional[str]:
+        """Path on local disk, for zero-copy serving, if the backend has one"""
+        return None
\ No newline at end of file
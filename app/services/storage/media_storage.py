@@ -0,0 +1,449 @@
+import re
+import uuid
+import logging
+import base64
+import hashlib
+import magic
+from datetime import datetime
+from fastapi import UploadFile, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app import models
+from app.services.media_cache import media_cache
+from app.services.storage.base import StorageBackend
+from app.services.storage.registry import get_backend
+from typing import Dict, Iterator, List, Optional, Tuple
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB
+MIME_SNIFF_BYTES = 2048  # libmagic only needs the file header
+
+logger = logging.getLogger(__name__)
+
+class MediaStorage:
+    """Content-addressed media files on top of a pluggable storage backend"""
+
+    def __init__(self):
+        self.max_file_size = 50 * 1024 * 1024  # 50MB limit
+        self.chunk_size = UPLOAD_CHUNK_SIZE
+        self.allowed_types = [
+            'image/jpeg', 'image/png', 'image/gif', 'image/webp',
+            'video/mp4', 'video/quicktime', 'video/webm'
+        ]
+
+    async def upload_file(self, file: UploadFile, db: Session, commit: bool = True) -> str:
+        """Stream an upload into storage and return its URL.
+
+        Blobs are content-addressed: if identical bytes are already stored,
+        the existing record gains a reference instead of a new copy. With
+        commit=False the record is only flushed, so callers can batch
+        several uploads into one transaction.
+        """
+        content_type, file_size, content_hash = await self.inspect_upload(file)
+
+        file_id = self._add_reference(content_hash, db, commit)
+        if file_id:
+            return f"/api/media/files/{file_id}"
+
+        # Generate unique filename
+        file_id = str(uuid.uuid4())
+        file_extension = self._get_extension(file.filename or "file")
+        filename = f"{file_id}{file_extension}"
+        backend = get_backend()
+
+        # Create file record in database
+        file_record = models.MediaFile(
+            id=file_id,
+            filename=filename,
+            original_filename=file.filename,
+            content_type=content_type,
+            file_size=file_size,
+            chunk_size=backend.chunk_size,
+            content_hash=content_hash,
+            ref_count=1,
+            storage_backend=backend.name,
+            storage_key=backend.key_for(file_id, content_hash)
+        )
+
+        # A savepoint lets one failed file roll back without the batch
+        savepoint = db.begin_nested()
+        try:
+            db.add(file_record)
+            db.flush()
+            # Backend writes are blocking I/O; keep them off the event loop
+            await run_in_threadpool(
+                backend.put, file_record.storage_key, file.file, content_type, db
+            )
+            savepoint.commit()
+        except IntegrityError:
+            # A concurrent upload stored the same bytes first
+            savepoint.rollback()
+            file_id = self._add_reference(content_hash, db, commit)
+            if not file_id:
+                raise
+        except Exception:
+            savepoint.rollback()
+            raise
+
+        if commit:
+            db.commit()
+        return f"/api/media/files/{file_id}"
+
+    async def inspect_upload(self, file: UploadFile) -> Tuple[str, int, str]:
+        """Validate an upload chunk by chunk.
+
+        Sniffs the MIME type from the first chunk only, enforces the size
+        limit as bytes arrive and hashes the content on the way through, so
+        memory use is bounded by the chunk size. Returns
+        (content_type, file_size, sha256 hex digest) and rewinds the file.
+        """
+        await file.seek(0)
+        digest = hashlib.sha256()
+        file_size = 0
+        content_type = None
+
+        while True:
+            chunk = await file.read(self.chunk_size)
+            if not chunk:
+                break
+
+            # Validate file type from the header
+            if content_type is None:
+                content_type = magic.from_buffer(chunk[:MIME_SNIFF_BYTES], mime=True)
+                if content_type not in self.allowed_types:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"File type {content_type} not allowed"
+                    )
+
+            # Validate file size before hashing any further
+            file_size += len(chunk)
+            if file_size > self.max_file_size:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"File size exceeds maximum limit of {self.max_file_size/1024/1024}MB"
+                )
+
+            digest.update(chunk)
+
+        if content_type is None:
+            raise HTTPException(status_code=400, detail="Empty file")
+
+        await file.seek(0)
+        return content_type, file_size, digest.hexdigest()
+
+    def presign_upload(
+        self,
+        content_hash: str,
+        content_type: str,
+        file_size: int,
+        user_id: int,
+        db: Session,
+        expires_in: int = 900
+    ) -> dict:
+        """Form for uploading straight to the bucket, to a key private to the user.
+
+        If the user already has media with these bytes they can skip the
+        upload and go straight to confirming it. Everyone else uploads,
+        so the response never tells whether other users stored the file.
+        """
+        self._validate_content_hash(content_hash)
+        if content_type not in self.allowed_types:
+            raise HTTPException(
+                status_code=400,
+                detail=f"File type {content_type} not allowed"
+            )
+        if file_size > self.max_file_size:
+            raise HTTPException(
+                status_code=413,
+                detail=f"File size exceeds maximum limit of {self.max_file_size/1024/1024}MB"
+            )
+
+        if self._owned_file_id(content_hash, user_id, db):
+            return {"exists": True}
+
+        backend = get_backend()
+        form = backend.presign_upload(
+            backend.upload_key(str(user_id), content_hash),
+            content_type,
+            self.max_file_size,
+            base64.b64encode(bytes.fromhex(content_hash)).decode(),
+            expires_in
+        )
+        if form is None:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Storage backend {backend.name} does not support direct uploads"
+            )
+
+        return {
+            "exists": False,
+            "url": form["url"],
+            "fields": form["fields"],
+            "expires_in": expires_in
+        }
+
+    def register_uploaded_object(
+        self,
+        content_hash: str,
+        filename: Optional[str],
+        user_id: int,
+        db: Session,
+        commit: bool = True
+    ) -> str:
+        """Validate an object a client uploaded directly and record it.
+
+        Checks the size and checksum with a HEAD and sniffs the MIME type
+        from a ranged GET of the header, so the bytes never pass through
+        the API. Rejected objects are removed from the bucket. Only bytes
+        the user already has media for, or uploaded to their own key,
+        are accepted; a known SHA-256 alone never grants another user's
+        blob.
+        """
+        self._validate_content_hash(content_hash)
+
+        if self._owned_file_id(content_hash, user_id, db):
+            file_id = self._add_reference(content_hash, db, commit)
+            if file_id:
+                return f"/api/media/files/{file_id}"
+
+        backend = get_backend()
+        if not backend.direct_uploads:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Storage backend {backend.name} does not support direct uploads"
+            )
+        file_id = str(uuid.uuid4())
+        staging_key = backend.upload_key(str(user_id), content_hash)
+
+        blob = backend.stat(staging_key)
+        if blob is None:
+            raise HTTPException(status_code=404, detail="Uploaded object not found")
+
+        # Only this user's presigned form can write this key, and the form
+        # makes S3 enforce the checksum, so an object here proves they hold the bytes
+        expected_checksum = base64.b64encode(bytes.fromhex(content_hash)).decode()
+        if blob.checksum_sha256 and blob.checksum_sha256 != expected_checksum:
+            backend.delete(staging_key)
+            raise HTTPException(status_code=400, detail="Uploaded object does not match its SHA-256")
+
+        if blob.size > self.max_file_size:
+            backend.delete(staging_key)
+            raise HTTPException(
+                status_code=413,
+                detail=f"File size exceeds maximum limit of {self.max_file_size/1024/1024}MB"
+            )
+
+        content_type = magic.from_buffer(backend.read_head(staging_key, MIME_SNIFF_BYTES), mime=True)
+        if content_type not in self.allowed_types:
+            backend.delete(staging_key)
+            raise HTTPException(
+                status_code=400,
+                detail=f"File type {content_type} not allowed"
+            )
+
+        # Stored by someone else: reference that copy and drop this one
+        existing_id = self._add_reference(content_hash, db, commit)
+        if existing_id:
+            backend.delete(staging_key)
+            return f"/api/media/files/{existing_id}"
+
+        file_record = models.MediaFile(
+            id=file_id,
+            filename=f"{file_id}{self._get_extension(filename or 'file')}",
+            original_filename=filename,
+            content_type=content_type,
+            file_size=blob.size,
+            chunk_size=backend.chunk_size,
+            content_hash=content_hash,
+            ref_count=1,
+            storage_backend=backend.name,
+            storage_key=backend.key_for(file_id, content_hash)
+        )
+
+        savepoint = db.begin_nested()
+        try:
+            db.add(file_record)
+            db.flush()
+            # The staging key is reused by the user's next upload of these
+            # bytes, so the record gets a key of its own (see key_for)
+            backend.copy(staging_key, file_record.storage_key)
+            savepoint.commit()
+        except IntegrityError:
+            # Confirmed concurrently by another request
+            savepoint.rollback()
+            file_id = self._add_reference(content_hash, db, commit)
+            if not file_id:
+                raise
+        except Exception:
+            savepoint.rollback()
+            raise
+        backend.delete(staging_key)
+
+        if commit:
+            db.commit()
+        return f"/api/media/files/{file_id}"
+
+    def delete_file(self, file_url: str, db: Session):
+        """Drop a reference to a file, deleting the blob with its last one"""
+        try:
+            # Extract file ID from URL
+            file_id = file_url.split("/")[-1]
+
+            db.query(models.MediaFile).filter_by(id=file_id).update(
+                {models.MediaFile.ref_count: models.MediaFile.ref_count - 1},
+                synchronize_session=False
+            )
+            orphaned = db.query(models.MediaFile).filter(
+                models.MediaFile.id == file_id,
+                models.MediaFile.ref_count <= 0
+            ).first()
+
+            if orphaned:
+                self.purge_file(orphaned, db)
+            else:
+                db.commit()
+
+        except Exception as e:
+            db.rollback()
+            raise Exception(f"Failed to delete file: {str(e)}")
+
+    def purge_file(self, file_record: models.MediaFile, db: Session):
+        """Delete a file record and its blob regardless of its reference count"""
+        backend = self.backend_for(file_record)
+        storage_key = file_record.storage_key
+        media_cache.invalidate(file_record.id, file_record.content_hash)
+        if backend.name == "database":
+            # Chunk rows go in the same transaction as the record
+            backend.delete(storage_key, db)
+        db.delete(file_record)
+        db.commit()
+
+        # External blobs are only removed once the record is gone
+        if backend.name != "database":
+            backend.delete(storage_key)
+
+    def discard_rolled_back(self, blobs: Dict[str, Tuple[str, str]], db: Session):
+        """Delete the blobs, given as {file_id: (backend, key)}, of records a rollback undid.
+
+        A blob outside the database is not part of the transaction, so
+        the rolled-back insert of its record would leave it with no row.
+        Blob keys are unique to a record, so no other upload can be using
+        them. If the database cannot say which records survived, nothing
+        is deleted and the keys are logged.
+        """
+        try:
+            kept = {
+                file_id for file_id, in
+                db.query(models.MediaFile.id).filter(models.MediaFile.id.in_(list(blobs)))
+            }
+        except Exception as e:
+            db.rollback()
+            keys = [storage_key for _, storage_key in blobs.values()]
+            logger.warning(f"Could not check which uploaded blobs to delete, keeping {keys}: {str(e)}")
+            return
+
+        for file_id, (backend_name, storage_key) in blobs.items():
+            if file_id in kept or backend_name == "database":
+                continue
+            try:
+                get_backend(backend_name).delete(storage_key)
+            except Exception as e:
+                logger.warning(f"Could not delete blob {storage_key}: {str(e)}")
+
+    def get_file(self, file_id: str, db: Session) -> Optional[models.MediaFile]:
+        """Get file metadata from database (never loads blob bytes)"""
+        return db.query(models.MediaFile).filter_by(id=file_id).first()
+
+    def get_file_by_url(self, file_url: str, db: Session) -> Optional[models.MediaFile]:
+        """File record behind a Media.file_url"""
+        return self.get_file(file_url.split("/")[-1], db)
+
+    def content_types_by_url(self, file_urls: List[str], db: Session) -> Dict[str, str]:
+        """Content type of the file behind each Media.file_url, in one query"""
+        ids = {file_url.split("/")[-1]: file_url for file_url in file_urls}
+        rows = db.query(models.MediaFile.id, models.MediaFile.content_type).filter(
+            models.MediaFile.id.in_(list(ids))
+        )
+        return {ids[file_id]: content_type for file_id, content_type in rows}
+
+    def get_file_by_hash(self, content_hash: str, db: Session) -> Optional[models.MediaFile]:
+        """Get file record by its SHA-256 content hash"""
+        return db.query(models.MediaFile).filter_by(content_hash=content_hash).first()
+
+    def backend_for(self, file_record: models.MediaFile) -> StorageBackend:
+        """Backend holding a file's bytes"""
+        return get_backend(file_record.storage_backend)
+
+    def stream_file(
+        self,
+        file_record: models.MediaFile,
+        db: Session,
+        start: int = 0,
+        end: Optional[int] = None
+    ) -> Iterator[bytes]:
+        """Yield a stored file's bytes start..end (inclusive)"""
+        return self.backend_for(file_record).stream(file_record.storage_key, start, end, db)
+
+    def read_file(self, file_record: models.MediaFile, db: Session) -> bytes:
+        """Whole file through the read-through cache (small files only)"""
+        return media_cache.get_or_load(
+            file_record.id,
+            file_record.content_hash,
+            lambda: b"".join(self.stream_file(file_record, db))
+        )
+
+    def is_cacheable(self, file_record: models.MediaFile) -> bool:
+        """Worth caching: small, and not already on local disk or a CDN-able bucket"""
+        backend = self.backend_for(file_record)
+        return (
+            file_record.file_size <= media_cache.max_item_size
+            and backend.local_path(file_record.storage_key) is None
+            and backend.presign(file_record.storage_key) is None
+        )
+
+    def _owned_file_id(self, content_hash: str, user_id: int, db: Session) -> Optional[str]:
+        """ID of the blob with these bytes if the user already has media for it"""
+        file_id = db.query(models.MediaFile.id).filter_by(content_hash=content_hash).scalar()
+        if file_id is None:
+            return None
+        owned = db.query(models.Media.id).filter_by(
+            file_url=f"/api/media/files/{file_id}",
+            user_id=user_id
+        ).first()
+        return file_id if owned else None
+
+    def _add_reference(self, content_hash: str, db: Session, commit: bool = True) -> Optional[str]:
+        """Count one more reference to an existing blob and return its ID"""
+        file_id = db.query(models.MediaFile.id).filter_by(content_hash=content_hash).scalar()
+        if file_id is None:
+            return None
+
+        # The timestamp keeps the garbage collector off the blob until the
+        # caller's Media row (often committed separately) points at it
+        updated = db.query(models.MediaFile).filter_by(id=file_id).update(
+            {
+                models.MediaFile.ref_count: models.MediaFile.ref_count + 1,
+                models.MediaFile.last_referenced_at: datetime.utcnow()
+            },
+            synchronize_session=False
+        )
+        if not updated:
+            # Purged (e.g. by the garbage collector) since the lookup
+            return None
+        if commit:
+            db.commit()
+        return file_id
+
+    def _validate_content_hash(self, content_hash: str):
+        if not re.fullmatch(r"[0-9a-f]{64}", content_hash or ""):
+            raise HTTPException(status_code=400, detail="sha256 must be 64 lowercase hex characters")
+
+    def _get_extension(self, filename: str) -> str:
+        """Extract file extension from filename"""
+        if '.' in filename:
+            return '.' + filename.rsplit('.', 1)[1].lower()
+        return ''
+
+# Create storage instance
+storage = MediaStorage()
\ No newline at end of file
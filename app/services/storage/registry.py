@@ -0,0 +1,34 @@
+from typing import Dict, Optional
+from app.config import settings
+from app.services.storage.base import StorageBackend
+
+_backends: Dict[str, StorageBackend] = {}
+
+def _create_backend(name: str) -> StorageBackend:
+    if name == "database":
+        from app.services.storage.database import DatabaseBackend
+        return DatabaseBackend()
+    if name == "filesystem":
+        from app.services.storage.filesystem import FilesystemBackend
+        return FilesystemBackend(settings.STORAGE_LOCAL_ROOT)
+    if name == "s3":
+        from app.services.storage.s3 import S3Backend
+        return S3Backend(
+            bucket=settings.AWS_BUCKET_NAME,
+            region=settings.AWS_REGION,
+            access_key_id=settings.AWS_ACCESS_KEY_ID,
+            secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+            endpoint_url=settings.STORAGE_S3_ENDPOINT_URL
+        )
+    raise ValueError(f"Unknown storage backend: {name}")
+
+def get_backend(name: Optional[str] = None) -> StorageBackend:
+    """Backend by name, defaulting to the one configured for new uploads.
+
+    Existing files keep the backend recorded on their MediaFile row, so
+    switching STORAGE_BACKEND only affects new uploads.
+    """
+    name = name or settings.STORAGE_BACKEND
+    if name not in _backends:
+        _backends[name] = _create_backend(name)
+    return _backends[name]
\ No newline at end of file
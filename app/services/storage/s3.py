@@ -0,0 +1,128 @@
+import boto3
+from botocore.exceptions import ClientError
+from typing import BinaryIO, Dict, Iterator, Optional
+from sqlalchemy.orm import Session
+from app.services.storage.base import StorageBackend, BlobStat, shard_path
+
+READ_CHUNK_SIZE = 256 * 1024
+
+class S3Backend(StorageBackend):
+    """Store blobs in an S3-compatible bucket (AWS, MinIO, ...)"""
+
+    name = "s3"
+    direct_uploads = True
+
+    def __init__(
+        self,
+        bucket: str,
+        region: str,
+        access_key_id: str,
+        secret_access_key: str,
+        endpoint_url: Optional[str] = None,
+        prefix: str = "blobs"
+    ):
+        self.s3_client = boto3.client(
+            's3',
+            aws_access_key_id=access_key_id,
+            aws_secret_access_key=secret_access_key,
+            region_name=region,
+            endpoint_url=endpoint_url or None
+        )
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def key_for(self, file_id: str, content_hash: str) -> str:
+        return f"{self.prefix}/{shard_path(content_hash)}-{file_id}"
+
+    def upload_key(self, owner: str, content_hash: str) -> str:
+        return f"{self.prefix}/uploads/{owner}/{shard_path(content_hash)}"
+
+    def put(self, key: str, file: BinaryIO, content_type: str, db: Optional[Session] = None):
+        file.seek(0)
+        try:
+            # upload_fileobj streams in parts instead of buffering the body
+            self.s3_client.upload_fileobj(
+                file,
+                self.bucket,
+                key,
+                ExtraArgs={"ContentType": content_type}
+            )
+        except ClientError as e:
+            raise Exception(f"Failed to upload file to S3: {str(e)}")
+
+    def stream(
+        self,
+        key: str,
+        start: int = 0,
+        end: Optional[int] = None,
+        db: Optional[Session] = None
+    ) -> Iterator[bytes]:
+        byte_range = f"bytes={start}-{'' if end is None else end}"
+        response = self.s3_client.get_object(Bucket=self.bucket, Key=key, Range=byte_range)
+        yield from response["Body"].iter_chunks(READ_CHUNK_SIZE)
+
+    def delete(self, key: str, db: Optional[Session] = None):
+        try:
+            self.s3_client.delete_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            raise Exception(f"Failed to delete file from S3: {str(e)}")
+
+    def stat(self, key: str, db: Optional[Session] = None) -> Optional[BlobStat]:
+        try:
+            head = self.s3_client.head_object(Bucket=self.bucket, Key=key, ChecksumMode="ENABLED")
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        return BlobStat(
+            size=head["ContentLength"],
+            content_type=head.get("ContentType"),
+            checksum_sha256=head.get("ChecksumSHA256")
+        )
+
+    def copy(self, src: str, dst: str):
+        try:
+            # Server-side; the bytes never leave the bucket
+            self.s3_client.copy_object(
+                Bucket=self.bucket,
+                Key=dst,
+                CopySource={"Bucket": self.bucket, "Key": src}
+            )
+        except ClientError as e:
+            raise Exception(f"Failed to copy file in S3: {str(e)}")
+
+    def presign(self, key: str, expires_in: int = 3600) -> Optional[str]:
+        return self.s3_client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": key},
+            ExpiresIn=expires_in
+        )
+
+    def presign_upload(
+        self,
+        key: str,
+        content_type: str,
+        max_size: int,
+        checksum_sha256: str,
+        expires_in: int = 900
+    ) -> Optional[Dict]:
+        # The checksum field makes S3 reject bytes that do not match the
+        # hash the client declared, so the content-addressed key stays honest.
+        fields = {
+            "Content-Type": content_type,
+            "x-amz-checksum-algorithm": "SHA256",
+            "x-amz-checksum-sha256": checksum_sha256
+        }
+        conditions = [
+            {"Content-Type": content_type},
+            {"x-amz-checksum-algorithm": "SHA256"},
+            {"x-amz-checksum-sha256": checksum_sha256},
+            ["content-length-range", 1, max_size]
+        ]
+        return self.s3_client.generate_presigned_post(
+            Bucket=self.bucket,
+            Key=key,
+            Fields=fields,
+            Conditions=conditions,
+            ExpiresIn=expires_in
+        )
\ No newline at end of file
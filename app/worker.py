@@ -1,4 +1,6 @@
-from celery import Celery
+from typing import Optional
+from celery import Celery, chain
+from celery.schedules import crontab
 from app.config import settings
 
 celery = Celery(
@@ -16,17 +18,88 @@ celery.conf.update(
     task_track_started=True,
     task_time_limit=3600,
     worker_max_tasks_per_child=200,
-    worker_prefetch_multiplier=1
+    worker_prefetch_multiplier=1,
+    beat_schedule={
+        'collect-media-garbage': {
+            'task': 'app.worker.collect_media_garbage',
+            'schedule': crontab(minute=30)  # Hourly
+        },
+        'evict-renditions': {
+            'task': 'app.worker.evict_renditions',
+            'schedule': crontab(minute='*/15')
+        },
+        'prerender-pinned-renditions': {
+            'task': 'app.worker.prerender_pinned_renditions',
+            'schedule': crontab(minute='5-59/15')  # Between evictions
+        }
+    }
 )
 
-@celery.task(bind=True, max_retries=3)
-def process_media(self, media_id: int):
+def _run_ingest_step(task, step, media_id: int):
+    from app.services import ingest
+    from app.db.session import SessionLocal
+    db = SessionLocal()
     try:
-        from app.services.media_processor import MediaProcessor
-        processor = MediaProcessor()
-        processor.process_media(media_id)
+        step(media_id, db)
+    except ingest.IngestError as exc:
+        db.rollback()
+        ingest.mark_failed(media_id, str(exc), db)
+        raise
     except Exception as exc:
-        self.retry(exc=exc, countdown=60 * 5)  # Retry in 5 minutes
+        db.rollback()
+        if task.request.retries >= task.max_retries:
+            ingest.mark_failed(media_id, str(exc), db)
+            raise
+        raise task.retry(exc=exc, countdown=60)
+    finally:
+        db.close()
+
+@celery.task(bind=True, max_retries=3)
+def ingest_validate(self, media_id: int):
+    from app.services.ingest import validate_media
+    _run_ingest_step(self, validate_media, media_id)
+
+@celery.task(bind=True, max_retries=3)
+def ingest_extract_metadata(self, media_id: int):
+    from app.services.ingest import extract_media_metadata
+    _run_ingest_step(self, extract_media_metadata, media_id)
+
+@celery.task(bind=True, max_retries=3)
+def ingest_fingerprint(self, media_id: int):
+    from app.services.ingest import fingerprint_media
+    _run_ingest_step(self, fingerprint_media, media_id)
+
+@celery.task(bind=True, max_retries=3)
+def ingest_analyze(self, media_id: int):
+    from app.services.ingest import analyze_image
+    _run_ingest_step(self, analyze_image, media_id)
+
+@celery.task(bind=True, max_retries=3)
+def ingest_renditions(self, media_id: int):
+    from app.services.ingest import generate_ingest_renditions
+    _run_ingest_step(self, generate_ingest_renditions, media_id)
+
+@celery.task(bind=True, max_retries=3)
+def ingest_mark_ready(self, media_id: int):
+    from app.services.ingest import mark_ready
+    _run_ingest_step(self, mark_ready, media_id)
+
+def start_ingest(media_id: int) -> str:
+    """Queue validate -> metadata -> fingerprint -> analyze -> renditions -> ready for one media row"""
+    result = chain(
+        ingest_validate.si(media_id),
+        ingest_extract_metadata.si(media_id),
+        ingest_fingerprint.si(media_id),
+        ingest_analyze.si(media_id),
+        ingest_renditions.si(media_id),
+        ingest_mark_ready.si(media_id)
+    ).apply_async()
+    return result.id
+
+@celery.task
+def process_media(media_id: int):
+    """(Re)run the ingest chain, e.g. after changing rendition specs"""
+    return start_ingest(media_id)
 
 @celery.task(bind=True, max_retries=3)
 def schedule_posts(self, user_id: int):
@@ -39,4 +112,62 @@ def schedule_posts(self, user_id: int):
         finally:
             db.close()
     except Exception as exc:
-        self.retry(exc=exc, countdown=60 * 5)
\ No newline at end of file
+        self.retry(exc=exc, countdown=60 * 5)
+
+@celery.task(bind=True, max_retries=3)
+def render_composites(self, grouping_id: int):
+    from app.services.compositor import generate_composites
+    from app.db.session import SessionLocal
+    db = SessionLocal()
+    try:
+        return generate_composites(grouping_id, db)
+    except ValueError:
+        raise
+    except Exception as exc:
+        db.rollback()
+        raise self.retry(exc=exc, countdown=60)
+    finally:
+        db.close()
+
+@celery.task(bind=True)
+def reprocess_renditions(self, batch_size: int = 50, max_batches: Optional[int] = None, after: Optional[str] = None):
+    """Render again renditions made with an outdated PLATFORM_SPECS; progress is in the task state"""
+    from app.services.reprocess import reprocess_stale
+    from app.db.session import SessionLocal
+    return reprocess_stale(
+        SessionLocal,
+        batch_size=batch_size,
+        max_batches=max_batches,
+        after=after,
+        progress=lambda report: self.update_state(state="PROGRESS", meta=report)
+    )
+
+@celery.task
+def collect_media_garbage(dry_run: bool = False):
+    from app.services.media_gc import collect_garbage
+    from app.db.session import SessionLocal
+    db = SessionLocal()
+    try:
+        return collect_garbage(db, dry_run=dry_run)
+    finally:
+        db.close()
+
+@celery.task
+def evict_renditions():
+    from app.services.rendition_cache import rendition_cache
+    from app.db.session import SessionLocal
+    db = SessionLocal()
+    try:
+        return rendition_cache.evict(db)
+    finally:
+        db.close()
+
+@celery.task
+def prerender_pinned_renditions():
+    from app.services.rendition_cache import prerender_pinned
+    from app.db.session import SessionLocal
+    db = SessionLocal()
+    try:
+        return prerender_pinned(db)
+    finally:
+        db.close()
\ No newline at end of file
@@ -0,0 +1,124 @@
+"""Decode time and peak memory of platform renditions: full decode vs JPEG draft.
+
+    python -m benchmarks.rendition_decode [--corpus DIR] [--repeat 3]
+
+Without --corpus, 12, 24 and 48 MP JPEGs are generated in a temp dir.
+Every measurement runs in a fresh process and reports its peak RSS
+(VmHWM, so Linux only) over the post-import baseline, because Pillow
+allocates pixel buffers outside tracemalloc's view.
+
+Draft only offers 1/2, 1/4 and 1/8 scales and must cover the largest
+rendition, so a 12 MP photo still decodes at full size for Facebook's
+2048px box; its saving is the RGB copy that is no longer made.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from PIL import Image
+
+SYNTHETIC_SIZES = [(4000, 3000), (5664, 4248), (8000, 6000)]
+
+def _proc_status_mb(field: str) -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) / 1024
+    raise KeyError(field)
+
+def _reset_peak_rss() -> float:
+    """Start a fresh high-water mark and return the current RSS in MB"""
+    # Linux only; ru_maxrss would also carry the parent's peak across fork/exec
+    with open("/proc/self/clear_refs", "w") as f:
+        f.write("5")
+    return _proc_status_mb("VmRSS")
+
+def _peak_rss_mb() -> float:
+    return _proc_status_mb("VmHWM")
+
+def measure(mode: str, file_path: str) -> dict:
+    """Decode one file and derive every rendition, as process_all_platforms does"""
+    from app.services.media_processing import MediaProcessor, THUMBNAIL_SIZE
+
+    processor = MediaProcessor(cache_dir=tempfile.gettempdir())
+    baseline = _reset_peak_rss()
+    start = time.perf_counter()
+
+    with Image.open(file_path) as source:
+        targets = [
+            processor._calculate_video_dimensions(source.size, specs['image']['max_size'])
+            for specs in processor.PLATFORM_SPECS.values()
+        ]
+        targets.append(processor._calculate_video_dimensions(source.size, THUMBNAIL_SIZE))
+        targets.sort(key=lambda size: size[0] * size[1], reverse=True)
+
+        if mode == "draft":
+            img = processor._decode(source, targets[0])
+        else:
+            img = source.convert('RGB')
+
+        decoded_size = img.size
+        for size in targets:
+            img = img.resize(size, Image.LANCZOS)
+
+    return {
+        "seconds": time.perf_counter() - start,
+        "peak_mb": _peak_rss_mb() - baseline,
+        "decoded_size": decoded_size
+    }
+
+def _generate_corpus(directory: Path) -> list:
+    paths = []
+    for width, height in SYNTHETIC_SIZES:
+        # Noise keeps the JPEG from compressing to nothing, like a real photo
+        noise = Image.effect_noise((width // 4, height // 4), 64).resize((width, height))
+        img = Image.merge('RGB', (noise, noise.rotate(180), noise.transpose(Image.FLIP_LEFT_RIGHT)))
+        path = directory / f"synthetic_{width * height // 1_000_000}mp.jpg"
+        img.save(path, 'JPEG', quality=90)
+        paths.append(path)
+    return paths
+
+def _run_child(mode: str, path: Path) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.rendition_decode", "--measure", mode, str(path)],
+        check=True,
+        capture_output=True,
+        text=True
+    ).stdout
+    return json.loads(output)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", help="Directory of JPEGs (default: generated)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--measure", nargs=2, metavar=("MODE", "FILE"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.measure:
+        print(json.dumps(measure(*args.measure)))
+        return 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.corpus:
+            paths = sorted(Path(args.corpus).glob("*.jp*g"))
+        else:
+            paths = _generate_corpus(Path(tmp))
+
+        print(f"{'file':<28}{'mode':<7}{'decoded':>12}{'median s':>10}{'peak MB':>9}")
+        for path in paths:
+            for mode in ("full", "draft"):
+                runs = [_run_child(mode, path) for _ in range(args.repeat)]
+                decoded = "x".join(str(n) for n in runs[0]["decoded_size"])
+                print(
+                    f"{path.name:<28}{mode:<7}{decoded:>12}"
+                    f"{statistics.median(r['seconds'] for r in runs):>10.3f}"
+                    f"{max(r['peak_mb'] for r in runs):>9.0f}"
+                )
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
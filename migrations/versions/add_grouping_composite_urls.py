@@ -0,0 +1,21 @@
+"""Before/after composite paths on media groupings
+
+Revision ID: add_grouping_composite_urls
+Revises: add_media_quality_score
+Create Date: 2024-03-08 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'add_grouping_composite_urls'
+down_revision = 'add_media_quality_score'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('media_groupings', sa.Column('composite_urls', sa.JSON(), nullable=True))
+
+def downgrade():
+    op.drop_column('media_groupings', 'composite_urls')
\ No newline at end of file
@@ -0,0 +1,29 @@
+"""Store the content hash on media for rendition cache keys
+
+Revision ID: add_media_content_hash
+Revises: add_media_processing_status
+Create Date: 2024-02-29 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'add_media_content_hash'
+down_revision = 'add_media_processing_status'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('media', sa.Column('content_hash', sa.String(64), nullable=True))
+    op.execute("""
+        UPDATE media
+        SET content_hash = media_files.content_hash
+        FROM media_files
+        WHERE media.file_url = '/api/media/files/' || media_files.id
+    """)
+    op.create_index('idx_media_content_hash', 'media', ['content_hash'])
+
+def downgrade():
+    op.drop_index('idx_media_content_hash')
+    op.drop_column('media', 'content_hash')
\ No newline at end of file
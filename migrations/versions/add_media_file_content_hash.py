@@ -0,0 +1,62 @@
+"""Content-address media files and dedupe existing blobs
+
+Revision ID: add_media_file_content_hash
+Revises: add_media_files_table
+Create Date: 2024-02-05 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'add_media_file_content_hash'
+down_revision = 'add_media_files_table'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('media_files', sa.Column('content_hash', sa.String(64), nullable=True))
+    op.add_column('media_files', sa.Column('ref_count', sa.Integer(), nullable=False, server_default='1'))
+
+    # Hash existing blobs server-side (sha256() needs PostgreSQL 11+)
+    op.execute("UPDATE media_files SET content_hash = encode(sha256(file_data), 'hex')")
+
+    # Point every media row at the oldest copy of its blob, then drop the rest
+    op.execute("""
+        CREATE TEMPORARY TABLE media_file_keepers ON COMMIT DROP AS
+        SELECT id,
+               first_value(id) OVER (
+                   PARTITION BY content_hash
+                   ORDER BY created_at NULLS LAST, id
+               ) AS keeper_id
+        FROM media_files
+    """)
+    op.execute("""
+        UPDATE media
+        SET file_url = '/api/media/files/' || k.keeper_id
+        FROM media_file_keepers k
+        WHERE media.file_url = '/api/media/files/' || k.id
+          AND k.id <> k.keeper_id
+    """)
+    op.execute("""
+        DELETE FROM media_files
+        WHERE id IN (SELECT id FROM media_file_keepers WHERE id <> keeper_id)
+    """)
+
+    # Reference counts come from the media rows that now share each blob
+    op.execute("""
+        UPDATE media_files
+        SET ref_count = (
+            SELECT count(*) FROM media
+            WHERE media.file_url = '/api/media/files/' || media_files.id
+        )
+    """)
+
+    op.alter_column('media_files', 'content_hash', nullable=False)
+    op.create_index('idx_media_files_content_hash', 'media_files', ['content_hash'], unique=True)
+
+def downgrade():
+    # Deduplicated copies are not restored; media rows keep sharing blobs
+    op.drop_index('idx_media_files_content_hash')
+    op.drop_column('media_files', 'ref_count')
+    op.drop_column('media_files', 'content_hash')
\ No newline at end of file
@@ -0,0 +1,21 @@
+"""Last time a media file gained a reference, for the orphan sweep
+
+Revision ID: add_media_file_last_referenced_at
+Revises: add_rendition_spec_hash
+Create Date: 2024-03-12 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'add_media_file_last_referenced_at'
+down_revision = 'add_rendition_spec_hash'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('media_files', sa.Column('last_referenced_at', sa.DateTime(), nullable=True))
+
+def downgrade():
+    op.drop_column('media_files', 'last_referenced_at')
\ No newline at end of file
@@ -0,0 +1,34 @@
+"""Record which storage backend holds each media file
+
+Revision ID: add_media_file_storage_backend
+Revises: split_media_file_chunks
+Create Date: 2024-02-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'add_media_file_storage_backend'
+down_revision = 'split_media_file_chunks'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column(
+        'media_files',
+        sa.Column('storage_backend', sa.String(), nullable=False, server_default='database')
+    )
+    op.add_column('media_files', sa.Column('storage_key', sa.String(), nullable=True))
+
+    # Everything stored so far lives in media_file_chunks, keyed by file id
+    op.execute("UPDATE media_files SET storage_key = id")
+    op.alter_column('media_files', 'storage_key', nullable=False)
+
+    # Only the database backend uses fixed-size chunks
+    op.alter_column('media_files', 'chunk_size', nullable=True, server_default=None)
+
+def downgrade():
+    op.alter_column('media_files', 'chunk_size', nullable=False)
+    op.drop_column('media_files', 'storage_key')
+    op.drop_column('media_files', 'storage_backend')
\ No newline at end of file
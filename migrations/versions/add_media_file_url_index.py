@@ -0,0 +1,22 @@
+"""Index media.file_url for the orphaned file sweep
+
+Revision ID: add_media_file_url_index
+Revises: add_upload_sessions_table
+Create Date: 2024-02-27 00:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers
+revision = 'add_media_file_url_index'
+down_revision = 'add_upload_sessions_table'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_index('idx_media_file_url', 'media', ['file_url'])
+    op.create_index('idx_media_files_created_at', 'media_files', ['created_at'])
+
+def downgrade():
+    op.drop_index('idx_media_files_created_at')
+    op.drop_index('idx_media_file_url')
\ No newline at end of file
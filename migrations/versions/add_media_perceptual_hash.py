@@ -0,0 +1,31 @@
+"""Perceptual hashes and near-duplicate links on media
+
+Revision ID: add_media_perceptual_hash
+Revises: add_renditions_table
+Create Date: 2024-03-04 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'add_media_perceptual_hash'
+down_revision = 'add_renditions_table'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('media', sa.Column('perceptual_hash', sa.String(16), nullable=True))
+    op.add_column('media', sa.Column(
+        'duplicate_of_id',
+        sa.Integer(),
+        sa.ForeignKey('media.id', ondelete='SET NULL'),
+        nullable=True
+    ))
+    # The near-duplicate index loads media per jobsite
+    op.create_index('idx_media_jobsite_id', 'media', ['jobsite_id'])
+
+def downgrade():
+    op.drop_index('idx_media_jobsite_id')
+    op.drop_column('media', 'duplicate_of_id')
+    op.drop_column('media', 'perceptual_hash')
\ No newline at end of file
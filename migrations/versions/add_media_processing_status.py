@@ -0,0 +1,26 @@
+"""Track media ingest progress
+
+Revision ID: add_media_processing_status
+Revises: add_media_file_url_index
+Create Date: 2024-02-28 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'add_media_processing_status'
+down_revision = 'add_media_file_url_index'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Media uploaded before the ingest pipeline existed is as ready as it will get
+    op.add_column('media', sa.Column('processing_status', sa.String(), nullable=False, server_default='ready'))
+    op.add_column('media', sa.Column('processing_error', sa.String(), nullable=True))
+    op.create_index('idx_media_processing_status', 'media', ['processing_status'])
+
+def downgrade():
+    op.drop_index('idx_media_processing_status')
+    op.drop_column('media', 'processing_error')
+    op.drop_column('media', 'processing_status')
\ No newline at end of file
@@ -0,0 +1,21 @@
+"""Image quality score on media for ranking
+
+Revision ID: add_media_quality_score
+Revises: add_media_perceptual_hash
+Create Date: 2024-03-05 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'add_media_quality_score'
+down_revision = 'add_media_perceptual_hash'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('media', sa.Column('quality_score', sa.Float(), nullable=True))
+
+def downgrade():
+    op.drop_column('media', 'quality_score')
\ No newline at end of file
@@ -0,0 +1,24 @@
+"""Hash of the platform spec each rendition was rendered with
+
+Revision ID: add_rendition_spec_hash
+Revises: add_grouping_composite_urls
+Create Date: 2024-03-11 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'add_rendition_spec_hash'
+down_revision = 'add_grouping_composite_urls'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Existing rows stay NULL, which `python -m app.cli reprocess` treats as stale
+    op.add_column('renditions', sa.Column('spec_hash', sa.String(16), nullable=True))
+    op.create_index('idx_renditions_spec_hash', 'renditions', ['spec_hash'])
+
+def downgrade():
+    op.drop_index('idx_renditions_spec_hash')
+    op.drop_column('renditions', 'spec_hash')
\ No newline at end of file
@@ -0,0 +1,36 @@
+"""Track rendition files for the rendition cache budget
+
+Revision ID: add_renditions_table
+Revises: add_media_content_hash
+Create Date: 2024-03-01 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'add_renditions_table'
+down_revision = 'add_media_content_hash'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'renditions',
+        sa.Column('key', sa.String(), nullable=False),
+        sa.Column('content_hash', sa.String(64), nullable=False),
+        sa.Column('platform', sa.String(), nullable=True),
+        sa.Column('kind', sa.String(), nullable=False),
+        sa.Column('size', sa.Integer(), nullable=False),
+        sa.Column('spec_version', sa.String(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()')),
+        sa.Column('last_accessed_at', sa.DateTime(), server_default=sa.text('now()')),
+        sa.PrimaryKeyConstraint('key')
+    )
+    op.create_index('idx_renditions_content_hash', 'renditions', ['content_hash'])
+    op.create_index('idx_renditions_last_accessed_at', 'renditions', ['last_accessed_at'])
+
+def downgrade():
+    op.drop_index('idx_renditions_last_accessed_at')
+    op.drop_index('idx_renditions_content_hash')
+    op.drop_table('renditions')
\ No newline at end of file
@@ -0,0 +1,41 @@
+"""Add upload sessions for resumable chunked uploads
+
+Revision ID: add_upload_sessions_table
+Revises: add_media_file_storage_backend
+Create Date: 2024-02-26 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers
+revision = 'add_upload_sessions_table'
+down_revision = 'add_media_file_storage_backend'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'upload_sessions',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('filename', sa.String(), nullable=False),
+        sa.Column('total_size', sa.Integer(), nullable=False),
+        sa.Column('chunk_size', sa.Integer(), nullable=False),
+        sa.Column('media_data', postgresql.JSON, nullable=False),
+        sa.Column('status', sa.String(), nullable=False, server_default='open'),
+        sa.Column('media_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()')),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()')),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['media_id'], ['media.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_upload_sessions_user_id', 'upload_sessions', ['user_id'])
+    op.create_index('idx_upload_sessions_updated_at', 'upload_sessions', ['updated_at'])
+
+def downgrade():
+    op.drop_index('idx_upload_sessions_updated_at')
+    op.drop_index('idx_upload_sessions_user_id')
+    op.drop_table('upload_sessions')
\ No newline at end of file
@@ -0,0 +1,57 @@
+"""Split media file blobs into fixed-size chunk rows
+
+Revision ID: split_media_file_chunks
+Revises: add_media_file_content_hash
+Create Date: 2024-02-12 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'split_media_file_chunks'
+down_revision = 'add_media_file_content_hash'
+branch_labels = None
+depends_on = None
+
+CHUNK_SIZE = 256 * 1024  # Matches BLOB_CHUNK_SIZE in app/services/storage/database.py
+
+def upgrade():
+    op.create_table(
+        'media_file_chunks',
+        sa.Column('file_id', sa.String(), nullable=False),
+        sa.Column('seq', sa.Integer(), nullable=False),
+        sa.Column('data', sa.LargeBinary(), nullable=False),
+        sa.ForeignKeyConstraint(['file_id'], ['media_files.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('file_id', 'seq')
+    )
+    op.add_column(
+        'media_files',
+        sa.Column('chunk_size', sa.Integer(), nullable=False, server_default=str(CHUNK_SIZE))
+    )
+
+    # Move existing payloads into chunk rows
+    op.execute(f"""
+        INSERT INTO media_file_chunks (file_id, seq, data)
+        SELECT f.id, s.seq, substring(f.file_data FROM s.seq * {CHUNK_SIZE} + 1 FOR {CHUNK_SIZE})
+        FROM media_files f
+        CROSS JOIN LATERAL generate_series(
+            0, (greatest(octet_length(f.file_data), 1) - 1) / {CHUNK_SIZE}
+        ) AS s(seq)
+    """)
+
+    op.drop_column('media_files', 'file_data')
+
+def downgrade():
+    op.add_column('media_files', sa.Column('file_data', sa.LargeBinary(), nullable=True))
+    op.execute("""
+        UPDATE media_files
+        SET file_data = (
+            SELECT string_agg(c.data, ''::bytea ORDER BY c.seq)
+            FROM media_file_chunks c
+            WHERE c.file_id = media_files.id
+        )
+    """)
+    op.alter_column('media_files', 'file_data', nullable=False)
+    op.drop_column('media_files', 'chunk_size')
+    op.drop_table('media_file_chunks')
\ No newline at end of file
@@ -7,8 +7,8 @@ from app.db.crud.jobsite import get_or_create_jobsite
 from app.services.storage import storage
 
 async def handle_upload_and_create_media(file: UploadFile, data: MediaCreate, user: models.User, db: Session):
-    # Upload file to S3
-    file_url = await storage.upload_file(file, folder=f"user_{user.id}")
+    # Upload file to the configured storage backend
+    file_url = await storage.upload_file(file, db)
     
     # Get or create jobsite
     jobsite = get_or_create_jobsite(db, user, data.jobsite_address)
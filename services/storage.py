@@ -1,54 +1,39 @@
-import boto3
-from botocore.exceptions import ClientError
+# S3 storage now lives alongside the database and filesystem backends;
+# kept so old imports keep working.
 import os
-from fastapi import UploadFile
 import magic
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
 from app.config import settings
+from app.services.storage.s3 import S3Backend
+from app.services.storage.media_storage import MIME_SNIFF_BYTES
+from app.services.storage import get_backend, storage
+
+class S3Storage(S3Backend):
+    """S3Backend configured from settings, with the old URL-based upload_file/delete_file"""
 
-class S3Storage:
     def __init__(self):
-        self.s3_client = boto3.client(
-            's3',
-            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-            region_name=settings.AWS_REGION
+        super().__init__(
+            bucket=settings.AWS_BUCKET_NAME,
+            region=settings.AWS_REGION,
+            access_key_id=settings.AWS_ACCESS_KEY_ID,
+            secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+            endpoint_url=settings.STORAGE_S3_ENDPOINT_URL
         )
-        self.bucket = settings.AWS_BUCKET_NAME
+        self.url_base = f"https://{self.bucket}.s3.{settings.AWS_REGION}.amazonaws.com/"
 
     async def upload_file(self, file: UploadFile, folder: str = "") -> str:
         """Upload a file to S3 bucket and return its URL"""
-        content = await file.read()
-        content_type = magic.from_buffer(content, mime=True)
-        
+        head = await file.read(MIME_SNIFF_BYTES)
+        content_type = magic.from_buffer(head, mime=True)
+
         # Generate a unique filename
-        filename = f"{folder}/{os.urandom(16).hex()}_{file.filename}"
-        
-        try:
-            self.s3_client.put_object(
-                Bucket=self.bucket,
-                Key=filename,
-                Body=content,
-                ContentType=content_type
-            )
-            
-            # Generate the URL
-            url = f"https://{self.bucket}.s3.{settings.AWS_REGION}.amazonaws.com/{filename}"
-            return url
-            
-        except ClientError as e:
-            raise Exception(f"Failed to upload file to S3: {str(e)}")
+        key = f"{folder}/{os.urandom(16).hex()}_{file.filename}"
+        await run_in_threadpool(self.put, key, file.file, content_type)
+        return self.url_base + key
 
     def delete_file(self, url: str):
         """Delete a file from S3 bucket"""
-        try:
-            # Extract key from URL
-            key = url.split(f"{self.bucket}.s3.{settings.AWS_REGION}.amazonaws.com/")[1]
-            
-            self.s3_client.delete_object(
-                Bucket=self.bucket,
-                Key=key
-            )
-        except ClientError as e:
-            raise Exception(f"Failed to delete file from S3: {str(e)}")
+        self.delete(url.split(self.url_base)[1])
 
-storage = S3Storage()
\ No newline at end of file
+__all__ = ["S3Storage", "get_backend", "storage"]
\ No newline at end of file
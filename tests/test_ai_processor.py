@@ -0,0 +1,46 @@
+from app import models
+from app.models.media import MediaStatus
+from app.services.ai_processor import select_media_for_ai
+
+def _media(db, grouping, status, score, content_type="image/jpeg"):
+    file_id = f"file{db.query(models.MediaFile).count()}"
+    db.add(models.MediaFile(
+        id=file_id,
+        filename=file_id,
+        content_type=content_type,
+        file_size=1,
+        content_hash=file_id,
+        storage_key=file_id
+    ))
+    item = models.Media(
+        file_url=f"/api/media/files/{file_id}",
+        status=status,
+        star_rating=3,
+        quality_score=score,
+        grouping_id=grouping.id
+    )
+    db.add(item)
+    db.flush()
+    return item
+
+def test_select_media_ranks_photos_and_videos_by_content_type(db):
+    grouping = models.MediaGrouping()
+    db.add(grouping)
+    db.flush()
+    befores = [_media(db, grouping, MediaStatus.BEFORE, score) for score in (0.1, 0.9, 0.5)]
+    after = _media(db, grouping, MediaStatus.AFTER, 0.6)
+    progress = _media(db, grouping, MediaStatus.IN_PROGRESS, 0.4)
+    _media(db, grouping, MediaStatus.AFTER, 0.2, content_type="video/mp4")
+    video = _media(db, grouping, MediaStatus.AFTER, 0.7, content_type="video/quicktime")
+    db.commit()
+
+    selected = select_media_for_ai(grouping.id, db)
+
+    assert [m["file_path"] for m in selected] == [
+        befores[1].file_url,
+        befores[2].file_url,
+        after.file_url,
+        progress.file_url,
+        video.file_url
+    ]
+    assert [m["media_type"] for m in selected] == ["image"] * 4 + ["video"]
\ No newline at end of file
@@ -0,0 +1,106 @@
+import io
+import json
+import asyncio
+import pytest
+from fastapi import HTTPException, UploadFile
+from PIL import Image
+from app import models
+from app.api.media import upload_media_batch
+from app.config import settings
+from app.services import media as media_service
+from app.services.storage import registry
+
+JPEG_BYTES = b"\xff\xd8\xff\xe0\x00\x10JFIF\x00" + b"\x00" * 4096
+
+def _png():
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 48), "green").save(buffer, "PNG")
+    return buffer.getvalue()
+
+PNG_BYTES = _png()
+
+@pytest.fixture
+def user(db, monkeypatch):
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", "database")
+    queued = []
+    monkeypatch.setattr(media_service, "enqueue_ingest", lambda media_id: queued.append(media_id) or "task-id")
+    registry._backends.clear()
+    user = models.User(email="crew@example.com", hashed_password="x")
+    db.add(user)
+    db.commit()
+    user.queued = queued
+    return user
+
+def _batch(db, user, files, items=None):
+    uploads = [UploadFile(io.BytesIO(data), filename=name) for name, data in files]
+    if items is None:
+        items = [{"star_rating": 4, "status": "before"} for _ in files]
+    return asyncio.run(upload_media_batch(
+        files=uploads,
+        jobsite_address="1 Main St",
+        items=json.dumps(items),
+        db=db,
+        current_user=user
+    ))
+
+def test_bad_file_is_reported_without_failing_the_batch(db, user):
+    result = _batch(db, user, [("a.jpg", JPEG_BYTES), ("notes.txt", b"just some text"), ("b.png", PNG_BYTES)])
+
+    assert (result["uploaded"], result["failed"]) == (2, 1)
+    assert [r["index"] for r in result["results"]] == [0, 1, 2]
+    assert "error" in result["results"][1]
+    assert "media_id" not in result["results"][1]
+    media_ids = [result["results"][0]["media_id"], result["results"][2]["media_id"]]
+    assert user.queued == media_ids
+    assert db.query(models.Media).count() == 2
+
+def test_duplicate_files_in_a_batch_share_one_blob(db, user):
+    result = _batch(db, user, [("a.jpg", JPEG_BYTES), ("a-copy.jpg", JPEG_BYTES), ("b.png", PNG_BYTES)])
+
+    assert result["uploaded"] == 3
+    media = db.query(models.Media).order_by(models.Media.id).all()
+    assert media[0].file_url == media[1].file_url != media[2].file_url
+    # Every media row holds its own reference
+    refs = {record.content_type: record.ref_count for record in db.query(models.MediaFile)}
+    assert refs == {"image/jpeg": 2, "image/png": 1}
+
+def test_batch_commits_once(db, user, monkeypatch):
+    commits = []
+    commit = db.commit
+    monkeypatch.setattr(db, "commit", lambda: commits.append(1) or commit())
+
+    _batch(db, user, [("a.jpg", JPEG_BYTES), ("b.png", PNG_BYTES)])
+
+    assert len(commits) == 1
+    assert db.query(models.Media).count() == 2
+
+def test_items_must_match_files(db, user):
+    with pytest.raises(HTTPException) as exc:
+        _batch(db, user, [("a.jpg", JPEG_BYTES)], items=[])
+    assert exc.value.status_code == 400
+    assert db.query(models.MediaFile).count() == 0
+
+def test_star_ratings_are_validated_before_upload(db, user):
+    items = [{"star_rating": 4, "status": "before"}, {"star_rating": 6, "status": "after"}]
+    with pytest.raises(HTTPException) as exc:
+        _batch(db, user, [("a.jpg", JPEG_BYTES), ("b.png", PNG_BYTES)], items=items)
+    assert exc.value.status_code == 400
+    assert db.query(models.MediaFile).count() == 0
+
+def test_failed_batch_commit_deletes_the_blobs_it_wrote(db, user, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", "filesystem")
+    monkeypatch.setattr(settings, "STORAGE_LOCAL_ROOT", str(tmp_path))
+    registry._backends.clear()
+    _batch(db, user, [("a.jpg", JPEG_BYTES)])
+    kept = {path for path in tmp_path.rglob("*") if path.is_file()}
+    assert len(kept) == 1
+
+    def fail():
+        raise RuntimeError("connection lost")
+    monkeypatch.setattr(db, "commit", fail)
+    with pytest.raises(HTTPException) as exc:
+        _batch(db, user, [("a-again.jpg", JPEG_BYTES), ("b.png", PNG_BYTES)])
+
+    assert exc.value.status_code == 500
+    # Only the blob committed earlier, which the batch just referenced, is left
+    assert {path for path in tmp_path.rglob("*") if path.is_file()} == kept
\ No newline at end of file
@@ -0,0 +1,91 @@
+import pytest
+from PIL import Image
+from app import models
+from app.config import settings
+from app.models.media import MediaStatus
+from app.services import compositor
+from app.services.ingest import PROCESSING_READY
+from app.services.media_processing import MediaProcessor
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "RENDITION_CACHE_DIR", str(tmp_path / "cache"))
+    return tmp_path / "cache"
+
+def _photo(db, cache_dir, grouping, status, color, score=0.5, content_type="image/png"):
+    path = cache_dir.parent / f"{color}_{score}.png"
+    Image.new("RGB", (1600, 1200), color).save(path)
+    processor = MediaProcessor(cache_dir=str(cache_dir))
+    content_hash = processor._file_hash(str(path))
+    file_id = content_hash[:32]
+    db.add(models.MediaFile(
+        id=file_id,
+        filename=path.name,
+        content_type=content_type,
+        file_size=path.stat().st_size,
+        content_hash=content_hash,
+        storage_key=content_hash
+    ))
+    media = models.Media(
+        file_url=f"/api/media/files/{file_id}",
+        content_hash=content_hash,
+        status=status,
+        processing_status=PROCESSING_READY,
+        processed_urls=processor.process_all_platforms(str(path), content_hash=content_hash),
+        quality_score=score,
+        grouping_id=grouping.id
+    )
+    db.add(media)
+    db.commit()
+    return media
+
+def test_composites_render_once_from_renditions(db, cache_dir, monkeypatch):
+    grouping = models.MediaGrouping()
+    db.add(grouping)
+    db.commit()
+    _photo(db, cache_dir, grouping, MediaStatus.BEFORE, "blue", score=0.2)
+    _photo(db, cache_dir, grouping, MediaStatus.BEFORE, "red", score=0.9)
+    _photo(db, cache_dir, grouping, MediaStatus.AFTER, "green")
+
+    manifest = compositor.generate_composites(grouping.id, db)
+
+    assert grouping.composite_urls == manifest
+    with Image.open(manifest["facebook"]) as composite:
+        assert composite.size == (2048, 1024)
+        # Best before on the left, after on the right
+        assert composite.getpixel((500, 500))[0] > 200
+        assert composite.getpixel((1500, 500))[1] > 100
+    assert db.get(models.Rendition, manifest["instagram"].rsplit("/", 1)[1]).kind == "composite"
+
+    # Same sources and layout: nothing is rendered again
+    monkeypatch.setattr(compositor, "render_composite", lambda *a, **k: pytest.fail("re-rendered"))
+    assert compositor.generate_composites(grouping.id, db) == manifest
+
+def test_composite_key_tracks_sources_and_layout():
+    key = compositor.composite_key("a", "b", "side_by_side", "instagram")
+
+    assert key == compositor.composite_key("a", "b", "side_by_side", "instagram")
+    assert key != compositor.composite_key("a", "c", "side_by_side", "instagram")
+    assert key != compositor.composite_key("a", "b", "stacked", "instagram")
+    assert key != compositor.composite_key("a", "b", "side_by_side", "facebook")
+
+def test_best_pair_skips_videos(db, cache_dir):
+    grouping = models.MediaGrouping()
+    db.add(grouping)
+    db.commit()
+    before = _photo(db, cache_dir, grouping, MediaStatus.BEFORE, "blue")
+    _photo(db, cache_dir, grouping, MediaStatus.AFTER, "green", score=0.9, content_type="video/mp4")
+    assert compositor.best_pair(grouping, db) is None
+
+    after = _photo(db, cache_dir, grouping, MediaStatus.AFTER, "red", score=0.1)
+    db.refresh(grouping)
+    assert compositor.best_pair(grouping, db) == (before, after)
+
+def test_composite_key_tracks_rendition_spec_and_canvas(monkeypatch):
+    key = compositor.composite_key("a", "b", "side_by_side", "instagram")
+
+    monkeypatch.setitem(MediaProcessor.PLATFORM_SPECS["instagram"], "image", {"max_size": (720, 720)})
+    assert key != compositor.composite_key("a", "b", "side_by_side", "instagram")
+    monkeypatch.undo()
+    monkeypatch.setattr(compositor, "GUTTER", 0)
+    assert key != compositor.composite_key("a", "b", "side_by_side", "instagram")
\ No newline at end of file
@@ -0,0 +1,18 @@
+import pytest
+from app.services.ffmpeg_pool import FFmpegSlots
+
+def test_slots_cap_concurrent_holders(tmp_path):
+    slots = FFmpegSlots(str(tmp_path), max_processes=2)
+
+    with slots.acquire() as first, slots.acquire() as second:
+        assert {first, second} == {0, 1}
+        with pytest.raises(TimeoutError):
+            with slots.acquire(timeout=0):
+                pass
+
+    with slots.acquire(timeout=0) as slot:
+        assert slot == 0
+
+def test_slots_default_to_core_count(tmp_path, monkeypatch):
+    monkeypatch.setattr("os.cpu_count", lambda: 6)
+    assert FFmpegSlots(str(tmp_path)).max_processes == 6
\ No newline at end of file
@@ -0,0 +1,75 @@
+from types import SimpleNamespace
+from PIL import Image, ImageFilter
+from app import models
+from app.models.media import MediaStatus
+from app.services.image_quality import quality_features, quality_score, rank_score
+from app.services.media_processor import MediaProcessor
+
+def _photo(tmp_path, name, blur=0, level=None):
+    img = Image.effect_noise((2400, 1800), 60).convert("RGB")
+    if blur:
+        img = img.filter(ImageFilter.GaussianBlur(blur))
+    if level is not None:
+        img = Image.new("RGB", img.size, (level,) * 3)
+    path = tmp_path / name
+    img.save(path, "JPEG")
+    return str(path)
+
+def test_sharp_photo_outscores_blurred_and_blown_out(tmp_path):
+    sharp = quality_features(_photo(tmp_path, "sharp.jpg"))
+    blurred = quality_features(_photo(tmp_path, "blurred.jpg", blur=8))
+    blown_out = quality_features(_photo(tmp_path, "white.jpg", level=255))
+
+    assert sharp["megapixels"] == 4.32
+    assert sharp["sharpness"] > 10 * blurred["sharpness"]
+    assert blown_out["highlights_clipped"] == 1.0
+    assert quality_score(sharp) > quality_score(blurred) > quality_score(blown_out)
+
+def test_rank_score_falls_back_to_rating():
+    assert rank_score(SimpleNamespace(star_rating=4, quality_score=None)) == 0.8
+    assert rank_score(SimpleNamespace(star_rating=4, quality_score=0.2)) == 0.5
+
+def _media(db, status, score, content_type="image/jpeg"):
+    file_id = f"file{db.query(models.MediaFile).count()}"
+    db.add(models.MediaFile(
+        id=file_id,
+        filename=file_id,
+        content_type=content_type,
+        file_size=1,
+        content_hash=file_id,
+        storage_key=file_id
+    ))
+    item = models.Media(
+        file_url=f"/api/media/files/{file_id}",
+        status=status,
+        star_rating=3,
+        quality_score=score,
+        jobsite_id=1
+    )
+    db.add(item)
+    db.flush()
+    return item
+
+def test_best_combination_uses_quality(db):
+    _media(db, MediaStatus.BEFORE, 0.2)
+    best_before = _media(db, MediaStatus.BEFORE, 0.9)
+    best_after = _media(db, MediaStatus.AFTER, 0.7)
+    _media(db, MediaStatus.AFTER, 0.1)
+    db.commit()
+
+    combinations = MediaProcessor(db).get_best_media_combinations(1)
+
+    assert len(combinations) == 4
+    assert combinations[0] == [best_before, best_after]
+
+def test_best_combination_tells_videos_from_photos(db):
+    before = _media(db, MediaStatus.BEFORE, 0.5)
+    after = _media(db, MediaStatus.AFTER, 0.5)
+    # The after clip is the best video, but never the after photo
+    best_video = _media(db, MediaStatus.AFTER, 0.9, content_type="video/mp4")
+    _media(db, MediaStatus.IN_PROGRESS, 0.8, content_type="video/quicktime")
+    db.commit()
+
+    combinations = MediaProcessor(db).get_best_media_combinations(1)
+
+    assert combinations == [[before, after, best_video]]
\ No newline at end of file
@@ -0,0 +1,112 @@
+import io
+import os
+import time
+import hashlib
+import uuid
+from datetime import timedelta
+import pytest
+from PIL import Image
+from app import models
+from app.config import settings
+from app.models.media import MediaStatus
+from app.services import ingest, media_gc
+from app.services.storage import get_backend, storage
+
+def _stored_media(db, data, content_type="image/png"):
+    file_id = str(uuid.uuid4())
+    backend = get_backend("database")
+    db.add(models.MediaFile(
+        id=file_id,
+        filename=f"{file_id}.png",
+        content_type=content_type,
+        file_size=len(data),
+        chunk_size=backend.chunk_size,
+        content_hash=hashlib.sha256(data).hexdigest(),
+        storage_backend=backend.name,
+        storage_key=file_id
+    ))
+    db.flush()
+    backend.put(file_id, io.BytesIO(data), content_type, db)
+    media = models.Media(file_url=f"/api/media/files/{file_id}", status=MediaStatus.BEFORE)
+    db.add(media)
+    db.commit()
+    return media
+
+@pytest.fixture
+def ingest_dirs(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "INGEST_SCRATCH_DIR", str(tmp_path / "scratch"))
+    monkeypatch.setattr(settings, "RENDITION_CACHE_DIR", str(tmp_path / "renditions"))
+    return tmp_path
+
+def test_ingest_chain_steps(db, ingest_dirs):
+    buffer = io.BytesIO()
+    Image.new("RGB", (2400, 1200), "red").save(buffer, "PNG")
+    media = _stored_media(db, buffer.getvalue())
+    assert media.processing_status == ingest.PROCESSING_PENDING
+
+    ingest.validate_media(media.id, db)
+    assert media.processing_status == ingest.PROCESSING_RUNNING
+
+    ingest.extract_media_metadata(media.id, db)
+    assert media.media_metadata["dimensions"] == [2400, 1200]
+
+    ingest.fingerprint_media(media.id, db)
+    assert len(media.perceptual_hash) == 16
+    assert media.duplicate_of_id is None
+
+    ingest.analyze_image(media.id, db)
+    assert 0 <= media.quality_score <= 1
+    assert media.media_metadata["quality"]["megapixels"] == 2.88
+    assert set(media.media_metadata["crops"]) == {"1:1", "4:5", "9:16", "1.91:1"}
+
+    ingest.generate_ingest_renditions(media.id, db)
+    with Image.open(media.processed_urls["instagram"]) as rendition:
+        # 2:1 is wider than Instagram allows, so it gets the 1.91:1 crop
+        assert rendition.size == (1080, 565)
+    assert "facebook_thumbnail" in media.processed_urls
+
+    ingest.mark_ready(media.id, db)
+    assert media.processing_status == ingest.PROCESSING_READY
+    assert list((ingest_dirs / "scratch").iterdir()) == []
+
+def test_reused_scratch_copy_survives_the_sweep(db, ingest_dirs):
+    media = _stored_media(db, b"\x89PNG\r\n\x1a\n" + b"\x00" * 100)
+    file_record = storage.get_file_by_url(media.file_url, db)
+    path = ingest.materialize_source(file_record, db)
+    old = time.time() - 48 * 3600
+    os.utime(path, (old, old))
+
+    # The next step on this worker reuses the copy
+    assert ingest.materialize_source(file_record, db) == path
+    media_gc.sweep_stale_scratch_files(str(ingest_dirs / "scratch"), grace=timedelta(hours=24))
+    assert os.path.exists(path)
+
+def test_undecodable_image_fails_validation(db, ingest_dirs):
+    media = _stored_media(db, b"\x89PNG\r\n\x1a\n" + b"\x00" * 100)
+
+    with pytest.raises(ingest.IngestError):
+        ingest.validate_media(media.id, db)
+
+    ingest.mark_failed(media.id, "Invalid image", db)
+    assert media.processing_status == ingest.PROCESSING_FAILED
+    assert media.processing_error == "Invalid image"
+def test_backfill_probes_only_missing_videos(db, ingest_dirs, monkeypatch):
+    probed = []
+    monkeypatch.setattr(
+        ingest.MediaProcessor, "probe_video",
+        lambda self, path: probed.append(path) or {"version": ingest.PROBE_VERSION, "width": 640}
+    )
+    video = _stored_media(db, b"video-1", content_type="video/mp4")
+    current = _stored_media(db, b"video-2", content_type="video/mp4")
+    current.media_metadata = {"probe": {"version": ingest.PROBE_VERSION}}
+    _stored_media(db, b"image", content_type="image/png")
+    db.commit()
+
+    report = ingest.backfill_probes(db, batch_size=1)
+
+    assert report == {"scanned": 2, "probed": 1, "failed": 0}
+    assert video.media_metadata["probe"]["width"] == 640
+    assert len(probed) == 1
+    assert list((ingest_dirs / "scratch").iterdir()) == []
+
+    assert ingest.backfill_probes(db, force=True)["probed"] == 2
\ No newline at end of file
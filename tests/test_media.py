@@ -58,7 +58,7 @@ def test_upload_media(client, test_user, test_jobsite):
         data=data,
         headers={"Authorization": f"Bearer {token}"}
     )
-    assert response.status_code == 200
+    assert response.status_code == 202
     data = response.json()
     assert "media_id" in data
     assert "file_url" in data
@@ -0,0 +1,83 @@
+from app.services.media_cache import MediaBytesCache
+
+def _cache(tmp_path, memory_budget=100, disk_budget=1000, max_item_size=500):
+    return MediaBytesCache(
+        memory_budget=memory_budget,
+        disk_dir=str(tmp_path / "media-cache"),
+        disk_budget=disk_budget,
+        max_item_size=max_item_size
+    )
+
+def test_read_through_loads_once(tmp_path):
+    cache = _cache(tmp_path)
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return b"x" * 10
+
+    assert cache.get_or_load("f1", "h1", loader) == b"x" * 10
+    assert cache.get_or_load("f1", "h1", loader) == b"x" * 10
+    assert len(loads) == 1
+    stats = cache.stats()
+    assert stats["misses"] == 1
+    assert stats["memory_hits"] == 1
+
+def test_memory_lru_evicts_to_disk_tier(tmp_path):
+    cache = _cache(tmp_path, memory_budget=100)
+    cache.put("a", b"a" * 60)
+    cache.put("b", b"b" * 60)
+
+    stats = cache.stats()
+    assert stats["memory_evictions"] == 1
+    assert stats["memory_bytes"] == 60
+
+    # Evicted from memory but still on disk, and promoted back on a hit
+    assert cache.get("a") == b"a" * 60
+    assert cache.stats()["disk_hits"] == 1
+
+def test_disk_budget_is_enforced(tmp_path):
+    cache = _cache(tmp_path, memory_budget=10, disk_budget=100)
+    cache.put("a", b"a" * 60)
+    cache.put("b", b"b" * 60)
+
+    stats = cache.stats()
+    assert stats["disk_bytes"] == 60
+    assert stats["disk_evictions"] == 1
+    assert not (tmp_path / "media-cache" / "a").exists()
+
+def test_large_items_are_not_cached(tmp_path):
+    cache = _cache(tmp_path, max_item_size=50)
+    cache.put("big", b"x" * 51)
+    assert cache.get("big") is None
+
+def test_invalidate_removes_both_tiers(tmp_path):
+    cache = _cache(tmp_path)
+    cache.get_or_load("f1", "h1", lambda: b"data")
+
+    cache.invalidate("f1", "h1")
+
+    key = MediaBytesCache.cache_key("f1", "h1")
+    assert cache.get(key) is None
+    assert not (tmp_path / "media-cache" / key).exists()
+    assert cache.stats()["invalidations"] == 1
+
+def test_disk_tier_survives_restart(tmp_path):
+    _cache(tmp_path).put("a", b"a" * 20)
+    assert _cache(tmp_path).get("a") == b"a" * 20
+def test_processes_sharing_the_disk_tier_keep_one_budget(tmp_path):
+    first = _cache(tmp_path, memory_budget=10, disk_budget=100)
+    second = _cache(tmp_path, memory_budget=10, disk_budget=100)
+    first.put("a", b"a" * 60)
+
+    # Within the rescan interval the second process only counts its own writes
+    second.put("c", b"c" * 10)
+    assert len(list((tmp_path / "media-cache").iterdir())) == 2
+
+    # Once it rescans it counts "a" too, though it never wrote it
+    second.disk_rescan_interval = 0
+    second.put("b", b"b" * 60)
+
+    assert sorted(p.name for p in (tmp_path / "media-cache").iterdir()) == ["b", "c"]
+    assert second.stats()["disk_bytes"] == 70
+    assert first.get("a") is None
\ No newline at end of file
@@ -0,0 +1,107 @@
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from app import models
+from app.models.media import MediaStatus
+from app.config import settings
+from app.services import media_gc
+
+def _media_file(db, age_hours):
+    file_id = str(uuid.uuid4())
+    db.add(models.MediaFile(
+        id=file_id,
+        filename=f"{file_id}.jpg",
+        content_type="image/jpeg",
+        file_size=10,
+        content_hash=uuid.uuid4().hex * 2,
+        ref_count=1,
+        storage_backend="database",
+        storage_key=file_id,
+        created_at=datetime.utcnow() - timedelta(hours=age_hours)
+    ))
+    db.commit()
+    return file_id
+
+def _media(db, file_id, processed_urls=None):
+    db.add(models.Media(
+        file_url=f"/api/media/files/{file_id}",
+        status=MediaStatus.BEFORE,
+        processed_urls=processed_urls or {}
+    ))
+    db.commit()
+
+def test_sweep_orphaned_files_skips_referenced_and_recent(db):
+    orphan = _media_file(db, age_hours=48)
+    referenced = _media_file(db, age_hours=48)
+    recent = _media_file(db, age_hours=0)
+    _media(db, referenced)
+
+    report = media_gc.sweep_orphaned_files(db, batch_size=1, grace=timedelta(hours=24))
+
+    assert report["candidates"] == 1
+    assert report["deleted"] == 1
+    assert report["sample"] == [orphan]
+    remaining = {row.id for row in db.query(models.MediaFile.id)}
+    assert remaining == {referenced, recent}
+
+def test_sweep_orphaned_files_dry_run_deletes_nothing(db):
+    orphan = _media_file(db, age_hours=48)
+
+    report = media_gc.sweep_orphaned_files(db, grace=timedelta(hours=24), dry_run=True)
+
+    assert report["candidates"] == 1
+    assert report["deleted"] == 0
+    assert db.query(models.MediaFile).filter_by(id=orphan).count() == 1
+
+def test_sweep_orphaned_renditions(db, tmp_path):
+    old = time.time() - 48 * 3600
+    for name in ("instagram_owned.jpg", "instagram_orphan.jpg", "instagram_orphan_thumb.jpg"):
+        (tmp_path / name).write_bytes(b"x")
+        os.utime(tmp_path / name, (old, old))
+    (tmp_path / "instagram_fresh.jpg").write_bytes(b"x")
+    (tmp_path / "media").mkdir()
+    _media(db, "f1", {"instagram": f"{tmp_path}/instagram_owned.jpg"})
+
+    report = media_gc.sweep_orphaned_renditions(
+        db, cache_dir=str(tmp_path), batch_size=1, grace=timedelta(hours=24)
+    )
+
+    assert report["deleted"] == 2
+    assert sorted(os.listdir(tmp_path)) == ["instagram_fresh.jpg", "instagram_owned.jpg", "media"]
+
+def test_sweep_stale_upload_sessions(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_SESSION_DIR", str(tmp_path))
+    for upload_id, age_hours in (("stale", 72), ("active", 1)):
+        (tmp_path / upload_id).mkdir()
+        (tmp_path / upload_id / "0.part").write_bytes(b"x" * 5)
+        db.add(models.UploadSession(
+            id=upload_id,
+            user_id=1,
+            filename="clip.mp4",
+            total_size=10,
+            chunk_size=5,
+            media_data={},
+            updated_at=datetime.utcnow() - timedelta(hours=age_hours)
+        ))
+    db.commit()
+
+    report = media_gc.sweep_stale_upload_sessions(db, ttl=timedelta(hours=48))
+
+    assert report["sample"] == ["stale"]
+    assert report["bytes"] == 5
+    assert [u.id for u in db.query(models.UploadSession)] == ["active"]
+    assert not (tmp_path / "stale").exists()
+
+def test_sweep_stale_scratch_files(tmp_path):
+    old = time.time() - 48 * 3600
+    for name in ("left-behind.jpg", ".tmp-crashed", "in-use.mp4"):
+        (tmp_path / name).write_bytes(b"x" * 7)
+    os.utime(tmp_path / "left-behind.jpg", (old, old))
+    os.utime(tmp_path / ".tmp-crashed", (old, old))
+
+    report = media_gc.sweep_stale_scratch_files(str(tmp_path), grace=timedelta(hours=24))
+
+    assert sorted(report["sample"]) == [".tmp-crashed", "left-behind.jpg"]
+    assert report["deleted"] == 2
+    assert [p.name for p in tmp_path.iterdir()] == ["in-use.mp4"]
\ No newline at end of file
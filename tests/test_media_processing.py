@@ -0,0 +1,282 @@
+import os
+import struct
+from PIL import Image
+from app.services import media_processing
+from app.services.media_processing import MediaProcessor
+
+def _source(tmp_path, size=(4000, 3000), mode="RGB"):
+    path = tmp_path / "source.png"
+    Image.new(mode, size, "blue").save(path)
+    return str(path)
+
+def test_process_all_platforms_decodes_once(tmp_path, monkeypatch):
+    processor = MediaProcessor(cache_dir=str(tmp_path / "cache"))
+    source = _source(tmp_path, mode="RGBA")
+    opens = []
+    real_open = media_processing.Image.open
+    monkeypatch.setattr(media_processing.Image, "open", lambda *a, **k: opens.append(a) or real_open(*a, **k))
+
+    manifest = processor.process_all_platforms(source)
+
+    assert len(opens) == 1
+    expected = {"facebook": (2048, 1536), "nextdoor": (2000, 1500), "instagram": (1080, 810)}
+    for platform, size in expected.items():
+        with real_open(manifest[platform]) as rendition:
+            assert rendition.size == size
+            assert rendition.format == "JPEG"
+    with real_open(manifest["instagram_thumbnail"]) as thumb:
+        assert thumb.size == (300, 225)
+    assert manifest["facebook_thumbnail"] == manifest["instagram_thumbnail"]
+
+    # A second run is served from the cache without decoding
+    assert processor.process_all_platforms(source) == manifest
+    assert len(opens) == 1
+
+def test_process_all_platforms_keeps_small_images(tmp_path):
+    processor = MediaProcessor(cache_dir=str(tmp_path / "cache"))
+    manifest = processor.process_all_platforms(_source(tmp_path, size=(640, 480)))
+
+    with Image.open(manifest["facebook"]) as rendition:
+        assert rendition.size == (640, 480)
+
+def test_stored_content_hash_skips_reading_source(tmp_path):
+    processor = MediaProcessor(cache_dir=str(tmp_path / "cache"))
+    source = _source(tmp_path)
+    content_hash = processor._file_hash(source)
+
+    manifest = processor.process_all_platforms(source, content_hash=content_hash)
+    assert manifest == processor.process_all_platforms(source)
+
+    # Cache hits are a stat per output, so the source need not even exist
+    (tmp_path / "source.png").unlink()
+    assert processor.process_all_platforms(source, content_hash=content_hash) == manifest
+    assert processor.process_image(source, "instagram", content_hash)["processed_path"] == manifest["instagram"]
+
+def test_large_jpeg_decodes_at_reduced_scale(tmp_path):
+    processor = MediaProcessor(cache_dir=str(tmp_path / "cache"))
+    path = tmp_path / "photo.jpg"
+    Image.new("RGB", (4400, 3300), "green").save(path, "JPEG")
+
+    with Image.open(path) as source:
+        decoded = processor._decode(source, (2048, 1536))
+        assert decoded.size == (2200, 1650)
+        # Already RGB, so no copy of the pixels is made
+        assert decoded is source
+
+    manifest = processor.process_all_platforms(str(path))
+    with Image.open(manifest["facebook"]) as rendition:
+        assert rendition.size == (2048, 1536)
+
+def test_instagram_gets_smart_crop_outside_aspect_range(tmp_path):
+    processor = MediaProcessor(cache_dir=str(tmp_path / "cache"))
+    path = tmp_path / "tall.png"
+    img = Image.new("RGB", (1000, 3000), "blue")
+    img.paste((255, 0, 0), (0, 1500, 1000, 2750))
+    img.save(path)
+
+    manifest = processor.process_all_platforms(str(path), crops={"4:5": [0.0, 0.5, 1.0, 0.9167]})
+
+    with Image.open(manifest["instagram"]) as rendition:
+        assert rendition.size == (864, 1080)
+        assert rendition.convert("RGB").getpixel((432, 540))[0] > 200
+        assert rendition.convert("RGB").getpixel((432, 5))[0] > 200
+    # Other platforms take any aspect and keep the whole frame
+    with Image.open(manifest["facebook"]) as rendition:
+        assert rendition.size == (682, 2048)
+
+def test_missing_smart_crop_falls_back_to_center(tmp_path):
+    processor = MediaProcessor(cache_dir=str(tmp_path / "cache"))
+    box = processor._crop_box((3000, 1000), processor.PLATFORM_SPECS["instagram"]["image"])
+
+    assert box[1] == 0.0 and box[3] == 1.0
+    assert abs((box[0] + box[2]) / 2 - 0.5) < 1e-9
+    assert abs((box[2] - box[0]) * 3 - 1.91) < 1e-9
+    assert processor._crop_box((1200, 1000), processor.PLATFORM_SPECS["instagram"]["image"]) is None
+
+def test_web_variants_keep_the_source_resolution(tmp_path, monkeypatch):
+    monkeypatch.setattr(media_processing, "WEB_VARIANTS", {
+        "webp": {"format": "WEBP", "media_type": "image/webp", "options": {"quality": 80}}
+    })
+    processor = MediaProcessor(cache_dir=str(tmp_path / "cache"))
+    manifest = processor.process_all_platforms(_source(tmp_path, size=(1600, 1200)))
+
+    with Image.open(manifest["web_webp"]) as variant:
+        assert variant.format == "WEBP"
+        assert variant.size == (1600, 1200)
+    # A cache hit lists the variant too
+    assert processor.process_all_platforms(_source(tmp_path, size=(1600, 1200))) == manifest
+
+    # Larger than every rendition: a variant would be a downscale of the original
+    processor = MediaProcessor(cache_dir=str(tmp_path / "large"))
+    manifest = processor.process_all_platforms(_source(tmp_path))
+    assert "web_webp" not in manifest
+    assert processor.process_all_platforms(_source(tmp_path)) == manifest
+
+def test_videos_render_in_one_ffmpeg_run(tmp_path, monkeypatch):
+    processor = MediaProcessor(cache_dir=str(tmp_path / "cache"))
+    monkeypatch.setattr(processor, "probe_video", lambda path: _probe(3840, 2160, 12.5, video_codec="hevc"))
+    runs = []
+
+    def fake_run(stream, **kwargs):
+        args = media_processing.ffmpeg.compile(stream)
+        runs.append(args)
+        for arg in args:
+            if arg.startswith(str(tmp_path)):
+                open(arg, "wb").close()
+
+    monkeypatch.setattr(media_processing.ffmpeg_slots, "run", fake_run)
+
+    manifest = processor.process_all_platforms("clip.mp4", "video", "a" * 64)
+
+    assert len(runs) == 1
+    graph = runs[0][runs[0].index("-filter_complex") + 1]
+    # Facebook and Nextdoor share a 1920x1080 encode
+    assert "split=3" in graph
+    assert "scale=1080:606" in graph and "scale=1920:1080" in graph
+    assert runs[0].count("0:a") == 2
+    assert os.path.samefile(manifest["facebook"], manifest["nextdoor"])
+    assert manifest["instagram_thumbnail"] == str(tmp_path / "cache" / f"{'a' * 64}_thumb.jpg")
+
+    assert processor.process_video("clip.mp4", "instagram", "a" * 64)["processed_path"] == manifest["instagram"]
+    assert len(runs) == 1
+
+def _mp4(path, brand=b"isom", boxes=(b"moov", b"mdat")):
+    with open(path, "wb") as f:
+        f.write(struct.pack(">I4s4s", 12, b"ftyp", brand))
+        for box in boxes:
+            f.write(struct.pack(">I4s", 16, box) + b"\0" * 8)
+    return str(path)
+
+def _probe(width=1080, height=1080, duration=30.0, video_codec="h264", audio_codecs=("aac",), brand="isom", faststart=True, keyframe_cuts=None):
+    return {
+        "keyframe_cuts": keyframe_cuts or {},
+        "version": media_processing.PROBE_VERSION,
+        "width": width,
+        "height": height,
+        "duration": duration,
+        "video_codec": video_codec,
+        "pix_fmt": "yuv420p",
+        "audio_codecs": list(audio_codecs),
+        "mp4_brand": brand,
+        "faststart": faststart
+    }
+
+def test_plan_video_prefers_passthrough(tmp_path):
+    processor = MediaProcessor(cache_dir=str(tmp_path / "cache"))
+
+    assert set(processor.plan_video(_probe()).values()) == {media_processing.VIDEO_NOOP}
+    assert processor.plan_video(_probe(faststart=False))["facebook"] == "remux"
+    assert processor.plan_video(_probe(brand="qt  "))["facebook"] == "remux"
+    assert processor.plan_video(_probe(video_codec="hevc"))["facebook"] == "transcode"
+    assert processor.plan_video(_probe(audio_codecs=("opus",)))["facebook"] == "transcode"
+    assert processor.plan_video(_probe(duration=200.0)) == {
+        "instagram": "transcode", "facebook": "noop", "nextdoor": "transcode"
+    }
+
+def test_plan_video_trims_at_keyframes(tmp_path):
+    processor = MediaProcessor(cache_dir=str(tmp_path / "cache"))
+    probe = _probe(duration=200.0, brand="qt  ", keyframe_cuts={"60": 59.0, "180": None})
+
+    assert processor.plan_video(probe) == {
+        "instagram": "trim", "facebook": "remux", "nextdoor": "transcode"
+    }
+    assert processor.plan_video(dict(probe, video_codec="hevc"))["instagram"] == "transcode"
+
+def test_mp4_layout(tmp_path):
+    processor = MediaProcessor(cache_dir=str(tmp_path / "cache"))
+    assert processor._mp4_layout(_mp4(tmp_path / "a.mp4")) == ("isom", True)
+    assert processor._mp4_layout(_mp4(tmp_path / "b.mp4", boxes=(b"mdat", b"moov"))) == ("isom", False)
+    assert processor._mp4_layout(_source(tmp_path)) == (None, False)
+
+def test_probe_video_normalizes_rotated_phone_video(tmp_path, monkeypatch):
+    processor = MediaProcessor(cache_dir=str(tmp_path / "cache"))
+    raw = {
+        "format": {"duration": "12.5", "format_name": "mov,mp4,m4a,3gp,3g2,mj2", "bit_rate": "8000000"},
+        "streams": [
+            {
+                "codec_type": "video", "codec_name": "h264", "pix_fmt": "yuv420p",
+                "width": 1920, "height": 1080, "avg_frame_rate": "30000/1001",
+                "side_data_list": [{"side_data_type": "Display Matrix", "rotation": -90}]
+            },
+            {"codec_type": "audio", "codec_name": "aac"}
+        ]
+    }
+    packets = {"packets": [
+        {"pts_time": str(t), "flags": "K__" if t % 2 == 0 else "___"} for t in range(10)
+    ]}
+    monkeypatch.setattr(media_processing.ffmpeg, "probe", lambda path, **kwargs: packets if kwargs else raw)
+
+    probe = processor.probe_video(_mp4(tmp_path / "clip.mov", brand=b"qt  "))
+
+    assert (probe["width"], probe["height"], probe["rotation"]) == (1080, 1920, 90)
+    assert probe["duration"] == 12.5 and probe["bitrate"] == 8000000
+    assert probe["frame_rate"] == 29.97 and probe["keyframe_interval"] == 2
+    assert probe["audio_codecs"] == ["aac"] and probe["mp4_brand"] == "qt  "
+    assert probe["keyframe_cuts"] == {}
+    assert processor.plan_video(probe)["instagram"] == "remux"
+
+def test_keyframe_cuts_land_just_before_max_length(tmp_path, monkeypatch):
+    processor = MediaProcessor(cache_dir=str(tmp_path / "cache"))
+    intervals = []
+
+    def fake_probe(path, read_intervals, **kwargs):
+        intervals.append(read_intervals)
+        start = float(read_intervals.split("%")[0])
+        # Keyframes every 2.5s on the 60s trim, none near the 180s one
+        keyframes = [55.0, 57.5, 60.0, 62.5] if start < 100 else []
+        return {"packets": [{"pts_time": str(t), "flags": "K_"} for t in keyframes]}
+
+    monkeypatch.setattr(media_processing.ffmpeg, "probe", fake_probe)
+
+    assert processor._keyframe_cuts("clip.mp4", 200.0) == {"60": 60.0, "180": None}
+    assert intervals == ["58.0%60", "178.0%180"]
+
+def test_render_videos_follows_plan(tmp_path, monkeypatch):
+    processor = MediaProcessor(cache_dir=str(tmp_path / "cache"))
+    source = _mp4(tmp_path / "clip.mov", brand=b"qt  ")
+    runs = []
+
+    def fake_run(stream, **kwargs):
+        args = media_processing.ffmpeg.compile(stream)
+        runs.append(args)
+        for arg in args:
+            if arg.startswith(str(tmp_path / "cache")):
+                open(arg, "wb").close()
+
+    monkeypatch.setattr(media_processing.ffmpeg_slots, "run", fake_run)
+
+    processor.process_all_platforms(source, "video", "a" * 64, _probe(duration=200.0, brand="qt  "))
+
+    args = runs[0]
+    graph = args[args.index("-filter_complex") + 1]
+    # Facebook is only remuxed; Instagram and Nextdoor are cut to different lengths
+    assert "split=3" in graph
+    assert args[args.index("-c") + 1] == "copy"
+    assert args.count("-t") == 2 and "60" in args and "180" in args
+
+    (tmp_path / "cache" / f"facebook_{'a' * 64}.mp4").unlink()
+    faststart = _mp4(tmp_path / "clip.mp4")
+    monkeypatch.setattr(processor, "probe_video", lambda path: _probe())
+    processor.process_video(faststart, "facebook", "a" * 64)
+    assert len(runs) == 1
+    assert os.path.samefile(tmp_path / "cache" / f"facebook_{'a' * 64}.mp4", faststart)
+
+def test_trims_are_stream_copied(tmp_path, monkeypatch):
+    processor = MediaProcessor(cache_dir=str(tmp_path / "cache"))
+    source = _mp4(tmp_path / "clip.mp4")
+    (tmp_path / "cache" / f"{'a' * 64}_thumb.jpg").touch()
+    runs = []
+    monkeypatch.setattr(
+        media_processing.ffmpeg_slots, "run",
+        lambda stream, **kwargs: runs.append(media_processing.ffmpeg.compile(stream))
+    )
+
+    processor.process_all_platforms(
+        source, "video", "a" * 64,
+        _probe(duration=300.0, keyframe_cuts={"60": 59.0, "180": 178.5, "240": 240.0})
+    )
+
+    args = runs[0]
+    assert "-filter_complex" not in args and "libx264" not in args
+    assert args.count("copy") == 3
+    assert sorted(float(args[i + 1]) for i, arg in enumerate(args) if arg == "-t") == [59.0, 178.5, 240.0]
@@ -0,0 +1,89 @@
+import os
+import uuid
+import importlib.util
+from pathlib import Path
+import pytest
+import sqlalchemy as sa
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+
+# The data migrations use PostgreSQL SQL; point this at a scratch database to run them
+POSTGRES_URL = os.environ.get("TEST_POSTGRES_URL")
+VERSIONS_DIR = Path(__file__).resolve().parent.parent / "migrations" / "versions"
+
+pytestmark = pytest.mark.skipif(not POSTGRES_URL, reason="TEST_POSTGRES_URL is not set")
+
+def _migration(name):
+    spec = importlib.util.spec_from_file_location(name, VERSIONS_DIR / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+@pytest.fixture
+def connection():
+    """A connection whose search_path is a throwaway schema"""
+    engine = sa.create_engine(POSTGRES_URL)
+    schema = f"migration_test_{uuid.uuid4().hex[:8]}"
+    with engine.connect() as connection:
+        connection.execute(sa.text(f"CREATE SCHEMA {schema}"))
+        connection.execute(sa.text(f"SET search_path TO {schema}"))
+        connection.commit()
+        try:
+            yield connection
+        finally:
+            connection.rollback()
+            connection.execute(sa.text(f"DROP SCHEMA {schema} CASCADE"))
+            connection.commit()
+    engine.dispose()
+
+def _run(connection, step):
+    with Operations.context(MigrationContext.configure(connection)):
+        step()
+    connection.commit()
+
+def test_split_media_file_chunks_moves_blobs_into_chunk_rows(connection):
+    migration = _migration("split_media_file_chunks")
+    chunk = migration.CHUNK_SIZE
+    # Schema as left by add_media_file_content_hash
+    connection.execute(sa.text("""
+        CREATE TABLE media_files (
+            id VARCHAR PRIMARY KEY,
+            filename VARCHAR NOT NULL,
+            content_type VARCHAR NOT NULL,
+            file_size INTEGER NOT NULL,
+            content_hash VARCHAR(64) NOT NULL UNIQUE,
+            file_data BYTEA NOT NULL
+        )
+    """))
+    blobs = {
+        "small": os.urandom(100),
+        "one_chunk": os.urandom(chunk),
+        "one_over": os.urandom(chunk + 1),
+        "three_chunks": os.urandom(2 * chunk + 1000)
+    }
+    for file_id, data in blobs.items():
+        connection.execute(
+            sa.text(
+                "INSERT INTO media_files (id, filename, content_type, file_size, content_hash, file_data) "
+                "VALUES (:id, :id, 'image/jpeg', :size, :id, :data)"
+            ),
+            {"id": file_id, "size": len(data), "data": data}
+        )
+    connection.commit()
+
+    _run(connection, migration.upgrade)
+
+    for file_id, data in blobs.items():
+        rows = connection.execute(
+            sa.text("SELECT seq, data FROM media_file_chunks WHERE file_id = :id ORDER BY seq"),
+            {"id": file_id}
+        ).all()
+        assert [seq for seq, _ in rows] == list(range((len(data) - 1) // chunk + 1))
+        assert all(len(part) == chunk for _, part in rows[:-1])
+        assert b"".join(bytes(part) for _, part in rows) == data
+    assert set(connection.execute(sa.text("SELECT DISTINCT chunk_size FROM media_files")).scalars()) == {chunk}
+
+    _run(connection, migration.downgrade)
+
+    restored = dict(connection.execute(sa.text("SELECT id, file_data FROM media_files")).all())
+    assert {file_id: bytes(data) for file_id, data in restored.items()} == blobs
\ No newline at end of file
@@ -0,0 +1,68 @@
+import random
+from PIL import Image, ImageDraw
+from app import models
+from app.models.media import MediaStatus
+from app.services.near_duplicates import BKTree, NearDuplicateIndex, dhash, hamming, without_near_duplicates
+
+def _scene(shift=0, brightness=0):
+    img = Image.new("RGB", (800, 600), (90 + brightness, 120 + brightness, 150 + brightness))
+    draw = ImageDraw.Draw(img)
+    draw.rectangle((100 + shift, 150, 400 + shift, 500), fill=(200, 60, 40))
+    draw.ellipse((450 + shift, 80, 700 + shift, 330), fill=(30, 30, 30))
+    return img
+
+def test_dhash_matches_burst_shots_not_other_scenes():
+    original = int(dhash(_scene()), 16)
+    burst = int(dhash(_scene(shift=6, brightness=8).resize((400, 300))), 16)
+    other = int(dhash(_scene().transpose(Image.FLIP_LEFT_RIGHT)), 16)
+
+    assert hamming(original, burst) <= 6
+    assert hamming(original, other) > 6
+
+def test_bk_tree_search_matches_brute_force():
+    rng = random.Random(7)
+    values = [rng.getrandbits(64) for _ in range(2000)]
+    tree = BKTree()
+    for index, value in enumerate(values):
+        tree.add(value, index)
+    query = values[42] ^ 0b1011
+
+    expected = sorted((hamming(query, v), i) for i, v in enumerate(values) if hamming(query, v) <= 10)
+    assert sorted(tree.search(query, 10)) == expected
+    assert tree.search(query, 3)[0] == (3, 42)
+
+def _media(db, jobsite_id, perceptual_hash=None, duplicate_of_id=None, status="ready"):
+    media = models.Media(
+        file_url="/api/media/files/x",
+        status=MediaStatus.BEFORE,
+        jobsite_id=jobsite_id,
+        perceptual_hash=perceptual_hash,
+        duplicate_of_id=duplicate_of_id,
+        processing_status=status
+    )
+    db.add(media)
+    db.commit()
+    return media
+
+def test_index_finds_earlier_original_in_same_jobsite(db):
+    index = NearDuplicateIndex()
+    original = _media(db, 1, "ff00ff00ff00ff00")
+    _media(db, 2, "ff00ff00ff00ff00")
+    pending = _media(db, 1, status="processing")
+    new = _media(db, 1, status="processing")
+
+    assert index.find_original(new, "ff00ff00ff00ff01", db) == original.id
+    assert index.find_original(new, "00ff00ff00ff00ff", db) is None
+
+    # Hashed after the index first saw it, and still found
+    pending.perceptual_hash = "0f0f0f0f0f0f0f0f"
+    pending.processing_status = "ready"
+    db.commit()
+    assert index.find_original(new, "0f0f0f0f0f0f0f0e", db) == pending.id
+
+def test_without_near_duplicates_keeps_duplicates_of_absent_originals(db):
+    original = _media(db, 1, "ff00ff00ff00ff00")
+    duplicate = _media(db, 1, "ff00ff00ff00ff01", duplicate_of_id=original.id)
+
+    assert without_near_duplicates([original, duplicate]) == [original]
+    assert without_near_duplicates([duplicate]) == [duplicate]
\ No newline at end of file
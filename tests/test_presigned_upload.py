@@ -0,0 +1,151 @@
+import io
+import base64
+import asyncio
+import hashlib
+import pytest
+import boto3
+from fastapi import HTTPException, UploadFile
+from app.config import settings
+from app.models import Media, MediaFile, User
+from app.models.media import MediaStatus
+from app.schemas.media import PresignedUploadConfirm
+from app.services.media import confirm_presigned_upload
+from app.services.storage import storage, get_backend
+from app.services.storage import registry
+from services.storage import S3Storage
+
+moto = pytest.importorskip("moto")
+
+BUCKET = "leadmagic-test-media"
+JPEG_BYTES = b"\xff\xd8\xff\xe0\x00\x10JFIF\x00" + b"\x00" * 4096
+OWNER = 1
+OTHER_USER = 2
+
+@pytest.fixture
+def s3_backend(monkeypatch):
+    with moto.mock_aws():
+        monkeypatch.setattr(settings, "STORAGE_BACKEND", "s3")
+        monkeypatch.setattr(settings, "AWS_BUCKET_NAME", BUCKET)
+        monkeypatch.setattr(settings, "AWS_REGION", "us-east-1")
+        monkeypatch.setattr(settings, "STORAGE_S3_ENDPOINT_URL", "")
+        registry._backends.clear()
+        boto3.client("s3", region_name="us-east-1").create_bucket(Bucket=BUCKET)
+        yield get_backend("s3")
+        registry._backends.clear()
+
+def _client_upload(backend, form, data):
+    """Stand-in for the browser POSTing the form to the bucket"""
+    backend.s3_client.put_object(
+        Bucket=BUCKET,
+        Key=form["fields"]["key"],
+        Body=data,
+        ContentType=form["fields"]["Content-Type"],
+        ChecksumSHA256=form["fields"]["x-amz-checksum-sha256"]
+    )
+
+def test_presign_returns_content_addressed_form(db, s3_backend):
+    content_hash = hashlib.sha256(JPEG_BYTES).hexdigest()
+
+    form = storage.presign_upload(content_hash, "image/jpeg", len(JPEG_BYTES), OWNER, db)
+
+    assert form["exists"] is False
+    assert form["fields"]["key"] == s3_backend.upload_key(str(OWNER), content_hash)
+    assert form["fields"]["x-amz-checksum-sha256"] == base64.b64encode(
+        hashlib.sha256(JPEG_BYTES).digest()
+    ).decode()
+
+def test_confirm_registers_uploaded_object(db, s3_backend):
+    content_hash = hashlib.sha256(JPEG_BYTES).hexdigest()
+    form = storage.presign_upload(content_hash, "image/jpeg", len(JPEG_BYTES), OWNER, db)
+    _client_upload(s3_backend, form, JPEG_BYTES)
+
+    file_url = storage.register_uploaded_object(content_hash, "site.jpg", OWNER, db)
+    db.add(Media(file_url=file_url, status=MediaStatus.BEFORE, user_id=OWNER))
+    db.commit()
+
+    record = db.query(MediaFile).filter_by(id=file_url.split("/")[-1]).one()
+    assert record.storage_backend == "s3"
+    assert record.content_type == "image/jpeg"
+    assert record.file_size == len(JPEG_BYTES)
+    # Moved off the staging key the user's next upload would overwrite
+    assert record.storage_key == s3_backend.key_for(record.id, content_hash)
+    assert b"".join(s3_backend.stream(record.storage_key)) == JPEG_BYTES
+    assert s3_backend.stat(form["fields"]["key"]) is None
+
+    # The same bytes again need no upload at all
+    assert storage.presign_upload(content_hash, "image/jpeg", len(JPEG_BYTES), OWNER, db) == {"exists": True}
+    assert storage.register_uploaded_object(content_hash, "again.jpg", OWNER, db) == file_url
+
+def test_other_users_must_upload_known_bytes(db, s3_backend):
+    content_hash = hashlib.sha256(JPEG_BYTES).hexdigest()
+    form = storage.presign_upload(content_hash, "image/jpeg", len(JPEG_BYTES), OWNER, db)
+    _client_upload(s3_backend, form, JPEG_BYTES)
+    file_url = storage.register_uploaded_object(content_hash, "site.jpg", OWNER, db)
+    db.add(Media(file_url=file_url, status=MediaStatus.BEFORE, user_id=OWNER))
+    db.commit()
+
+    # Knowing the hash reveals nothing and grants nothing
+    other_form = storage.presign_upload(content_hash, "image/jpeg", len(JPEG_BYTES), OTHER_USER, db)
+    assert other_form["exists"] is False
+    with pytest.raises(HTTPException) as exc:
+        storage.register_uploaded_object(content_hash, "site.jpg", OTHER_USER, db)
+    assert exc.value.status_code == 404
+
+    # Once they upload the bytes themselves they share the stored copy
+    _client_upload(s3_backend, other_form, JPEG_BYTES)
+    assert storage.register_uploaded_object(content_hash, "site.jpg", OTHER_USER, db) == file_url
+    assert db.query(MediaFile).one().ref_count == 2
+    assert s3_backend.stat(other_form["fields"]["key"]) is None
+
+def test_confirm_rejects_disallowed_type(db, s3_backend):
+    data = b"#!/bin/sh\necho not a photo\n"
+    content_hash = hashlib.sha256(data).hexdigest()
+    form = storage.presign_upload(content_hash, "image/jpeg", len(data), OWNER, db)
+    _client_upload(s3_backend, form, data)
+
+    with pytest.raises(HTTPException) as exc:
+        storage.register_uploaded_object(content_hash, "site.jpg", OWNER, db)
+
+    assert exc.value.status_code == 400
+    assert s3_backend.stat(form["fields"]["key"]) is None
+
+def test_confirm_without_upload_is_not_found(db, s3_backend):
+    content_hash = hashlib.sha256(b"never uploaded").hexdigest()
+
+    with pytest.raises(HTTPException) as exc:
+        storage.register_uploaded_object(content_hash, "site.jpg", OWNER, db)
+
+    assert exc.value.status_code == 404
+
+def test_confirm_on_database_backend_is_rejected(db, monkeypatch):
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", "database")
+    registry._backends.clear()
+    user = User(email="crew@example.com", hashed_password="x")
+    db.add(user)
+    db.commit()
+    data = PresignedUploadConfirm(
+        jobsite_address="1 Main St",
+        star_rating=4,
+        status="before",
+        filename="site.jpg",
+        sha256=hashlib.sha256(JPEG_BYTES).hexdigest()
+    )
+
+    with pytest.raises(HTTPException) as exc:
+        confirm_presigned_upload(data, user, db)
+
+    assert exc.value.status_code == 400
+    assert "does not support direct uploads" in exc.value.detail
+    assert db.query(Media).count() == 0
+
+def test_legacy_s3_storage_uploads_and_deletes_by_url(s3_backend):
+    legacy = S3Storage()
+
+    url = asyncio.run(legacy.upload_file(UploadFile(io.BytesIO(JPEG_BYTES), filename="site.jpg"), "photos"))
+
+    assert url.startswith(f"https://{BUCKET}.s3.us-east-1.amazonaws.com/photos/")
+    key = url.split(".amazonaws.com/")[1]
+    stat = legacy.stat(key)
+    assert (stat.size, stat.content_type) == (len(JPEG_BYTES), "image/jpeg")
+    legacy.delete_file(url)
+    assert legacy.stat(key) is None
\ No newline at end of file
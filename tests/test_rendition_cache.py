@@ -0,0 +1,107 @@
+from datetime import datetime, timedelta
+from app import models
+from app.models.media import MediaStatus
+from app.models.post import PostStatus
+from app.services import ingest, rendition_cache as rendition_cache_module
+from app.services.rendition_cache import RenditionCache, prerender_pinned
+
+def _manifest(cache_dir, content_hash, size=100):
+    paths = {}
+    for platform in ("instagram", "facebook"):
+        path = cache_dir / f"{platform}_{content_hash}.jpg"
+        path.write_bytes(b"x" * size)
+        paths[platform] = str(path)
+        paths[f"{platform}_thumbnail"] = str(cache_dir / f"{content_hash}_thumb.jpg")
+    (cache_dir / f"{content_hash}_thumb.jpg").write_bytes(b"x" * 10)
+    return paths
+
+def _age(db, content_hash, minutes):
+    db.query(models.Rendition).filter_by(content_hash=content_hash).update(
+        {models.Rendition.last_accessed_at: datetime.utcnow() - timedelta(minutes=minutes)}
+    )
+    db.commit()
+
+def test_record_manifest_dedupes_shared_thumbnail(db, tmp_path):
+    cache = RenditionCache(str(tmp_path), budget_bytes=10_000, pin_days=7)
+    cache.record_manifest(_manifest(tmp_path, "a" * 64), "a" * 64, db)
+
+    rows = {r.key: r for r in db.query(models.Rendition)}
+    assert len(rows) == 3
+    assert rows[f"{'a' * 64}_thumb.jpg"].kind == "thumbnail"
+    assert rows[f"instagram_{'a' * 64}.jpg"].platform == "instagram"
+    assert cache.stats(db)["bytes"] == 210
+
+def test_evict_least_recently_used_until_under_budget(db, tmp_path):
+    cache = RenditionCache(str(tmp_path), budget_bytes=250, pin_days=7)
+    for content_hash, minutes in (("a" * 64, 30), ("b" * 64, 20), ("c" * 64, 10)):
+        cache.record_manifest(_manifest(tmp_path, content_hash), content_hash, db)
+        _age(db, content_hash, minutes)
+
+    report = cache.evict(db, batch_size=2)
+
+    assert report["total_bytes"] <= 250
+    remaining = {r.content_hash for r in db.query(models.Rendition)}
+    assert remaining == {"c" * 64}
+    assert not (tmp_path / f"instagram_{'a' * 64}.jpg").exists()
+    assert (tmp_path / f"instagram_{'c' * 64}.jpg").exists()
+
+def test_evict_skips_media_in_soon_scheduled_posts(db, tmp_path):
+    cache = RenditionCache(str(tmp_path), budget_bytes=0, pin_days=7)
+    for content_hash in ("a" * 64, "b" * 64):
+        cache.record_manifest(_manifest(tmp_path, content_hash), content_hash, db)
+
+    grouping = models.MediaGrouping(jobsite_id=1)
+    db.add(grouping)
+    db.flush()
+    db.add(models.Media(
+        file_url="/api/media/files/x",
+        content_hash="a" * 64,
+        status=MediaStatus.AFTER,
+        grouping_id=grouping.id
+    ))
+    db.add(models.Post(
+        grouping_id=grouping.id,
+        status=PostStatus.scheduled,
+        scheduled_for=datetime.utcnow() + timedelta(days=2)
+    ))
+    db.commit()
+
+    cache.evict(db)
+
+    assert {r.content_hash for r in db.query(models.Rendition)} == {"a" * 64}
+    stats = cache.stats(db)
+    assert stats["pinned_items"] == 3
+    assert stats["pinned_bytes"] == stats["bytes"]
+
+def test_prerender_renders_evicted_media_of_soon_scheduled_posts(db, tmp_path, monkeypatch):
+    cache = RenditionCache(str(tmp_path), budget_bytes=10_000, pin_days=7)
+    monkeypatch.setattr(rendition_cache_module, "rendition_cache", cache)
+    rendered = []
+    monkeypatch.setattr(ingest, "generate_renditions", lambda media_id, db: rendered.append(media_id))
+
+    soon, later = models.MediaGrouping(jobsite_id=1), models.MediaGrouping(jobsite_id=1)
+    db.add_all([soon, later])
+    db.flush()
+    complete = _manifest(tmp_path, "a" * 64)
+    evicted = {"instagram": str(tmp_path / "gone.jpg")}
+    media = [
+        models.Media(file_url="/api/media/files/a", status=MediaStatus.AFTER, grouping_id=soon.id,
+                     processing_status="ready", processed_urls=complete),
+        models.Media(file_url="/api/media/files/b", status=MediaStatus.AFTER, grouping_id=soon.id,
+                     processing_status="ready", processed_urls=evicted),
+        models.Media(file_url="/api/media/files/c", status=MediaStatus.AFTER, grouping_id=later.id,
+                     processing_status="ready", processed_urls=evicted)
+    ]
+    db.add_all(media)
+    for grouping, days in ((soon, 2), (later, 30)):
+        db.add(models.Post(
+            grouping_id=grouping.id,
+            status=PostStatus.scheduled,
+            scheduled_for=datetime.utcnow() + timedelta(days=days)
+        ))
+    db.commit()
+
+    report = prerender_pinned(db)
+
+    assert report == {"checked": 2, "rendered": 1, "failed": 0}
+    assert rendered == [media[1].id]
\ No newline at end of file
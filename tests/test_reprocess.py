@@ -0,0 +1,88 @@
+import io
+import hashlib
+import uuid
+import pytest
+from PIL import Image
+from sqlalchemy.orm import sessionmaker
+from app import models
+from app.config import settings
+from app.models.media import MediaStatus
+from app.models.post import PostStatus
+from app.services import ingest
+from app.services.media_processing import MediaProcessor
+from app.services.reprocess import reprocess_stale, stale_spec_hashes
+from app.services.storage import get_backend
+
+def _rendered_media(db, color, grouping_id=None):
+    buffer = io.BytesIO()
+    Image.new("RGB", (1200, 1200), color).save(buffer, "PNG")
+    data = buffer.getvalue()
+    file_id = str(uuid.uuid4())
+    backend = get_backend("database")
+    db.add(models.MediaFile(
+        id=file_id,
+        filename=f"{file_id}.png",
+        content_type="image/png",
+        file_size=len(data),
+        chunk_size=backend.chunk_size,
+        content_hash=hashlib.sha256(data).hexdigest(),
+        storage_backend=backend.name,
+        storage_key=file_id
+    ))
+    db.flush()
+    backend.put(file_id, io.BytesIO(data), "image/png", db)
+    media = models.Media(
+        file_url=f"/api/media/files/{file_id}",
+        content_hash=hashlib.sha256(data).hexdigest(),
+        status=MediaStatus.AFTER,
+        grouping_id=grouping_id
+    )
+    db.add(media)
+    db.commit()
+    ingest.generate_renditions(media.id, db)
+    return media
+
+@pytest.fixture
+def rendered(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "INGEST_SCRATCH_DIR", str(tmp_path / "scratch"))
+    monkeypatch.setattr(settings, "RENDITION_CACHE_DIR", str(tmp_path / "renditions"))
+    grouping = models.MediaGrouping(jobsite_id=1)
+    db.add(grouping)
+    db.flush()
+    db.add(models.Post(grouping_id=grouping.id, status=PostStatus.published))
+    return _rendered_media(db, "red"), _rendered_media(db, "blue", grouping_id=grouping.id)
+
+def _change_instagram_size(monkeypatch, size):
+    specs = MediaProcessor.PLATFORM_SPECS
+    instagram = {**specs["instagram"], "image": {**specs["instagram"]["image"], "max_size": size}}
+    monkeypatch.setattr(MediaProcessor, "PLATFORM_SPECS", {**specs, "instagram": instagram})
+
+def test_only_stale_unpublished_renditions_are_rendered_again(db, rendered, monkeypatch):
+    draft, published = rendered
+    sessions = sessionmaker(bind=db.get_bind())
+    facebook_key = published.processed_urls["facebook"].rsplit("/", 1)[1]
+    assert stale_spec_hashes(db) == []
+
+    _change_instagram_size(monkeypatch, (540, 540))
+    assert len(stale_spec_hashes(db)) >= 1
+
+    dry_run = reprocess_stale(sessions, workers=2, dry_run=True)
+    assert (dry_run["sources"], dry_run["cursor"]) == (1, draft.content_hash)
+    with Image.open(draft.processed_urls["instagram"]) as rendition:
+        assert rendition.size == (1080, 1080)
+
+    batches = []
+    report = reprocess_stale(sessions, workers=2, progress=batches.append)
+
+    assert (report["sources"], report["failed"]) == (1, 0)
+    assert report["renditions"] == dry_run["renditions"]
+    assert batches[-1] == report
+    with Image.open(draft.processed_urls["instagram"]) as rendition:
+        assert rendition.size == (540, 540)
+    # Media of published posts keep their renditions
+    with Image.open(published.processed_urls["instagram"]) as rendition:
+        assert rendition.size == (1080, 1080)
+    assert db.get(models.Rendition, facebook_key) is not None
+
+    # Nothing left to do; a rerun resumes from an empty stale set
+    assert reprocess_stale(sessions)["sources"] == 0
\ No newline at end of file
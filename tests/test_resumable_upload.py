@@ -0,0 +1,135 @@
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.orm import sessionmaker
+from app import models
+from app.config import settings
+from app.schemas.media import UploadSessionCreate
+from app.services import media as media_service
+from app.services import resumable_upload
+from app.services.storage import registry
+
+CHUNK_SIZE = resumable_upload.MIN_CHUNK_SIZE
+JPEG_BYTES = b"\xff\xd8\xff\xe0\x00\x10JFIF\x00" + b"\x00" * (CHUNK_SIZE + 1000)
+
+@pytest.fixture
+def user(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_SESSION_DIR", str(tmp_path / "sessions"))
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", "database")
+    monkeypatch.setattr(media_service, "enqueue_ingest", lambda media_id: "task-id")
+    registry._backends.clear()
+    user = models.User(email="crew@example.com", hashed_password="x")
+    db.add(user)
+    db.commit()
+    return user
+
+def _session(db, user):
+    data = UploadSessionCreate(
+        jobsite_address="1 Main St",
+        star_rating=4,
+        status="before",
+        filename="site.jpg",
+        total_size=len(JPEG_BYTES),
+        chunk_size=CHUNK_SIZE
+    )
+    return resumable_upload.create_upload_session(data, user, db)
+
+async def _body(data):
+    yield data[:1000]
+    yield data[1000:]
+
+def _put(upload, index, data, db):
+    asyncio.run(resumable_upload.write_chunk(upload, index, _body(data), db))
+
+def _complete(upload, user, db):
+    return asyncio.run(resumable_upload.finalize_upload_session(upload, user, db))
+
+def test_complete_assembles_chunks_once(db, user):
+    upload = _session(db, user)
+    _put(upload, 1, JPEG_BYTES[CHUNK_SIZE:], db)
+    _put(upload, 0, JPEG_BYTES[:CHUNK_SIZE], db)
+
+    result = _complete(upload, user, db)
+
+    media = db.query(models.Media).one()
+    assert result["media_id"] == media.id
+    assert result["status_url"] == f"/api/media/{media.id}/status"
+    assert upload.status == "completed"
+    record = db.query(models.MediaFile).one()
+    assert record.file_size == len(JPEG_BYTES)
+    assert b"".join(media_service.storage.stream_file(record, db)) == JPEG_BYTES
+
+    # Completing again returns the same accepted body and creates nothing
+    assert _complete(upload, user, db) == result
+    assert db.query(models.Media).count() == 1
+
+def test_complete_with_missing_chunk_is_conflict(db, user):
+    upload = _session(db, user)
+    _put(upload, 0, JPEG_BYTES[:CHUNK_SIZE], db)
+
+    with pytest.raises(HTTPException) as exc:
+        _complete(upload, user, db)
+
+    assert exc.value.status_code == 409
+    assert exc.value.detail["missing_chunks"] == [1]
+    assert upload.status == "open"
+
+def test_chunk_of_wrong_length_is_rejected(db, user):
+    upload = _session(db, user)
+
+    with pytest.raises(HTTPException) as exc:
+        _put(upload, 0, JPEG_BYTES[:CHUNK_SIZE - 1], db)
+
+    assert exc.value.status_code == 400
+    assert resumable_upload.get_received_chunks(upload) == []
+
+def test_concurrent_completion_creates_one_media(db, user):
+    upload = _session(db, user)
+    _put(upload, 0, JPEG_BYTES[:CHUNK_SIZE], db)
+    _put(upload, 1, JPEG_BYTES[CHUNK_SIZE:], db)
+    # Another request claims the session after this one loaded it
+    other = sessionmaker(bind=db.get_bind())()
+    other.query(models.UploadSession).filter_by(id=upload.id).update({"status": "finalizing"})
+    other.commit()
+    other.close()
+    assert upload.status == "open"
+
+    with pytest.raises(HTTPException) as exc:
+        _complete(upload, user, db)
+
+    assert exc.value.status_code == 409
+    assert db.query(models.Media).count() == 0
+
+def test_interrupted_completion_reopens_the_session(db, user, monkeypatch):
+    upload = _session(db, user)
+    _put(upload, 0, JPEG_BYTES[:CHUNK_SIZE], db)
+    _put(upload, 1, JPEG_BYTES[CHUNK_SIZE:], db)
+
+    async def cancelled(*args):
+        raise asyncio.CancelledError()
+
+    with monkeypatch.context() as patch:
+        patch.setattr(resumable_upload, "handle_upload_and_create_media", cancelled)
+        with pytest.raises(asyncio.CancelledError):
+            _complete(upload, user, db)
+    assert upload.status == "open"
+
+    result = _complete(upload, user, db)
+    assert result["media_id"] == db.query(models.Media).one().id
+
+def test_completion_stuck_finalizing_can_be_claimed_again(db, user):
+    upload = _session(db, user)
+    _put(upload, 0, JPEG_BYTES[:CHUNK_SIZE], db)
+    _put(upload, 1, JPEG_BYTES[CHUNK_SIZE:], db)
+    # A completion that claimed the session and then died
+    db.query(models.UploadSession).filter_by(id=upload.id).update({
+        "status": "finalizing",
+        "updated_at": datetime.utcnow() - resumable_upload.FINALIZE_TIMEOUT - timedelta(minutes=1)
+    })
+    db.commit()
+
+    result = _complete(upload, user, db)
+
+    assert upload.status == "completed"
+    assert result["media_id"] == db.query(models.Media).one().id
\ No newline at end of file
@@ -0,0 +1,35 @@
+import numpy as np
+from app.services.smart_crop import best_crop, centered_crop, compute_crops, energy_map, integral_image
+
+def _pixels(width, height, detail=None):
+    """Flat gray with a noisy patch at detail=(left, top, right, bottom)"""
+    pixels = np.full((height, width), 128, dtype=np.float32)
+    if detail:
+        left, top, right, bottom = detail
+        rng = np.random.default_rng(0)
+        pixels[top:bottom, left:right] = rng.uniform(0, 255, (bottom - top, right - left))
+    return pixels
+
+def test_crop_follows_detail():
+    # Detail on the right of a 2:1 frame
+    table = integral_image(energy_map(_pixels(400, 200, detail=(320, 50, 390, 150))))
+    left, top, right, bottom = best_crop(table, 1.0)
+
+    assert (top, bottom) == (0.0, 1.0)
+    assert right - left == 0.5
+    assert left <= 320 / 400 and right >= 380 / 400
+
+def test_flat_image_crops_centered():
+    table = integral_image(energy_map(_pixels(200, 400)))
+
+    assert best_crop(table, 1.0) == centered_crop((200, 400), 1.0) == (0.0, 0.25, 1.0, 0.75)
+
+def test_compute_crops_covers_every_aspect():
+    crops = compute_crops(_pixels(300, 300, detail=(0, 0, 60, 300)))
+
+    assert crops["1:1"] == [0.0, 0.0, 1.0, 1.0]
+    # Tall crops of a square span its height and hug the detail on the left
+    left, top, right, bottom = crops["9:16"]
+    assert (top, bottom) == (0.0, 1.0)
+    assert left < 0.05 and round((right - left) * 16) == 9
+    assert crops["1.91:1"][0] == 0.0 and crops["1.91:1"][2] == 1.0
\ No newline at end of file
@@ -0,0 +1,158 @@
+import io
+import os
+import asyncio
+import hashlib
+from datetime import datetime, timedelta
+import pytest
+from fastapi import HTTPException, UploadFile
+from app import models
+from app.config import settings
+from app.models.media import MediaStatus
+from app.services import media_gc
+from app.services.storage import StorageBackend, registry, shard_path, storage
+from app.services.storage.database import BLOB_CHUNK_SIZE
+from app.services.storage.filesystem import FilesystemBackend
+
+JPEG_BYTES = b"\xff\xd8\xff\xe0\x00\x10JFIF\x00" + b"\x00" * 4096
+
+@pytest.fixture
+def database_backend(monkeypatch):
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", "database")
+    registry._backends.clear()
+
+def _upload(db, data, filename="photo.jpg"):
+    return asyncio.run(storage.upload_file(UploadFile(io.BytesIO(data), filename=filename), db))
+
+def test_shard_path():
+    content_hash = hashlib.sha256(b"photo").hexdigest()
+    assert shard_path(content_hash) == f"{content_hash[:2]}/{content_hash[2:4]}/{content_hash}"
+
+def test_filesystem_backend_roundtrip(tmp_path):
+    backend = FilesystemBackend(str(tmp_path))
+    data = b"x" * 1000 + b"y" * 1000
+    key = backend.key_for("file-id", hashlib.sha256(data).hexdigest())
+
+    backend.put(key, io.BytesIO(data), "image/jpeg")
+
+    assert backend.stat(key).size == len(data)
+    assert b"".join(backend.stream(key)) == data
+    assert b"".join(backend.stream(key, 995, 1004)) == b"xxxxxyyyyy"
+    assert backend.local_path(key) == str(tmp_path / key)
+
+    backend.delete(key)
+    assert backend.stat(key) is None
+    # Deleting twice is not an error
+    backend.delete(key)
+
+def test_incomplete_backend_cannot_be_constructed():
+    class WriteOnlyBackend(StorageBackend):
+        def key_for(self, file_id, content_hash):
+            return file_id
+
+        def put(self, key, file, content_type, db=None):
+            pass
+
+    with pytest.raises(TypeError):
+        WriteOnlyBackend()
+
+def test_oversized_upload_is_rejected_without_reading_it_all(db, database_backend, monkeypatch):
+    monkeypatch.setattr(storage, "max_file_size", 2 * storage.chunk_size)
+    data = io.BytesIO(JPEG_BYTES + b"\x00" * 4 * storage.chunk_size)
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(storage.upload_file(UploadFile(data, filename="huge.jpg"), db))
+
+    assert exc.value.status_code == 413
+    assert data.tell() <= 3 * storage.chunk_size
+    assert db.query(models.MediaFile).count() == 0
+
+@pytest.mark.parametrize("data", [b"MZ\x90\x00" + b"\x00" * 4096, b""])
+def test_upload_type_is_sniffed_from_content(db, database_backend, data):
+    # The name claims a photo; the bytes are an executable, or nothing
+    with pytest.raises(HTTPException) as exc:
+        _upload(db, data, "photo.jpg")
+
+    assert exc.value.status_code == 400
+    assert db.query(models.MediaFile).count() == 0
+
+def test_identical_uploads_share_one_blob(db, database_backend):
+    first = _upload(db, JPEG_BYTES, "a.jpg")
+    second = _upload(db, JPEG_BYTES, "b.jpg")
+
+    assert first == second
+    record = db.query(models.MediaFile).one()
+    assert record.ref_count == 2
+    assert record.content_hash == hashlib.sha256(JPEG_BYTES).hexdigest()
+    assert db.query(models.MediaFileChunk).filter_by(file_id=record.id).count() == 1
+
+def test_database_backend_streams_ranges_across_chunks(db, database_backend):
+    chunk = BLOB_CHUNK_SIZE
+    data = JPEG_BYTES[:12] + os.urandom(2 * chunk + 1000 - 12)
+    file_id = _upload(db, data).rsplit("/", 1)[1]
+    backend = registry.get_backend("database")
+
+    rows = db.query(models.MediaFileChunk).filter_by(file_id=file_id).order_by(models.MediaFileChunk.seq)
+    assert [len(row.data) for row in rows] == [chunk, chunk, 1000]
+    for start, end in [
+        (0, None),
+        (0, chunk - 1),  # Ends on a boundary
+        (chunk, chunk),  # First byte of a chunk
+        (chunk - 10, chunk + 9),  # Straddles one boundary
+        (chunk - 1, 2 * chunk),  # Touches all three chunks
+        (2 * chunk - 5, len(data) - 1)  # Into the short last chunk
+    ]:
+        stop = len(data) if end is None else end + 1
+        assert b"".join(backend.stream(file_id, start, end, db=db)) == data[start:stop]
+
+def test_delete_file_purges_with_last_reference(db, database_backend):
+    url = _upload(db, JPEG_BYTES)
+    _upload(db, JPEG_BYTES)
+    file_id = url.rsplit("/", 1)[1]
+
+    storage.delete_file(url, db)
+    db.expire_all()
+    assert db.get(models.MediaFile, file_id).ref_count == 1
+    assert db.query(models.MediaFileChunk).filter_by(file_id=file_id).count() == 1
+
+    storage.delete_file(url, db)
+    assert db.get(models.MediaFile, file_id) is None
+    assert db.query(models.MediaFileChunk).filter_by(file_id=file_id).count() == 0
+
+def test_reupload_while_the_gc_purges_keeps_its_blob(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", "filesystem")
+    monkeypatch.setattr(settings, "STORAGE_LOCAL_ROOT", str(tmp_path / "blobs"))
+    registry._backends.clear()
+    orphan = db.get(models.MediaFile, _upload(db, JPEG_BYTES).rsplit("/", 1)[1])
+    backend = registry.get_backend("filesystem")
+    delete = backend.delete
+    reuploaded = []
+
+    def delete_after_reupload(key, session=None):
+        # The GC has committed the row deletion but not unlinked the blob yet
+        reuploaded.append(_upload(db, JPEG_BYTES))
+        delete(key, session)
+
+    monkeypatch.setattr(backend, "delete", delete_after_reupload)
+    storage.purge_file(orphan, db)
+
+    record = db.get(models.MediaFile, reuploaded[0].rsplit("/", 1)[1])
+    assert b"".join(storage.stream_file(record, db)) == JPEG_BYTES
+
+def test_reuploaded_orphan_is_not_collected_before_its_media_exists(db, database_backend):
+    url = _upload(db, JPEG_BYTES)
+    file_id = url.rsplit("/", 1)[1]
+    # The first upload failed before creating its media, long ago
+    long_ago = datetime.utcnow() - timedelta(hours=48)
+    db.query(models.MediaFile).filter_by(id=file_id).update(
+        {models.MediaFile.created_at: long_ago, models.MediaFile.last_referenced_at: long_ago}
+    )
+    db.commit()
+
+    # Same bytes again; the Media row is not committed yet
+    assert _upload(db, JPEG_BYTES) == url
+    report = media_gc.sweep_orphaned_files(db, grace=timedelta(hours=24))
+
+    assert report["deleted"] == 0
+    db.add(models.Media(file_url=url, status=MediaStatus.BEFORE))
+    db.commit()
+    assert b"".join(storage.stream_file(db.get(models.MediaFile, file_id), db)) == JPEG_BYTES
\ No newline at end of file